@@ -0,0 +1,72 @@
+
+import os, sys
+import click
+
+# Make 'src' importable for both `python scripts/bench.py` and `python -m scripts.bench`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from benchmark import (BENCH_SIZES, STARTUP_BUDGET_S, run_benchmarks, run_startup, compare, load_baseline,
+                       save_results)
+
+def end_to_end_cases(trades, book, tmp):
+    """The run_all stage graph (load → bars → fits → figures) on files written from the synthetic frames."""
+    from scripts.run_all import build_stages
+    from pipeline import Pipeline
+    n = len(trades)
+    tpath, bpath = os.path.join(tmp, f"trades_{n}.parquet"), os.path.join(tmp, f"book_{n}.parquet")
+    trades.to_parquet(tpath, index=False)
+    book.to_parquet(bpath, index=False)
+    out = os.path.join(tmp, "results")
+    os.makedirs(os.path.join(out, "figures"), exist_ok=True)
+    os.makedirs(os.path.join(out, "tables"), exist_ok=True)
+
+    def run():
+        Pipeline(build_stages(tpath, bpath, "1s", out)).run(workers=4)
+    return [("end_to_end", run, n)]
+
+@click.command()
+@click.option("--sizes", default=",".join(str(s) for s in BENCH_SIZES), show_default=True,
+              help="Comma-separated trade counts (e.g. 1e4,1e5,1e6).")
+@click.option("--repeat", default=3, show_default=True, help="Timed runs per case; the best is kept.")
+@click.option("--only", multiple=True, help="Run only these cases (comma-separated or repeated).")
+@click.option("--no-figures", is_flag=True, help="Skip the matplotlib cases.")
+@click.option("--no-e2e", is_flag=True, help="Skip the end-to-end pipeline case.")
+@click.option("--startup-budget", default=STARTUP_BUDGET_S, show_default=True,
+              help="Seconds `hft --help` and friends may take; 0 skips the startup cases.")
+@click.option("--seed", default=0, show_default=True, help="Synthetic data seed.")
+@click.option("--baseline", default=os.path.join(PROJECT_ROOT, "benchmarks", "baseline.json"), show_default=True,
+              help="Baseline results to compare against (recorded on first run).")
+@click.option("--out", default=os.path.join(PROJECT_ROOT, "benchmarks", "latest.json"), show_default=True,
+              help="Where to write this run's results.")
+@click.option("--threshold", default=0.25, show_default=True,
+              help="Relative throughput drop / memory growth counted as a regression.")
+@click.option("--save-baseline", is_flag=True, help="Overwrite the baseline with this run.")
+def main(sizes, repeat, only, no_figures, no_e2e, startup_budget, seed, baseline, out, threshold, save_baseline):
+    """Benchmark the hot functions and the pipeline on synthetic data; exit 1 on regressions."""
+    size_list = [int(float(s)) for s in sizes.split(",") if s.strip()]
+    selected = [s.strip() for item in only for s in item.split(",") if s.strip()]
+    results = run_benchmarks(size_list, repeat=repeat, seed=seed, only=selected or None, figures=not no_figures,
+                             extra_cases=None if no_e2e else end_to_end_cases, log=click.echo)
+    if startup_budget > 0 and not selected:
+        results.update(run_startup(repeat=repeat, budget_s=startup_budget, log=click.echo))
+    save_results(out, results)
+    click.echo(f"Results: {out}")
+
+    base = load_baseline(baseline)
+    regressions = compare(results, base, threshold=threshold)     # startup budgets apply without a baseline too
+    if save_baseline or not base:
+        save_results(baseline, results)
+        click.echo(f"Baseline {'saved' if base else 'recorded'}: {baseline}")
+    for r in regressions:
+        click.echo(f"REGRESSION {r['key']} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} "
+                   f"({r['change']:+.0%})", err=True)
+    if regressions:
+        sys.exit(1)
+    if base and not save_baseline:
+        click.echo(f"No regressions beyond {threshold:.0%} against {baseline}")
+
+if __name__ == "__main__":
+    main()
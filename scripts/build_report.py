@@ -0,0 +1,54 @@
+"""
+Render HTML reports from artifact manifests written by run_all.py.
+
+Nothing is recomputed: tables, figures, metrics and timings all come from the
+manifest, so re-theming (``--templates``) or editing notes takes milliseconds.
+Passing several manifests (or a glob) builds one index report across symbols/days.
+
+Usage:
+    python -m scripts.build_report --manifest results/manifest.json --out reports/summary.html
+    python -m scripts.build_report --manifest "results/*/manifest.json" --out reports/index.html
+"""
+from __future__ import annotations
+import glob
+import os
+import sys
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from report import render_manifest, render_index
+
+@click.command()
+@click.option("--manifest", "manifests", multiple=True,
+              default=[os.path.join(PROJECT_ROOT, "results", "manifest.json")], show_default=True,
+              help="Manifest JSON path or glob; repeat to combine several runs into an index report.")
+@click.option("--out", default=None, help="Output HTML (default: reports/summary.html, or reports/index.html for several manifests).")
+@click.option("--templates", default=os.path.join(PROJECT_ROOT, "templates"), show_default=True,
+              help="Template directory (report.html / index.html).")
+@click.option("--title", default=None, help="Override the report title.")
+@click.option("--note", "notes", multiple=True, help="Replace manifest notes (repeatable).")
+def main(manifests, out, templates, title, notes):
+    """Render a report (or an index of reports) from manifests alone."""
+    paths = []
+    for m in manifests:
+        hits = sorted(glob.glob(m))
+        paths += hits if hits else [m]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise click.UsageError(f"Manifest not found: {missing[0]}")
+
+    rep_dir = os.path.join(PROJECT_ROOT, "reports")
+    if len(paths) == 1:
+        out = out or os.path.join(rep_dir, "summary.html")
+        render_manifest(paths[0], out, templates_dir=templates, title=title, notes=list(notes) or None)
+    else:
+        out = out or os.path.join(rep_dir, "index.html")
+        render_index(paths, out, templates_dir=templates, title=title or "HFT Report Index")
+    print(f"[OK] Report saved to: {out}")
+
+if __name__ == "__main__":
+    main()
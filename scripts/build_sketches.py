@@ -0,0 +1,55 @@
+"""
+Build per-day quantile sketches next to tick store partitions and summarize a date range.
+
+Missing or stale ``date=*/sketch.json`` files are (re)built in parallel; the
+summary merges the stored sketches, so repeated multi-day summaries never re-read
+ticks. Trade stores give ``qty`` and bar ``absret``, book stores ``spread_bp``.
+"""
+from __future__ import annotations
+import os
+import sys
+import click
+
+# Make 'src' importable for both `python scripts/build_sketches.py` and `python -m scripts.build_sketches`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+@click.command()
+@click.option("--store", "stores", multiple=True, required=True, help="Trade or book tick store root (repeatable).")
+@click.option("--start", default=None, help="First date (YYYY-MM-DD).")
+@click.option("--end", default=None, help="Last date (YYYY-MM-DD).")
+@click.option("--bar", default="1s", show_default=True, help="Bar interval for |returns| in trade stores.")
+@click.option("--k", default=None, type=int, help="Sketch size (rank error ~2.3/k) [default: 200].")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Parallel processes.")
+@click.option("--force", is_flag=True, help="Rebuild sketches that are up to date.")
+@click.option("--out", default=os.path.join(PROJECT_ROOT, "results", "sketch_summary.json"), show_default=True,
+              help="Summary JSON (quantiles, tail percentiles, error bound per variable).")
+@click.option("--figures", default=None, help="Also write ECDF/tail figures per variable into this directory.")
+def main(stores, start, end, bar, k, workers, force, out, figures):
+    """Sketch tick store partitions per day and summarize spread/qty/|return| quantiles."""
+    from sketch import DEFAULT_K, build_store_sketches, load_store_sketches
+    from tickstore import save_json_atomic
+    k = k or DEFAULT_K
+    summary = {}
+    for root in stores:
+        res = build_store_sketches(root, start, end, bar=bar, k=k, workers=workers, force=force)
+        click.echo(f"{root}: built {len(res['built'])} day sketches, {len(res['skipped'])} up to date")
+        merged = load_store_sketches(root, start, end, k=k)
+        summary[root] = {name: sk.summary() for name, sk in merged.items()}
+        for name, sk in merged.items():
+            q = summary[root][name]["quantiles"]
+            click.echo(f"  {name}: n={sk.n:,} p50={q['p50']:.6g} p99={q['p99']:.6g} p99.9={q['p99.9']:.6g}")
+            if figures:
+                import viz
+                os.makedirs(figures, exist_ok=True)
+                label = os.path.basename(os.path.normpath(root))
+                viz.sketch_ecdf_tail_plot(sk, title=f"{label} {name}",
+                                          path=os.path.join(figures, f"{label}_{name}_ecdf_tail.png"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    save_json_atomic(out, {"start": start, "end": end, "bar": bar, "k": k, "stores": summary})
+    click.echo(f"[OK] Summary saved to: {out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,38 @@
-
-import json, time, gzip, sys
-import websocket
-
 """
 Minimal WebSocket collector with heartbeat and simple reconnect.
+
+Messages are stamped with the local receive time and handed to a background
+``RotatingWriter`` so the WS thread never touches the disk. For many symbols in
+one process use ``scripts/collect_multi.py``.
+
+Usage:
+    python -m scripts.collect_book --symbol BTCUSDT --out data/raw/binance/BTCUSDT/book.jsonl --gzip
 """
+import json, time, os, sys, threading, signal
+import click
+import websocket
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from collector import RotatingWriter, stamp
+
+def _report_stats(writer, every, stop):
+    while not stop.wait(every):
+        print("[WS] writer:", json.dumps(writer.stats()), file=sys.stderr)
+
+def run_ws(url, out_path, ping_interval=15, rotate_seconds=3600, rotate_bytes=256 << 20,
+           compress=False, stats_every=60):
+    """Connect to WS, queue lines for the background writer, with periodic heartbeats."""
+    writer = RotatingWriter(out_path, rotate_seconds=rotate_seconds, rotate_bytes=rotate_bytes, compress=compress)
+    stop = threading.Event()
+    if stats_every:
+        threading.Thread(target=_report_stats, args=(writer, stats_every, stop), daemon=True).start()
 
-def run_ws(url, out_path, ping_interval=15):
-    """Connect to WS, write lines to file with periodic heartbeats."""
     def on_message(ws, message):
-        with open(out_path, 'a', encoding='utf-8') as f:
-            f.write(message.strip() + '\n')
+        writer.put(stamp(message, time.time_ns()))
 
     def on_error(ws, error):
         print("[WS] error:", error, file=sys.stderr)
@@ -19,11 +41,39 @@ def run_ws(url, out_path, ping_interval=15):
         print("[WS] closed", close_status_code, close_msg)
 
     ws = websocket.WebSocketApp(url, on_message=on_message, on_error=on_error, on_close=on_close)
-    while True:
-        try:
-            ws.run_forever(ping_interval=ping_interval, ping_timeout=10)
-        except Exception as e:
-            print("[WS] reconnect after error:", e, file=sys.stderr)
-            time.sleep(3)
-        else:
-            break
+
+    # run_forever returns quietly both on Ctrl-C and when the server closes the
+    # connection, so only an explicit stop ends the loop; everything else reconnects.
+    def on_sigint(signum, frame):
+        stop.set()
+        ws.close()
+    prev = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        while not stop.is_set():
+            try:
+                ws.run_forever(ping_interval=ping_interval, ping_timeout=10)
+            except Exception as e:
+                print("[WS] reconnect after error:", e, file=sys.stderr)
+            if not stop.wait(3):
+                print("[WS] reconnecting", file=sys.stderr)
+    finally:
+        signal.signal(signal.SIGINT, prev)
+        stop.set()
+        writer.close()
+        print("[WS] writer closed:", json.dumps(writer.stats()), file=sys.stderr)
+
+@click.command()
+@click.option("--symbol", default="BTCUSDT", show_default=True)
+@click.option("--out", required=True, help="Output path prefix, e.g. data/raw/binance/BTCUSDT/book.jsonl")
+@click.option("--url", default=None, help="WebSocket URL (default: Binance <symbol>@bookTicker).")
+@click.option("--rotate-minutes", default=60.0, show_default=True, help="Start a new file after this many minutes.")
+@click.option("--rotate-mb", default=256, show_default=True, help="Start a new file after this many MB.")
+@click.option("--gzip", "compress", is_flag=True, help="Gzip-compress output files.")
+@click.option("--stats-every", default=60, show_default=True, help="Seconds between queue/drop counter logs (0 = off).")
+def main(symbol, out, url, rotate_minutes, rotate_mb, compress, stats_every):
+    url = url or f"wss://stream.binance.com:9443/ws/{symbol.lower()}@bookTicker"
+    run_ws(url, out, rotate_seconds=rotate_minutes * 60, rotate_bytes=rotate_mb << 20,
+           compress=compress, stats_every=stats_every)
+
+if __name__ == "__main__":
+    main()
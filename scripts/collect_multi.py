@@ -0,0 +1,58 @@
+"""
+Collect book and trade streams for many symbols in one asyncio process.
+
+Usage:
+    python -m scripts.collect_multi --symbols BTCUSDT,ETHUSDT,SOLUSDT --out data/raw/binance/ws --gzip
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sys
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from collector import MultiCollector, BINANCE_STREAM_URL
+
+async def _log_stats(col: MultiCollector, every: float):
+    while True:
+        await asyncio.sleep(every)
+        print("[WS] stats:", json.dumps(col.stats()), file=sys.stderr)
+
+async def _main(col: MultiCollector, duration, stats_every):
+    logger = asyncio.create_task(_log_stats(col, stats_every)) if stats_every else None
+    try:
+        await col.run(duration)
+    finally:
+        if logger:
+            logger.cancel()
+
+@click.command()
+@click.option("--symbols", required=True, help="Comma-separated symbols, e.g. BTCUSDT,ETHUSDT")
+@click.option("--streams", default="bookTicker,aggTrade", show_default=True, help="Comma-separated stream types.")
+@click.option("--out", required=True, help="Output root; files go to <out>/<SYMBOL>/<stream>-*.jsonl")
+@click.option("--url", default=BINANCE_STREAM_URL, show_default=True, help="Combined-stream WebSocket URL.")
+@click.option("--streams-per-conn", default=100, show_default=True, help="Streams per WebSocket connection.")
+@click.option("--rotate-minutes", default=60.0, show_default=True)
+@click.option("--rotate-mb", default=256, show_default=True)
+@click.option("--gzip", "compress", is_flag=True, help="Gzip-compress output files.")
+@click.option("--duration", default=None, type=float, help="Stop after this many seconds (default: run until Ctrl-C).")
+@click.option("--stats-every", default=60, show_default=True, help="Seconds between counter logs (0 = off).")
+def main(symbols, streams, out, url, streams_per_conn, rotate_minutes, rotate_mb, compress, duration, stats_every):
+    col = MultiCollector([s.strip() for s in symbols.split(",") if s.strip()], out,
+                         streams=tuple(s.strip() for s in streams.split(",") if s.strip()),
+                         url=url, streams_per_conn=streams_per_conn,
+                         writer_kwargs={"rotate_seconds": rotate_minutes * 60, "rotate_bytes": rotate_mb << 20,
+                                        "compress": compress})
+    try:
+        asyncio.run(_main(col, duration, stats_every))
+    except KeyboardInterrupt:
+        pass    # run() has already flushed and closed every writer
+    print("[WS] final:", json.dumps(col.stats()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Convert collected bookTicker JSON lines (plain or .gz) into partitioned Parquet.
+
+Usage:
+    python -m scripts.convert_book_jsonl --src data/raw/binance/ws --out data/processed/book --workers 8
+
+Then e.g. ``run_all.py --book data/processed/book/symbol=BTCUSDT``.
+"""
+from __future__ import annotations
+import os
+import sys
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+@click.command()
+@click.option("--src", "sources", multiple=True, required=True, help="JSONL file, directory or glob (repeatable).")
+@click.option("--out", required=True, help="Output root for symbol=/date= partitions.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Parallel processes.")
+@click.option("--assume-ts", type=click.Choice(["drop", "mtime", "error"]), default="drop", show_default=True,
+              help="Lines with no timestamp (unstamped spot lines): drop them with a warning, stamp them with "
+                   "the file's modification time, or fail.")
+def main(sources, out, workers, assume_ts):
+    from book_jsonl import convert_book_files
+    totals = convert_book_files(list(sources), out, workers=workers, assume_ts=assume_ts)
+    for part, n in sorted(totals.items()):
+        print(f"{part}: {n} rows")
+    print(f"[OK] {sum(totals.values())} book rows written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,49 @@
 """
-Convert Binance Vision aggTrades CSV into pseudo order book (bid/ask).
+Convert aggTrades into a pseudo order book (bid/ask) in constant memory.
+
+The side of each trade comes from the buyer-maker flag, prices are snapped to
+the tick grid and the last bid/ask is carried across chunks, so spreads reflect
+the actual buy/sell alternation (see ``src/book_sim.py``).
 
 Handles:
-- headerless CSV (first row is data, not header)
+- Binance Vision CSV with or without header, or its .zip archive
 - timestamp in microseconds / milliseconds / seconds
-- price as string
+- downloader CSVs, Parquet files and tick store directories
+
+Output ``ts`` is tz-naive UTC, as everywhere else in the project (the old
+converter wrote ``+00:00`` strings; readers accept both).
 
 Usage:
     python -m scripts.convert_trades_to_book \
         --trades data/raw/binance/BTCUSDT/BTCUSDT-aggTrades-2025-08-01.csv \
         --out data/raw/binance/BTCUSDT/book.csv \
-        --spread-frac 0.0001
+        --tick-size 0.01 --bucket 100ms
 """
 from __future__ import annotations
-import pandas as pd
+import os
+import sys
 import click
-import numpy as np
-
-COLS = ["aggTradeId","price","quantity","firstTradeId","lastTradeId","timestamp","isBuyerMaker","isBestMatch"]
-
-def _read_aggtrades(path: str) -> pd.DataFrame:
-    """Read aggTrades CSV robustly (with or without header)."""
-    # Try headerless
-    df = pd.read_csv(path, header=None)
-    if df.shape[1] >= 8 and str(df.iloc[0,0]).isdigit():
-        df = df.iloc[:, :8]
-        df.columns = COLS
-    else:
-        df = pd.read_csv(path)
-        if not set(["timestamp","price","quantity"]).issubset(df.columns):
-            df = pd.read_csv(path, header=None, names=COLS)
-    return df
 
-def _infer_unit(ts_series: pd.Series) -> str:
-    mx = float(np.nanmax(pd.to_numeric(ts_series, errors="coerce")))
-    if mx > 1e14:
-        return "us"
-    if mx > 1e12:
-        return "ms"
-    return "s"
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
 
 @click.command()
-@click.option("--trades", required=True, help="Path to aggTrades CSV")
-@click.option("--out", required=True, help="Output book CSV")
+@click.option("--trades", required=True, help="aggTrades CSV/zip, Parquet file or tick store directory")
+@click.option("--out", required=True, help="Output book file (.csv or .parquet)")
+@click.option("--tick-size", default=0.01, show_default=True, type=float, help="Price tick size to snap quotes to")
 @click.option("--spread-frac", default=0.0001, show_default=True, type=float,
-              help="Relative half-spread to apply around trade price")
-def main(trades: str, out: str, spread_frac: float):
-    df = _read_aggtrades(trades)
-
-    ts_col = "timestamp"
-    price_col = "price"
-    if ts_col not in df.columns:
-        raise ValueError("CSV must have a 'timestamp' column.")
-    if price_col not in df.columns:
-        raise ValueError("CSV must have a 'price' column.")
-
-    unit = _infer_unit(df[ts_col])
-    ts = pd.to_datetime(pd.to_numeric(df[ts_col], errors="coerce"), unit=unit, utc=True)
-    price = pd.to_numeric(df[price_col], errors="coerce")
-
-    bid = price * (1 - spread_frac)
-    ask = price * (1 + spread_frac)
-
-    out_df = pd.DataFrame({"ts": ts, "bid": bid, "ask": ask}).dropna()
-    out_df.to_csv(out, index=False)
-    print(f"✅ Pseudo order book saved to {out} with unit={unit}, rows={len(out_df)}")
+              help="Relative distance of a side that has not traded yet")
+@click.option("--max-spread-ticks", default=100, show_default=True, type=int,
+              help="Pull a stale side in to at most this many ticks from the fresh one")
+@click.option("--bucket", default=None, help="Keep one snapshot per time bucket, e.g. 100ms or 1s")
+@click.option("--chunksize", default=1_000_000, show_default=True, type=int, help="Trades per chunk")
+def main(trades: str, out: str, tick_size: float, spread_frac: float, max_spread_ticks: int, bucket, chunksize: int):
+    from book_sim import convert_trades_to_book
+    b = convert_trades_to_book(trades, out, tick_size=tick_size, spread_frac=spread_frac,
+                               max_spread_ticks=max_spread_ticks, bucket=bucket, chunksize=chunksize)
+    print(f"✅ Pseudo order book saved to {out}: trades={b.rows_in}, rows={b.rows_out}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,103 @@
+"""
+Cross-symbol lead-lag analysis: aligned bar matrix, FFT cross-correlations of
+returns and order flow, Hayashi-Yoshida correlation on asynchronous ticks.
+
+Writes the aligned matrices, a lead-lag table, heatmaps and cross-correlation
+curves under ``--results`` with an artifact manifest, and renders a report.
+"""
+from __future__ import annotations
+import os
+import sys
+import click
+
+# Make 'src' importable for both `python scripts/cross_asset.py` and `python -m scripts.cross_asset`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+def _parse_inputs(items):
+    paths = {}
+    for item in items:
+        if "=" not in item:
+            raise click.BadParameter(f"Expected SYMBOL=PATH, got {item!r}", param_hint="--trades")
+        sym, path = item.split("=", 1)
+        if not os.path.exists(path):
+            raise click.BadParameter(f"Path does not exist: {path}", param_hint="--trades")
+        paths[sym.strip().upper()] = path
+    if len(paths) < 2:
+        raise click.UsageError("Give at least two symbols (--trades BTCUSDT=... --trades ETHUSDT=...).")
+    return paths
+
+@click.command()
+@click.option("--trades", "inputs", multiple=True, required=True,
+              help="SYMBOL=PATH of trades (.parquet/.csv or tick store directory); repeat per symbol.")
+@click.option("--bar", default="1s", show_default=True, help="Bar interval of the aligned matrix.")
+@click.option("--max-lag", default=60, show_default=True, help="Largest lead/lag in bars, both directions.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Symbols processed in parallel.")
+@click.option("--no-hy", is_flag=True, help="Skip Hayashi-Yoshida on ticks.")
+@click.option("--results", default=os.path.join(PROJECT_ROOT, "results", "cross_asset"), show_default=True,
+              help="Output directory for matrices, tables, figures and manifest.")
+@click.option("--report", "report_html", default=os.path.join(PROJECT_ROOT, "reports", "cross_asset.html"),
+              show_default=True, help="HTML report path.")
+def main(inputs, bar, max_lag, workers, no_hy, results, report_html):
+    """Lead-lag table and heatmaps across symbols."""
+    from crossasset import compute_symbols, align_bars, lead_lag_table, lead_lag_matrix, bar_seconds
+    from report import new_manifest, add_table, add_figure, write_manifest, render_manifest
+    from scripts.run_all import _read_any
+    import viz
+
+    paths = _parse_inputs(inputs)
+    figs_dir = os.path.join(results, "figures"); os.makedirs(figs_dir, exist_ok=True)
+    tbls_dir = os.path.join(results, "tables"); os.makedirs(tbls_dir, exist_ok=True)
+
+    feats = compute_symbols(paths, bar, reader=_read_any, workers=workers)
+    per_symbol = {s: f["bars"] for s, f in feats.items()}
+    aligned = {}
+    for var in ("logret", "flow_imb"):
+        mat = align_bars(per_symbol, var, bar)
+        if mat.shape[1] >= 2:
+            aligned[var] = mat
+            mat.to_parquet(os.path.join(results, f"bars_{var}.parquet"))
+    if not aligned:
+        raise click.UsageError("The symbols' bars do not overlap in time.")
+    ticks = None if no_hy else {s: (f["tick_ts"], f["tick_logp"]) for s, f in feats.items()}
+    table, curves = lead_lag_table(aligned, max_lag, bar, ticks=ticks)
+
+    manifest = new_manifest(title="Cross-Asset Lead-Lag", symbol=", ".join(paths), bar=bar)
+    csv_path = os.path.join(tbls_dir, "lead_lag.csv")
+    table.to_csv(csv_path, index=False)
+    add_table(manifest, "lead_lag", csv_path, table.round(4).to_html(index=False, classes="stats", justify="center"))
+
+    for var in aligned:
+        lag_m = lead_lag_matrix(table, var, "peak_lag_s")
+        band = float(table.loc[table["variable"] == var, "band"].max())
+        p = os.path.join(figs_dir, f"lead_lag_{var}.png")
+        viz.lead_lag_heatmap(lag_m, title=f"Peak lead-lag, {var} (row leads column if > 0; |corr| band {band:.3f})",
+                             value_label="seconds", path=p, annot=lead_lag_matrix(table, var, "peak_corr"))
+        add_figure(manifest, f"Lead-lag heatmap ({var})", p,
+                   "Colour: lag of the peak |cross-correlation| in seconds; numbers: correlation at that lag. "
+                   f"Peaks within ±{band:.3f} are indistinguishable from independent series.")
+        lags, pairs, rho = curves[var]
+        p = os.path.join(figs_dir, f"xcorr_{var}.png")
+        viz.xcorr_plot(lags, {f"{a}→{b}": r for (a, b), r in zip(pairs, rho)}, title=f"Cross-correlation of {var}",
+                       lag_seconds=bar_seconds(bar), path=p)
+        add_figure(manifest, f"Cross-correlation ({var})", p, "FFT cross-correlation over all lags.")
+    manifest["metrics"] = {"symbols": len(paths), "bars": int(len(next(iter(aligned.values())))),
+                           "max_lag_bars": int(max_lag)}
+    manifest["notes"] = [
+        "Positive lag for (a, b): a at t co-moves with b at t + lag, i.e. a leads b. LLR > 1 also means a leads.",
+        "band: the |correlation| that the largest of the scanned lags' correlations of two independent series "
+        "(n_overlap bars) exceeds with 5% probability. leader is '-' when |peak_corr| is within the band.",
+        "Cross-correlations cover the time range common to all symbols; bars without trades count as zero after demeaning.",
+        "hy_corr: Hayashi-Yoshida correlation of tick log prices, free of the synchronization (Epps) bias of bars; "
+        "hy_peak_lag_s: the shift over the same lag grid with the largest |HY correlation|.",
+    ]
+    manifest_path = write_manifest(os.path.join(results, "manifest.json"), manifest)
+    os.makedirs(os.path.dirname(os.path.abspath(report_html)), exist_ok=True)
+    render_manifest(manifest_path, report_html, templates_dir=os.path.join(PROJECT_ROOT, "templates"))
+    click.echo(table.to_string(index=False))
+    click.echo(f"[OK] Report saved to: {report_html}")
+
+if __name__ == "__main__":
+    main()
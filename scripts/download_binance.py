@@ -1,9 +1,21 @@
 """
-CLI for downloading historical trades from Binance and saving CSV.
+CLI for downloading historical trades from Binance and saving CSV or Parquet parts.
 """
 from __future__ import annotations
+import os
+import sys
 import click
-from src.downloader import download_agg_trades
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+def _to_ms(s: str) -> int:
+    import pandas as pd
+    ts = pd.Timestamp(s)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return int(ts.value // 1_000_000)
 
 @click.group()
 def cli():
@@ -14,8 +26,23 @@ def cli():
 @click.option("--start", required=True, help="UTC start time, e.g., '2025-08-01 00:00'")
 @click.option("--end", required=True, help="UTC end time, e.g., '2025-08-01 06:00'")
 @click.option("--out", default="data/raw/binance/BTCUSDT", show_default=True)
-def trades(symbol, start, end, out):
-    out_file = download_agg_trades(symbol, start, end, out_dir=out)
+@click.option("--workers", default=8, show_default=True, help="Concurrent windows in flight.")
+@click.option("--window", "window_s", default=60, show_default=True, help="Window length in seconds.")
+@click.option("--mode", type=click.Choice(["time", "id"]), default="time", show_default=True,
+              help="Pagination: concurrent time windows, or fromId cursor with gap detection.")
+@click.option("--format", "fmt", type=click.Choice(["csv", "parquet"]), default="csv", show_default=True,
+              help="parquet: stream id-cursor pages into resumable part files under <out>/aggTrades.")
+@click.option("--rows-per-part", default=500_000, show_default=True, help="Rows per Parquet part file.")
+def trades(symbol, start, end, out, workers, window_s, mode, fmt, rows_per_part):
+    import pandas as pd
+    from downloader import download_agg_trades, stream_agg_trades
+    start_ms, end_ms = _to_ms(start), _to_ms(end)
+    if fmt == "parquet":
+        out_dir = stream_agg_trades(symbol, start_ms, end_ms, os.path.join(out, "aggTrades"), rows_per_part=rows_per_part)
+        print(f"Wrote {out_dir}")
+        return
+    out_csv = os.path.join(out, f"{symbol.upper()}-aggTrades-{pd.Timestamp(start):%Y%m%d%H%M}-{pd.Timestamp(end):%Y%m%d%H%M}.csv")
+    out_file = download_agg_trades(symbol, start_ms, end_ms, out_csv, workers=workers, window_ms=window_s * 1000, mode=mode)
     print(f"Wrote {out_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+"""
+Write synthetic trades and top-of-book (tick stores, Parquet or CSV) for tests and benchmarks.
+"""
+from __future__ import annotations
+import os, sys, time
+import click
+
+# Make 'src' importable for both `python scripts/generate_synthetic.py` and `python -m scripts.generate_synthetic`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+@click.command()
+@click.option("--rows", default="1e6", show_default=True, help="Number of trades (e.g. 1e4 ... 1e9).")
+@click.option("--out", default=os.path.join(PROJECT_ROOT, "data", "synthetic"), show_default=True,
+              help="Output directory.")
+@click.option("--format", "fmt", type=click.Choice(["store", "parquet", "csv"]), default="store", show_default=True,
+              help="Tick store directories, single parquet files, or CSVs.")
+@click.option("--chunk-rows", default=1_000_000, show_default=True, help="Rows generated (and held in memory) per chunk.")
+@click.option("--seed", default=0, show_default=True, help="Random seed; output is identical for any --chunk-rows.")
+@click.option("--start", default="2025-08-01", show_default=True, help="Timestamp of the first trade.")
+@click.option("--price", default=30_000.0, show_default=True, help="Initial mid price.")
+@click.option("--trades-per-sec", default=20.0, show_default=True, help="Base trade intensity.")
+def main(rows, out, fmt, chunk_rows, seed, start, price, trades_per_sec):
+    """Generate synthetic trades and top-of-book with realistic stylized facts."""
+    from synth import SynthParams, write_synthetic
+    n = int(float(rows))
+    t0 = time.perf_counter()
+    info = write_synthetic(out, n, chunk_rows=chunk_rows, seed=seed, fmt=fmt,
+                           params=SynthParams(start=start, price0=price, trades_per_sec=trades_per_sec))
+    dt = time.perf_counter() - t0
+    click.echo(f"Wrote {info['rows']:,} trades ({fmt}) to {out} in {dt:.1f}s ({info['rows'] / max(dt, 1e-9):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
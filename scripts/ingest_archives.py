@@ -0,0 +1,35 @@
+"""
+Ingest Binance Vision aggTrades zip archives into the partitioned Parquet tick store.
+
+Usage:
+    python -m scripts.ingest_archives --src data/archives/BTCUSDT \
+        --src "data/archives/BTCUSDT-aggTrades-2025-08-*.zip" \
+        --out data/processed/BTCUSDT/aggTrades --workers 8
+"""
+from __future__ import annotations
+import os
+import sys
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+@click.command()
+@click.option("--src", "sources", multiple=True, required=True, help="Directory or glob of .zip archives (repeatable).")
+@click.option("--out", required=True, help="Tick store root, e.g. data/processed/BTCUSDT/aggTrades")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Parallel processes.")
+@click.option("--rows-per-part", default=1_000_000, show_default=True, help="Rows per Parquet part file.")
+@click.option("--force", is_flag=True, help="Re-ingest archives already recorded in the ledger.")
+def main(sources, out, workers, rows_per_part, force):
+    from ingest import ingest_archives
+    res = ingest_archives(list(sources), out, workers=workers, rows_per_part=rows_per_part, force=force)
+    print(f"[OK] ingested={res['ingested']} skipped={res['skipped']} failed={len(res['failed'])}")
+    for name, err in res["failed"].items():
+        print(f"[FAIL] {name}: {err}", file=sys.stderr)
+    if res["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
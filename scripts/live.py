@@ -0,0 +1,75 @@
+"""
+Live analytics: keep bars, spread, rolling vol and order flow per symbol in
+bounded ring buffers and publish a JSON snapshot at a fixed cadence.
+
+Usage:
+    # live from Binance combined streams (optionally also recording to disk)
+    python -m scripts.live --symbols BTCUSDT,ETHUSDT --snapshot reports/live.json
+    # replay collected JSONL files as fast as possible
+    python -m scripts.live --replay data/raw/binance/ws/BTCUSDT --snapshot reports/live.json --udp 127.0.0.1:9999
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sys
+import click
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+async def _publish_every(cadence):
+    while True:
+        await asyncio.sleep(cadence.every)
+        cadence.tick(force=True)
+
+async def _run_live(col, cadence, duration):
+    pub = asyncio.create_task(_publish_every(cadence))
+    try:
+        await col.run(duration)
+    finally:
+        pub.cancel()
+        cadence.tick(force=True)
+
+@click.command()
+@click.option("--symbols", default=None, help="Comma-separated symbols to stream live.")
+@click.option("--replay", multiple=True, help="Collected JSONL files/directories/globs to replay instead, merged by event time.")
+@click.option("--bar", default="1s", show_default=True, help="Bar size, e.g. 100ms, 1s.")
+@click.option("--bars", "bar_capacity", default=3600, show_default=True, help="Bars kept per symbol.")
+@click.option("--ticks", "tick_capacity", default=100_000, show_default=True, help="Trades kept per symbol.")
+@click.option("--snapshot", default="reports/live.json", show_default=True, help="JSON file rewritten every --every seconds.")
+@click.option("--udp", default=None, help="Also send snapshots as UDP datagrams to HOST:PORT.")
+@click.option("--every", default=1.0, show_default=True, help="Snapshot cadence in seconds.")
+@click.option("--record", default=None, help="Live mode: also write stamped messages under this directory.")
+@click.option("--duration", default=None, type=float, help="Live mode: stop after this many seconds.")
+def main(symbols, replay, bar, bar_capacity, tick_capacity, snapshot, udp, every, record, duration):
+    if not symbols and not replay:
+        raise click.UsageError("Pass --symbols for live streaming or --replay for recorded files.")
+    from live import LiveHub, JsonFilePublisher, UdpPublisher, Cadence, run_replay_files
+    hub = LiveHub(bar=bar, bar_capacity=bar_capacity, tick_capacity=tick_capacity)
+    publishers = [JsonFilePublisher(snapshot)]
+    if udp:
+        host, port = udp.rsplit(":", 1)
+        publishers.append(UdpPublisher(host, int(port)))
+    cadence = Cadence(hub, publishers, every=every)
+
+    if replay:
+        from book_jsonl import find_jsonl
+        paths = find_jsonl(list(replay))
+        stats = run_replay_files(hub, paths, cadence)
+        print("[live] replay:", json.dumps(stats), file=sys.stderr)
+        return
+
+    from collector import MultiCollector
+    col = MultiCollector([s.strip() for s in symbols.split(",") if s.strip()], record,
+                         on_message=lambda stream, raw, recv_ns: hub.on_message(raw, recv_ns))
+    try:
+        asyncio.run(_run_live(col, cadence, duration))
+    except KeyboardInterrupt:
+        pass
+    print("[live] final:", json.dumps(col.stats()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,16 @@ Prepare/clean data and write processed parquet for downstream steps.
 Supports running with only trades or only book.
 """
 from __future__ import annotations
+import os
 import pathlib
+import sys
 import click
-import pandas as pd
-from src.data_cleaning import clean_trades, clean_book
+
+# Make 'src' importable for both `python scripts/prepare_data.py` and `python -m scripts.prepare_data`
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
 
 TRADE_COLS = [
     "aggTradeId","price","quantity","firstTradeId",
@@ -18,6 +24,9 @@ TRADE_COLS = [
 @click.option("--trades", default="", help="Path to trades CSV (aggTrades/trades)")
 @click.option("--book", default="", help="Path to book CSV (ts,bid,ask)")
 def main(use_sample, trades, book):
+    import pandas as pd
+    from data_cleaning import clean_trades, clean_book
+
     base = pathlib.Path(".")
     if use_sample:
         trades = base / "data" / "sample" / "sample_trades.csv"
@@ -1,24 +1,52 @@
-import os
-import pandas as pd
-import numpy as np
+"""
+Headline metrics of a run_all run: best fits, tail indices, spread and realized-vol stats.
+"""
+from __future__ import annotations
+import os, sys
+import click
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
 RESULTS = os.path.join(PROJECT_ROOT, "results")
 TABLES = os.path.join(RESULTS, "tables")
+# Bars files up to this many rows are loaded for exact stats (~25 bytes per row for the columns used)
+EXACT_MAX_ROWS = 20_000_000
 
 def _read_csv_safe(path):
+    import pandas as pd
     return pd.read_csv(path) if os.path.exists(path) else pd.DataFrame()
 
 def summarize_spread(bars):
-    """Return median/iqr of spread in basis points."""
-    if "spread_bp" not in bars.columns:
+    """Return median/iqr of spread in basis points, from bars or a ``KLLSketch`` of ``spread_bp``.
+
+    Bars give exact quantiles (``rank_error`` 0); a sketch gives estimates within
+    its ``rank_error`` of the exact ranks.
+    """
+    import numpy as np
+    from sketch import KLLSketch, rank_error
+    if isinstance(bars, KLLSketch):
+        if bars.n == 0:
+            return None
+        p25, med, p75, p99 = bars.quantile([0.25, 0.5, 0.75, 0.99])
+        n, err = bars.n, rank_error(bars.k)
+    elif "spread_bp" in bars.columns:
+        s = bars["spread_bp"].dropna()
+        if s.empty:
+            return None
+        p25, med, p75, p99 = np.quantile(s, [0.25, 0.5, 0.75, 0.99])
+        n, err = s.shape[0], 0.0
+    else:
         return None
-    s = bars["spread_bp"].dropna()
     return {
-        "median_bp": float(np.median(s)),
-        "p25_bp": float(np.quantile(s, 0.25)),
-        "p75_bp": float(np.quantile(s, 0.75)),
-        "n": int(s.shape[0]),
+        "median_bp": float(med),
+        "p25_bp": float(p25),
+        "p75_bp": float(p75),
+        "p99_bp": float(p99),
+        "n": int(n),
+        "rank_error": err,
     }
 
 def realized_vol_stats(bars):
@@ -39,9 +67,10 @@ def realized_vol_stats(bars):
     per_hour = None
     if isinstance(r.index, pd.DatetimeIndex):
         # 'H' -> 'h' to avoid FutureWarning; group with matching index length
-        key = r.index.floor("h")
-        per_hour = r.groupby(key).apply(lambda x: float(np.square(x).sum()))
+        per_hour = np.square(r).groupby(r.index.floor("h")).sum()
+    return _rv_summary(rv_total, per_hour)
 
+def _rv_summary(rv_total, per_hour):
     return {
         "rv_total": rv_total,
         "rv_per_hour_min": float(per_hour.min()) if per_hour is not None and len(per_hour) else None,
@@ -86,22 +115,69 @@ def pareto_alpha(volume_fit):
     nums = _parse_params_numbers(p_rows.iloc[0]["params"])
     return float(nums[0]) if nums else None
 
-if __name__ == "__main__":
-    # You can dump a feather/parquet of bars in run_all, or re-create here if needed.
-    # For now, we read fit tables and (optionally) a cached bars parquet if you exported it.
-    spread_fit = _read_csv_safe(os.path.join(TABLES, "spread_fit.csv"))
-    volume_fit = _read_csv_safe(os.path.join(TABLES, "volume_fit.csv"))
-    returns_fit = _read_csv_safe(os.path.join(TABLES, "returns_fit.csv"))
-
-    # If you exported bars to results/bars.parquet in run_all, you can load it:
-    bars_path = os.path.join(RESULTS, "bars.parquet")
-    bars = pd.read_parquet(bars_path) if os.path.exists(bars_path) else pd.DataFrame()
-    if not bars.empty and "ts" in bars.columns:
-        bars["ts"] = pd.to_datetime(bars["ts"])
-        bars = bars.set_index("ts").sort_index()
-
-    spread_stats = summarize_spread(bars) if not bars.empty else None
-    rv_stats = realized_vol_stats(bars) if not bars.empty else None
+def stream_bar_stats(bars_path, batch_rows=1_000_000):
+    """Spread quantiles and realized-vol stats of a bars parquet, one row batch at a time.
+
+    Memory stays at one batch plus a sketch and the per-hour sums, whatever the number of bars.
+    """
+    import numpy as np
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from sketch import KLLSketch
+    pf = pq.ParquetFile(bars_path, memory_map=True)
+    cols = [c for c in ("ts", "spread_bp", "logret") if c in pf.schema_arrow.names]
+    has_spread, has_ret = "spread_bp" in cols, "logret" in cols and "ts" in cols
+    spread = KLLSketch(seed=0)
+    rv_total, hours, n_ret = 0.0, [], 0
+    for batch in pf.iter_batches(batch_size=batch_rows, columns=cols):
+        df = batch.to_pandas()
+        if has_spread:
+            spread.update(df["spread_bp"].to_numpy())
+        if has_ret:
+            r = pd.Series(df["logret"].to_numpy(), index=pd.to_datetime(df["ts"])).dropna()
+            rv_total += float(np.square(r).sum())
+            n_ret += len(r)
+            hours.append(np.square(r).groupby(r.index.floor("h")).sum())
+    spread_stats = summarize_spread(spread) if has_spread else None
+    rv_stats = None
+    if n_ret:
+        # An hour split across batches appears in several partial sums
+        per_hour = pd.concat(hours).groupby(level=0).sum()
+        rv_stats = _rv_summary(rv_total, per_hour)
+    return spread_stats, rv_stats
+
+def bar_stats(bars_path, stream=False, max_exact_rows=EXACT_MAX_ROWS):
+    """Spread and realized-vol stats of a bars parquet: exact when it fits in memory, else streamed.
+
+    Files of up to ``max_exact_rows`` bars are loaded (only the three columns
+    used) for exact quantiles; larger ones, or any with ``stream``, go through
+    ``stream_bar_stats``.
+    """
+    import pandas as pd
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(bars_path)
+    if stream or pf.metadata.num_rows > max_exact_rows:
+        return stream_bar_stats(bars_path)
+    cols = [c for c in ("ts", "spread_bp", "logret") if c in pf.schema_arrow.names]
+    bars = pd.read_parquet(bars_path, columns=cols)
+    if "ts" in bars.columns:
+        bars = bars.set_index(pd.to_datetime(bars["ts"]))
+    return summarize_spread(bars), realized_vol_stats(bars)
+
+@click.command()
+@click.option("--results", default=RESULTS, show_default=True, help="Results directory of a run_all run.")
+@click.option("--stream", is_flag=True,
+              help=f"Sketch spread quantiles over row batches even if bars.parquet has at most {EXACT_MAX_ROWS:,} rows.")
+def main(results, stream):
+    """Print headline metrics (best fits, tail indices, spread and realized-vol stats) of a run."""
+    # Reads the fit tables and the bars parquet exported by run_all.
+    tables = os.path.join(results, "tables")
+    spread_fit = _read_csv_safe(os.path.join(tables, "spread_fit.csv"))
+    volume_fit = _read_csv_safe(os.path.join(tables, "volume_fit.csv"))
+    returns_fit = _read_csv_safe(os.path.join(tables, "returns_fit.csv"))
+
+    bars_path = os.path.join(results, "bars.parquet")
+    spread_stats, rv_stats = bar_stats(bars_path, stream=stream) if os.path.exists(bars_path) else (None, None)
 
     summary = {
         "spread_best": top_fit_params(spread_fit, "spread"),
@@ -113,3 +189,6 @@ if __name__ == "__main__":
         "rv_stats": rv_stats,
     }
     print(summary)
+
+if __name__ == "__main__":
+    main()
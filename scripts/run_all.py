@@ -1,7 +1,8 @@
-
+from __future__ import annotations
 import os, sys
+from functools import partial
+from typing import TYPE_CHECKING, List, Optional
 import click
-import pandas as pd
 
 # Make 'src' importable for both `python scripts/run_all.py` and `python -m scripts.run_all`
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -9,14 +10,17 @@ for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
     if p not in sys.path:
         sys.path.insert(0, p)
 
-from data_cleaning import clean_trades, clean_book
-from features import resample_trades, add_returns, rolling_vol, compute_spread_from_book, merge_trade_book
-from fit import fit_candidates, select_candidates_for_variable
-from report import build_report, default_context
-import viz
+# Only light modules at import time: pandas, scipy, matplotlib and jinja2 load inside the stages
+# that use them, so `--help`, `--list-stages` and `--fits-only` start fast.
+from pipeline import Stage, Pipeline
+from profiling import StageProfiler, NULL_PROFILER
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 def _read_csv_auto(path: str) -> pd.DataFrame:
     """Read CSV and auto-detect headerless Binance aggTrades (8 columns)."""
+    import pandas as pd
     try:
         head = pd.read_csv(path, header=None, nrows=1)
         ncols = head.shape[1]
@@ -31,7 +35,11 @@ def _read_csv_auto(path: str) -> pd.DataFrame:
     return pd.read_csv(path)
 
 def _read_any(path: str) -> pd.DataFrame:
-    """Read parquet OR CSV (including compressed)."""
+    """Read parquet OR CSV (including compressed), or a partitioned tick store directory."""
+    import pandas as pd
+    if os.path.isdir(path):
+        from tickstore import read_ticks
+        return read_ticks(path)
     p = str(path).lower()
     if p.endswith(('.parquet', '.pq')):
         return pd.read_parquet(path)
@@ -42,19 +50,264 @@ def _read_any(path: str) -> pd.DataFrame:
     except Exception:
         return _read_csv_auto(path)
 
+def _fmt_params(p):
+    if isinstance(p, str):
+        return p  # already string
+    try:
+        return "(" + ", ".join([f"{float(x):.4f}" for x in p]) + ")"
+    except Exception:
+        return str(p)
+
+def _save_table(df, name, tbls_dir):
+    """Write a fit table to CSV; returns ``(name, path, html)`` for the manifest."""
+    # Round numeric columns
+    df = df.round(4)
+    # Format params column nicely if exists
+    if "params" in df.columns:
+        df["params"] = df["params"].apply(_fmt_params)
+    path = os.path.join(tbls_dir, f"{name}.csv")
+    df.to_csv(path, index=False)
+    # Pre-render the report table once: round floats and truncate long strings
+    if "params" in df.columns:
+        df["params"] = df["params"].astype(str).apply(lambda s: s[:40] + "..." if len(s) > 40 else s)
+    return name, path, df.to_html(index=False, classes="stats", justify="center")
+
+# (table name, variable, source frame, column, positive_only)
+FITS = [
+    ("spread_fit", "spread", "bars", "spread_bp", True),
+    ("volume_fit", "volume", "sizes", "qty", True),
+    ("returns_fit", "returns", "bars", "logret", False),
+    ("absret_fit", "absret", "bars", "absret", True),
+]
+
+# Imported before profiling starts, so their one-off load time is not charged to whichever stage imports first
+PROFILE_WARM_IMPORTS = ["pandas", "pyarrow.parquet", "scipy.stats", "matplotlib.pyplot", "data_cleaning", "features",
+                        "fit", "viz", "report"]
+
+NOTES = [
+    "Spreads and trade sizes show right heavy tails (lognormal/gamma/pareto candidates).",
+    "Short-horizon returns exhibit symmetric heavy tails (Student-t) and volatility clustering (|returns| ACF).",
+    "When order book is available, spread in bps is computed against midprice.",
+]
+
+def fit_stage(name, var, src, col, positive_only, tbls_dir, profiler=None, **inputs):
+    from fit import fit_candidates, select_candidates_for_variable
+    data = inputs[src]
+    if col not in data.columns:
+        return None
+    df_fit = fit_candidates(data[col].values, select_candidates_for_variable(var), positive_only=positive_only,
+                            profiler=profiler)
+    return _save_table(df_fit, name, tbls_dir)
+
+# --- figures: each returns a list of {"title","path","caption"}; module level so they run in worker processes ---
+
+def draw(profiler, name, *args, path, **kw):
+    import viz
+    fn = getattr(viz, name)
+    prof = profiler or NULL_PROFILER
+    with prof.section("figure:" + os.path.basename(path), rows_in=prof.count_rows(args)):
+        fn(*args, path=path, **kw)
+
+def fig_price_vol(figs_dir, bars, profiler=None):
+    if not {"close","vol_roll"}.issubset(bars.columns):
+        return []
+    p = os.path.join(figs_dir, "ts_price_vol.png")
+    draw(profiler, "ts_plot", bars[["close","vol_roll"]].dropna(), ["close","vol_roll"], title="Close & Rolling Volatility", path=p)
+    return [{"title":"Close & Rolling Volatility","path":p,"caption":"Bar close price and rolling volatility."}]
+
+def fig_spread(figs_dir, bars, profiler=None):
+    if "spread_bp" not in bars.columns:
+        return []
+    x = bars["spread_bp"].dropna().values
+    p1 = os.path.join(figs_dir, "spread_hist_ecdf.png")
+    draw(profiler, "hist_with_ecdf", x, title="Spread (bp)", path=p1)
+    p2 = os.path.join(figs_dir, "spread_qq_t.png")
+    draw(profiler, "qq_plot", x, dist_name="lognorm", path=p2)
+    p3 = os.path.join(figs_dir, "spread_tail.png")
+    draw(profiler, "loglog_tail_plot", x, path=p3)
+    return [
+        {"title":"Spread histogram & ECDF","path":p1,"caption":"Distribution of spread in basis points."},
+        {"title":"Spread QQ vs lognormal","path":p2,"caption":"QQ plot for lognormal fit."},
+        {"title":"Spread tail (CCDF)","path":p3,"caption":"Heavy-tail inspection in log-log scale."},
+    ]
+
+def fig_volume(figs_dir, sizes, profiler=None):
+    if "qty" not in sizes.columns:
+        return []
+    x = sizes["qty"].dropna().values
+    p1 = os.path.join(figs_dir, "volume_hist_ecdf.png")
+    draw(profiler, "hist_with_ecdf", x, title="Trade size (qty)", path=p1)
+    p2 = os.path.join(figs_dir, "volume_qq_lognorm.png")
+    draw(profiler, "qq_plot", x, dist_name="lognorm", path=p2)
+    p3 = os.path.join(figs_dir, "volume_tail.png")
+    draw(profiler, "loglog_tail_plot", x, path=p3)
+    return [
+        {"title":"Trade size histogram & ECDF","path":p1,"caption":"Distribution of trade sizes."},
+        {"title":"Trade size QQ vs lognormal","path":p2,"caption":"QQ plot for lognormal fit."},
+        {"title":"Trade size tail (CCDF)","path":p3,"caption":"Heavy-tail inspection of trade sizes."},
+    ]
+
+def fig_returns(figs_dir, bars, profiler=None):
+    if "logret" not in bars.columns:
+        return []
+    x = bars["logret"].dropna().values
+    p1 = os.path.join(figs_dir, "returns_hist_ecdf.png")
+    draw(profiler, "hist_with_ecdf", x, title="Log returns", path=p1)
+    p2 = os.path.join(figs_dir, "returns_qq_t.png")
+    draw(profiler, "qq_plot", x, dist_name="t", path=p2)
+    # |returns| ACF
+    p3 = os.path.join(figs_dir, "acf_abs_returns.png")
+    draw(profiler, "acf_abs_returns", bars["absret"].values, nlags=60, path=p3)
+    return [
+        {"title":"Log returns histogram & ECDF","path":p1,"caption":"Distribution of bar log returns."},
+        {"title":"Returns QQ vs Student-t","path":p2,"caption":"QQ plot for Student-t fit."},
+        {"title":"ACF of |returns|","path":p3,"caption":"Volatility clustering diagnostic."},
+    ]
+
+def fig_heatmap(figs_dir, bars, profiler=None):
+    # intraday heatmap (use spread_bp if present, else absret)
+    if "spread_bp" in bars.columns:
+        p = os.path.join(figs_dir, "heatmap_spread.png")
+        draw(profiler, "intraday_heatmap", bars, value_col="spread_bp", path=p)
+        return [{"title":"Intraday heatmap (spread bp)","path":p,"caption":"Minute × date mean spread."}]
+    if "absret" in bars.columns:
+        p = os.path.join(figs_dir, "heatmap_absret.png")
+        draw(profiler, "intraday_heatmap", bars, value_col="absret", path=p)
+        return [{"title":"Intraday heatmap (|returns|)","path":p,"caption":"Minute × date mean |returns|."}]
+    return []
+
+FIGURES = [(fig_price_vol, "bars"), (fig_spread, "bars"), (fig_volume, "sizes"),
+           (fig_returns, "bars"), (fig_heatmap, "bars")]
+
+def build_stages(trades: str, book: Optional[str], bar: str, results_dir: str, with_figures: bool = True,
+                 prof: StageProfiler = NULL_PROFILER, shards: int = 1) -> List[Stage]:
+    """Declare the pipeline: load → bars → (export, fits, figures) → manifest → report."""
+    figs_dir = os.path.join(results_dir, "figures")
+    tbls_dir = os.path.join(results_dir, "tables")
+
+    def load_trades():
+        from data_cleaning import clean_trades
+        with prof.section("read_trades") as s:
+            raw = _read_any(trades); s.rows_out = len(raw)
+        with prof.section("clean_trades", rows_in=len(raw)) as s:
+            tdf = clean_trades(raw); s.rows_out = len(tdf)
+        return tdf
+
+    def load_book():
+        from data_cleaning import clean_book
+        from features import compute_spread_from_book
+        with prof.section("read_book") as s:
+            raw = _read_any(book); s.rows_out = len(raw)
+        with prof.section("clean_book", rows_in=len(raw)) as s:
+            bdf = compute_spread_from_book(clean_book(raw)); s.rows_out = len(bdf)
+        return bdf
+
+    def store_bars():
+        from sharding import sharded_store_outputs
+        with prof.section("sharded_bars") as s:
+            out = sharded_store_outputs(trades, book, bar, shards=shards, workers=shards)
+            s.rows_in, s.rows_out = out["trades"] + out["book_rows"], len(out["bars"])
+        return out["bars"], out["sizes"], {"trades": out["trades"], "book_rows": out["book_rows"]}
+
+    def make_bars(tdf, bdf=None):
+        if shards > 1:
+            from sharding import sharded_features
+            with prof.section("sharded_bars", rows_in=len(tdf)) as s:
+                bars = sharded_features(tdf, bdf, bar, shards=shards, workers=shards); s.rows_out = len(bars)
+            return bars
+        from features import (resample_trades, add_returns, rolling_vol, merge_trade_book,
+                              VOL_WINDOW, VOL_MIN_PERIODS)
+        with prof.section("resample", rows_in=len(tdf)) as s:
+            bars = resample_trades(tdf, rule=bar); s.rows_out = len(bars)
+        with prof.section("returns", rows_in=len(bars)):
+            bars = add_returns(bars, price_col="close")
+            bars["vol_roll"] = rolling_vol(bars, col="logret", window=VOL_WINDOW, min_periods=VOL_MIN_PERIODS)
+        if bdf is not None and {"mid","spread_bp"}.issubset(bdf.columns):
+            with prof.section("merge", rows_in=len(bars) + len(bdf)) as s:
+                bars = merge_trade_book(bars, bdf); s.rows_out = len(bars)
+        return bars
+
+    def export_bars(bars):
+        # --- Export bars for quick_metrics (make sure index -> 'ts') ---
+        bars_out = os.path.join(results_dir, "bars.parquet")
+        idx_name = bars.index.name or "ts"
+        bars_reset = bars.reset_index()
+        if idx_name != "ts":
+            bars_reset = bars_reset.rename(columns={idx_name: "ts"})
+        bars_reset.to_parquet(bars_out, index=False)
+        bars_reset.to_csv(os.path.join(results_dir, "bars.csv"), index=False)
+        return bars_out
+
+    def trade_sizes(tdf):
+        return tdf[[c for c in ["qty"] if c in tdf.columns]]
+
+    def metrics(tdf, bars, bdf=None):
+        return store_metrics(bars, {"trades": len(tdf), "book_rows": len(bdf) if bdf is not None else 0})
+
+    def store_metrics(bars, counts):
+        return {
+            "trades": int(counts["trades"]),
+            "book_rows": int(counts["book_rows"]),
+            "bars": int(len(bars)),
+            "start": str(bars.index.min()),
+            "end": str(bars.index.max()),
+        }
+
+    has_book = bool(book)
+    bars_in = ["tdf", "bdf"] if has_book else ["tdf"]
+    # Sharded bars over tick stores: workers read their own ranges and also return the trade sizes and row
+    # counts, so the parent never loads the ticks
+    from_store = shards > 1 and bool(trades) and os.path.isdir(trades) and (not has_book or os.path.isdir(book))
+    if from_store:
+        stages = [
+            Stage("bars", store_bars, outputs=["bars", "sizes", "counts"]),
+            Stage("export_bars", export_bars, inputs=["bars"], outputs=["bars_file"]),
+            Stage("metrics", store_metrics, inputs=["bars", "counts"], outputs=["metrics"]),
+        ]
+    else:
+        stages = [Stage("load_trades", load_trades, outputs=["tdf"])]
+        if has_book:
+            stages.append(Stage("load_book", load_book, outputs=["bdf"]))
+        stages += [
+            Stage("bars", make_bars, inputs=bars_in, outputs=["bars"]),
+            Stage("export_bars", export_bars, inputs=["bars"], outputs=["bars_file"]),
+            Stage("trade_sizes", trade_sizes, inputs=["tdf"], outputs=["sizes"]),
+            Stage("metrics", metrics, inputs=["tdf", "bars"] + (["bdf"] if has_book else []), outputs=["metrics"]),
+        ]
+    # Fits and figures are CPU-bound Python: they run on the process pool (trade sizes, not all ticks, are sent)
+    for name, var, src, col, pos in FITS:
+        stages.append(Stage(f"fit_{var}", partial(fit_stage, name, var, src, col, pos, tbls_dir), inputs=[src],
+                            outputs=[name], process=True, imports=["fit"]))
+    if with_figures:
+        for fn, src in FIGURES:
+            stages.append(Stage(fn.__name__, partial(fn, figs_dir), inputs=[src], outputs=[fn.__name__],
+                                process=True, imports=["viz"]))
+    return stages
+
 @click.command()
-@click.option("--trades", type=click.Path(exists=False), help="Path to trades file (.parquet or .csv)." )
-@click.option("--book", type=click.Path(exists=False), default=None, help="Path to top-of-book file (.parquet or .csv)." )
+@click.option("--trades", type=click.Path(exists=False), help="Path to trades file (.parquet or .csv) or tick store directory." )
+@click.option("--book", type=click.Path(exists=False), default=None, help="Path to top-of-book file (.parquet or .csv) or partitioned book directory." )
 @click.option("--bar", default="1s", show_default=True, help="Bar interval, e.g. 1s, 100ms, 1min." )
 @click.option("--symbol", default="BTCUSDT", show_default=True, help="Symbol label for report/figures." )
 @click.option("--use-sample", is_flag=True, help="Use bundled sample data without specifying --trades/--book.")
 @click.option("--fits-only", is_flag=True, help="Run only distribution fitting, skip figures and report.")
-def main(trades: str, book: str, bar: str, symbol: str, use_sample: bool, fits_only: bool):
+@click.option("--only", multiple=True, help="Run only these stages (comma-separated or repeated) and what they depend on.")
+@click.option("--until", default=None, help="Run stages in pipeline order up to and including this one.")
+@click.option("--workers", default=None, type=int, help="Stages run concurrently on this many threads, fits and figures on as many processes [default: 4, 1 with --profile].")
+@click.option("--shards", default=1, show_default=True, help="Compute bars over this many time shards in parallel processes (same result as 1); with tick store directories the ticks are never loaded whole.")
+@click.option("--list-stages", is_flag=True, help="Print the stages and their inputs, then exit.")
+@click.option("--profile", is_flag=True, help="Record wall/CPU time, rows and high-water RSS per stage to results/profile.{json,csv} and the report.")
+@click.option("--profile-memory", is_flag=True, help="With --profile, also trace peak memory per section (tracemalloc; several times slower).")
+@click.option("--profile-dir", default=None, help="With --profile, also dump a cProfile .prof per stage into this directory.")
+def main(trades: str, book: str, bar: str, symbol: str, use_sample: bool, fits_only: bool,
+         only, until, workers: Optional[int], shards: int, list_stages: bool, profile: bool, profile_memory: bool,
+         profile_dir: Optional[str]):
     """Run the full analysis pipeline: clean → features → fit → visualize → HTML report."""
     results_dir = os.path.join(PROJECT_ROOT, "results")
     figs_dir = os.path.join(results_dir, "figures"); os.makedirs(figs_dir, exist_ok=True)
     tbls_dir = os.path.join(results_dir, "tables"); os.makedirs(tbls_dir, exist_ok=True)
     rep_dir = os.path.join(PROJECT_ROOT, "reports"); os.makedirs(rep_dir, exist_ok=True)
+    manifest_path = os.path.join(results_dir, "manifest.json")
 
     if use_sample:
         # Keep your original file names if different
@@ -67,170 +320,79 @@ def main(trades: str, book: str, bar: str, symbol: str, use_sample: bool, fits_o
             alt = os.path.join(PROJECT_ROOT, "data", "sample", "sample_book.csv")
             if os.path.exists(alt): book = alt
 
-    if not trades or not os.path.exists(trades):
-        raise click.UsageError("Trades path missing. Provide --trades or --use-sample.")
-    tdf = _read_any(trades)
-    tdf = clean_trades(tdf)
-
-    bdf = None
-    if book:
-        if not os.path.exists(book):
+    if not list_stages:
+        if not trades or not os.path.exists(trades):
+            raise click.UsageError("Trades path missing. Provide --trades or --use-sample.")
+        if book and not os.path.exists(book):
             raise click.UsageError(f"Book path does not exist: {book}")
-        bdf = _read_any(book)
-        bdf = clean_book(bdf)
-        bdf = compute_spread_from_book(bdf)
-
-    # === Features ===
-    bars = resample_trades(tdf, rule=bar)
-    bars = add_returns(bars, price_col="close")
-    bars["vol_roll"] = rolling_vol(bars, col="logret", window=60, min_periods=20)
-    if bdf is not None and {"mid","spread_bp"}.issubset(bdf.columns):
-        bars = merge_trade_book(bars, bdf)
-        
-    # --- Export bars for quick_metrics (make sure index -> 'ts') ---
-    bars_out = os.path.join(results_dir, "bars.parquet")
-    idx_name = bars.index.name or "ts"
-    bars_reset = bars.reset_index()
-    if idx_name != "ts":
-        bars_reset = bars_reset.rename(columns={idx_name: "ts"})
-    bars_reset.to_parquet(bars_out, index=False)
-    bars_reset.to_csv(os.path.join(results_dir, "bars.csv"), index=False)
-    
-    # === Fitting per variable ===
-    # volume from trades (tick size) and from bars (vol): both are useful; we'll use trades qty
-    fit_tables = {}
-    def _save_table(df, name):
-        # Round numeric columns
-        df = df.round(4)
-
-        # Format params column nicely if exists
-        if "params" in df.columns:
-            def fmt_params(p):
-                if isinstance(p, str):
-                    return p  # already string
-                try:
-                    return "(" + ", ".join([f"{float(x):.4f}" for x in p]) + ")"
-                except Exception:
-                    return str(p)
-            df["params"] = df["params"].apply(fmt_params)
-
-        path = os.path.join(tbls_dir, f"{name}.csv")
-        df.to_csv(path, index=False)
-        return path
-
-    # spread
-    if "spread_bp" in bars.columns:
-        cand = select_candidates_for_variable("spread")
-        df_fit = fit_candidates(bars["spread_bp"].values, cand, positive_only=True)
-        fit_tables["spread_fit"] = _save_table(df_fit, "spread_fit")
-
-    # volume (tick-level qty)
-    if "qty" in tdf.columns:
-        cand = select_candidates_for_variable("volume")
-        df_fit = fit_candidates(tdf["qty"].values, cand, positive_only=True)
-        fit_tables["volume_fit"] = _save_table(df_fit, "volume_fit")
-
-    # returns
-    if "logret" in bars.columns:
-        cand = select_candidates_for_variable("returns")
-        df_fit = fit_candidates(bars["logret"].values, cand, positive_only=False)
-        fit_tables["returns_fit"] = _save_table(df_fit, "returns_fit")
-        # absret
-        cand = select_candidates_for_variable("absret")
-        df_fit = fit_candidates(bars["absret"].values, cand, positive_only=True)
-        fit_tables["absret_fit"] = _save_table(df_fit, "absret_fit")
-        
-    if fits_only:
-        print("[OK] Fits completed (CI mode).")
-        return
-    
-    # === Figures ===
-    figs = []
 
-    # price and volatility
-    if {"close","vol_roll"}.issubset(bars.columns):
-        p = os.path.join(figs_dir, "ts_price_vol.png")
-        viz.ts_plot(bars[["close","vol_roll"]].dropna(), ["close","vol_roll"], title="Close & Rolling Volatility", path=p)
-        figs.append({"title":"Close & Rolling Volatility","path":os.path.relpath(p, rep_dir),"caption":"Bar close price and rolling volatility."})
+    prof = StageProfiler(trace_memory=profile_memory, dump_dir=profile_dir) if profile else NULL_PROFILER
+    # Stage times (and process-wide peak memory) are attributable only when stages run one at a time
+    workers = workers or (1 if profile else 4)
+    stages = build_stages(trades, book, bar, results_dir, with_figures=not fits_only, prof=prof,
+                          shards=shards)
+    fit_outputs = [name for name, *_ in FITS]
+    fig_outputs = [st.outputs[0] for st in stages if st.name.startswith("fig_")]
 
-    # spread visuals
-    if "spread_bp" in bars.columns:
-        x = bars["spread_bp"].dropna().values
-        p1 = os.path.join(figs_dir, "spread_hist_ecdf.png")
-        viz.hist_with_ecdf(x, title="Spread (bp)", path=p1)
-        p2 = os.path.join(figs_dir, "spread_qq_t.png")
-        viz.qq_plot(x, dist_name="lognorm", path=p2)
-        p3 = os.path.join(figs_dir, "spread_tail.png")
-        viz.loglog_tail_plot(x, path=p3)
-        figs += [
-            {"title":"Spread histogram & ECDF","path":os.path.relpath(p1, rep_dir),"caption":"Distribution of spread in basis points."},
-            {"title":"Spread QQ vs lognormal","path":os.path.relpath(p2, rep_dir),"caption":"QQ plot for lognormal fit."},
-            {"title":"Spread tail (CCDF)","path":os.path.relpath(p3, rep_dir),"caption":"Heavy-tail inspection in log-log scale."},
-        ]
+    def write(metrics=None, **parts):
+        from report import new_manifest, add_table, add_figure, write_manifest
+        manifest = new_manifest(title="HFT Microstructure Summary", symbol=symbol, bar=bar)
+        manifest["metrics"] = metrics or {}
+        for name in fit_outputs:
+            if parts.get(name):
+                add_table(manifest, *parts[name])
+        for name in fig_outputs:
+            for fig in parts.get(name) or []:
+                add_figure(manifest, fig["title"], fig["path"], fig["caption"])
+        manifest["notes"] = NOTES
+        manifest["timings"].update(pipe.timings)
+        if prof.enabled:
+            manifest["profile"] = prof.table().astype(object).where(lambda d: d.notna(), None).to_dict("records")
+        write_manifest(manifest_path, manifest)
+        return manifest_path
 
-    # volume visuals (tick qty)
-    if "qty" in tdf.columns:
-        x = tdf["qty"].dropna().values
-        p1 = os.path.join(figs_dir, "volume_hist_ecdf.png")
-        viz.hist_with_ecdf(x, title="Trade size (qty)", path=p1)
-        p2 = os.path.join(figs_dir, "volume_qq_lognorm.png")
-        viz.qq_plot(x, dist_name="lognorm", path=p2)
-        p3 = os.path.join(figs_dir, "volume_tail.png")
-        viz.loglog_tail_plot(x, path=p3)
-        figs += [
-            {"title":"Trade size histogram & ECDF","path":os.path.relpath(p1, rep_dir),"caption":"Distribution of trade sizes."},
-            {"title":"Trade size QQ vs lognormal","path":os.path.relpath(p2, rep_dir),"caption":"QQ plot for lognormal fit."},
-            {"title":"Trade size tail (CCDF)","path":os.path.relpath(p3, rep_dir),"caption":"Heavy-tail inspection of trade sizes."},
-        ]
+    def report(manifest_file):
+        from report import render_manifest
+        out_html = os.path.join(rep_dir, "summary.html")
+        with prof.section("render_report"):
+            render_manifest(manifest_file, out_html, templates_dir=os.path.join(PROJECT_ROOT, "templates"))
+        return out_html
 
-    # returns visuals
-    if "logret" in bars.columns:
-        x = bars["logret"].dropna().values
-        p1 = os.path.join(figs_dir, "returns_hist_ecdf.png")
-        viz.hist_with_ecdf(x, title="Log returns", path=p1)
-        p2 = os.path.join(figs_dir, "returns_qq_t.png")
-        viz.qq_plot(x, dist_name="t", path=p2)
-        figs += [
-            {"title":"Log returns histogram & ECDF","path":os.path.relpath(p1, rep_dir),"caption":"Distribution of bar log returns."},
-            {"title":"Returns QQ vs Student-t","path":os.path.relpath(p2, rep_dir),"caption":"QQ plot for Student-t fit."},
-        ]
-        # |returns| ACF
-        p3 = os.path.join(figs_dir, "acf_abs_returns.png")
-        viz.acf_abs_returns(bars["absret"].values, nlags=60, path=p3)
-        figs.append({"title":"ACF of |returns|","path":os.path.relpath(p3, rep_dir),"caption":"Volatility clustering diagnostic."})
+    stages.append(Stage("manifest", write, inputs=["metrics"] + fit_outputs + fig_outputs, outputs=["manifest_file"]))
+    if not fits_only:
+        stages.append(Stage("report", report, inputs=["manifest_file"], outputs=["report_html"]))
+    pipe = Pipeline(stages)
 
-    # intraday heatmap (use spread_bp if present, else absret)
-    if "spread_bp" in bars.columns:
-        p = os.path.join(figs_dir, "heatmap_spread.png")
-        viz.intraday_heatmap(bars, value_col="spread_bp", path=p)
-        figs.append({"title":"Intraday heatmap (spread bp)","path":os.path.relpath(p, rep_dir),"caption":"Minute × date mean spread."})
-    elif "absret" in bars.columns:
-        p = os.path.join(figs_dir, "heatmap_absret.png")
-        viz.intraday_heatmap(bars, value_col="absret", path=p)
-        figs.append({"title":"Intraday heatmap (|returns|)","path":os.path.relpath(p, rep_dir),"caption":"Minute × date mean |returns|."})
+    if list_stages:
+        for n in pipe.order:
+            st = pipe.stages[n]
+            click.echo(f"{n:<14} <- {', '.join(st.inputs) or '-'}")
+        return
 
-    # === Tables for report context ===
-    import pandas as pd
-    stats_tables = []
-    for name, csvp in fit_tables.items():
-        df = pd.read_csv(csvp)
-        # Round floats and truncate long strings
-        df = df.round(4)
-        if "params" in df.columns:
-            df["params"] = df["params"].astype(str).apply(lambda s: s[:40] + "..." if len(s) > 40 else s)
-        # Add CSS class 'stats'
-        stats_tables.append({"name": name, "table": df.to_html(index=False, classes="stats", justify="center")})
-
-    # === Build report ===
-    ctx = default_context(title="HFT Microstructure Summary", symbol=symbol, bar=bar)
-    ctx["figures"] = figs
-    ctx["stats_tables"] = stats_tables
-    ctx["notes"] = [
-        "Spreads and trade sizes show right heavy tails (lognormal/gamma/pareto candidates).",            "Short-horizon returns exhibit symmetric heavy tails (Student-t) and volatility clustering (|returns| ACF).",            "When order book is available, spread in bps is computed against midprice.",
-    ]
-    out_html = os.path.join(PROJECT_ROOT, "reports", "summary.html")
-    build_report(out_html, ctx)
-    print(f"[OK] Report saved to: {out_html}")
+    selected = [s.strip() for item in only for s in item.split(",") if s.strip()]
+    if prof.enabled:
+        import importlib
+        with prof.section("warm_imports"):
+            for mod in PROFILE_WARM_IMPORTS:
+                importlib.import_module(mod)
+    prof.start()
+    try:
+        arts = pipe.run(workers=workers, only=selected or None, until=until,
+                        profiler=prof if prof.enabled else None)
+    except KeyError as e:
+        raise click.UsageError(str(e.args[0]))
+    finally:
+        prof.stop()
+    if prof.enabled:
+        prof.write(os.path.join(results_dir, "profile.json"), os.path.join(results_dir, "profile.csv"))
+        print(f"[OK] Profile saved to: {os.path.join(results_dir, 'profile.json')}")
+    summ = pipe.summary()
+    print(f"[OK] {len(pipe.timings)} stages: wall {summ['wall']:.2f}s, "
+          f"sum {summ['sum']:.2f}s, critical path {summ['critical_path']:.2f}s")
+    if "report_html" in arts:
+        print(f"[OK] Report saved to: {arts['report_html']}")
+    elif "manifest_file" in arts:
+        print("[OK] Fits completed (CI mode)." if fits_only else f"[OK] Manifest saved to: {arts['manifest_file']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,213 @@
+"""
+Benchmark suite for the hot functions and the end-to-end pipeline.
+
+Each case is timed on synthetic data (``synth.generate``) at several sizes:
+best-of-``repeat`` wall time untraced, then one extra run under ``tracemalloc``
+for the peak memory. Results are keyed ``<case>@<size>`` and compared with a
+baseline JSON file: a case regresses when its throughput drops, or its peak
+memory grows, by more than ``threshold`` (relative).
+
+Fits and figures work on at most ``FIT_CAP`` values, since their cost is
+dominated by scipy/matplotlib rather than by input size beyond that.
+
+``bars_store_w<n>`` shards the bars over a tick store with ``n`` worker
+processes; its result also carries ``speedup``, the ``bars_store_serial``
+(load everything, then bars) best time over its own.
+
+Startup cases run ``hft <args>`` in a fresh interpreter and regress when their
+best wall time exceeds ``STARTUP_BUDGET_S``, regardless of the baseline.
+"""
+from __future__ import annotations
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cli import COMMANDS as CLI_COMMANDS
+from profiling import StageProfiler
+
+BENCH_SIZES = (10_000, 100_000, 1_000_000)
+FIT_CAP = 100_000
+
+# `hft` invocations that must stay cheap: nothing heavy may be imported before a stage needs it
+# `hft --help`, every subcommand's --help, and a stage listing
+STARTUP_COMMANDS = ((("--help",),) + tuple((name, "--help") for name in sorted(CLI_COMMANDS))
+                    + (("run", "--list-stages", "--use-sample"),))
+STARTUP_BUDGET_S = 0.5
+
+# Worker counts of the sharded tick store cases, each compared with bars_store_serial
+SHARD_WORKERS = (1, 2, 4, 8)
+SPEEDUP_BASES = {f"bars_store_w{w}": "bars_store_serial" for w in SHARD_WORKERS}
+
+# (name, func, rows processed)
+Case = Tuple[str, Callable[[], Any], int]
+
+def default_cases(trades, book, bar: str = "1s", fig_dir: Optional[str] = None,
+                  store_dir: Optional[str] = None) -> List[Case]:
+    """Cases over the hot functions, with inputs prepared outside the timed call.
+
+    With ``store_dir``, the frames are also written there as tick stores for the sharding cases.
+    """
+    from data_cleaning import clean_trades, clean_book
+    from features import resample_trades, add_returns, rolling_vol, compute_spread_from_book, merge_trade_book
+    from fit import fit_candidates, select_candidates_for_variable
+    from sharding import serial_features, sharded_features, sharded_features_from_store
+
+    n = len(trades)
+    raw = trades.assign(ts=trades["ts"].astype("int64") // 1_000_000)     # ms ints, as in the CSVs
+    raw_book = book.assign(ts=book["ts"].astype("int64") // 1_000_000)
+    tdf = clean_trades(raw)
+    bdf = compute_spread_from_book(clean_book(raw_book))
+    bars = add_returns(resample_trades(tdf, bar))
+    bars["vol_roll"] = rolling_vol(bars)
+    merged = merge_trade_book(bars, bdf)
+    spread = bdf["spread_bp"].to_numpy()[:FIT_CAP]
+    logret = bars["logret"].to_numpy()[:FIT_CAP]
+
+    cases: List[Case] = [
+        ("clean_trades", lambda: clean_trades(raw), n),
+        ("clean_book", lambda: clean_book(raw_book), n),
+        ("compute_spread_from_book", lambda: compute_spread_from_book(clean_book(raw_book)), n),
+        ("resample_trades", lambda: resample_trades(tdf, bar), n),
+        ("add_returns_rolling_vol", lambda: rolling_vol(add_returns(bars)), len(bars)),
+        ("merge_trade_book", lambda: merge_trade_book(bars, bdf), len(bars) + n),
+        ("bars_serial", lambda: serial_features(tdf, bdf, bar), n),
+        # One shard per core; compare with bars_serial for the parallel speed-up
+        ("bars_sharded", lambda: sharded_features(tdf, bdf, bar), n),
+        ("fit_spread", lambda: fit_candidates(spread, select_candidates_for_variable("spread"), positive_only=True),
+         len(spread)),
+        ("fit_returns", lambda: fit_candidates(logret, select_candidates_for_variable("returns")), len(logret)),
+    ]
+    if store_dir:
+        from tickstore import PartWriter, read_ticks
+        troot, broot = os.path.join(store_dir, "trades"), os.path.join(store_dir, "book")
+        with PartWriter(troot) as tw, PartWriter(broot, id_col=None) as bw:
+            tw.write(trades)
+            bw.write(book)
+        cases.append(("bars_store_serial", lambda: serial_features(
+            clean_trades(read_ticks(troot)), compute_spread_from_book(clean_book(read_ticks(broot))), bar), n))
+        cases += [(f"bars_store_w{w}", lambda w=w: sharded_features_from_store(troot, broot, bar, shards=w, workers=w),
+                   n) for w in SHARD_WORKERS]
+    if fig_dir:
+        import viz
+        x = spread
+        cases += [
+            ("viz_hist_with_ecdf", lambda: viz.hist_with_ecdf(x, path=os.path.join(fig_dir, "h.png")), len(x)),
+            ("viz_qq_plot", lambda: viz.qq_plot(x, dist_name="lognorm", path=os.path.join(fig_dir, "q.png")), len(x)),
+            ("viz_loglog_tail_plot", lambda: viz.loglog_tail_plot(x, path=os.path.join(fig_dir, "t.png")), len(x)),
+            ("viz_acf_abs_returns", lambda: viz.acf_abs_returns(merged["absret"].to_numpy(), nlags=60,
+                                                               path=os.path.join(fig_dir, "a.png")), len(merged)),
+            ("viz_intraday_heatmap", lambda: viz.intraday_heatmap(merged, value_col="spread_bp",
+                                                                 path=os.path.join(fig_dir, "m.png")), len(merged)),
+        ]
+    return cases
+
+def time_case(func: Callable[[], Any], rows: int, repeat: int = 3) -> Dict[str, Any]:
+    """Best-of-``repeat`` wall time, throughput and traced peak memory of one case."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    prof = StageProfiler()
+    prof.start()
+    try:
+        with prof.section("case"):
+            func()
+    finally:
+        prof.stop()
+    return {"rows": rows, "best_s": best, "rows_per_s": rows / best if best > 0 else None,
+            "peak_mb": prof.records[-1]["peak_mb"]}
+
+def time_startup(args: Iterable[str] = ("--help",), repeat: int = 3,
+                 budget_s: float = STARTUP_BUDGET_S) -> Dict[str, Any]:
+    """Best-of-``repeat`` wall time of ``hft <args>`` in a new interpreter."""
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, cli, *args], check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - t0)
+    return {"best_s": best, "budget_s": budget_s}
+
+def run_startup(commands: Iterable[Iterable[str]] = STARTUP_COMMANDS, repeat: int = 3,
+                budget_s: float = STARTUP_BUDGET_S,
+                log: Callable[[str], None] = lambda s: None) -> Dict[str, Dict[str, Any]]:
+    """Startup cases keyed ``startup:<args>``."""
+    results = {}
+    for args in commands:
+        key = "startup:" + " ".join(args)
+        results[key] = dict(time_startup(args, repeat, budget_s), case="startup", size=None)
+        log(f"{key}: {results[key]['best_s']:.3f}s (budget {budget_s:.2f}s)")
+    return results
+
+def run_benchmarks(sizes: Iterable[int] = BENCH_SIZES, repeat: int = 3, seed: int = 0, bar: str = "1s",
+                   only: Optional[Iterable[str]] = None, figures: bool = True,
+                   extra_cases: Optional[Callable[[Any, Any, str], List[Case]]] = None,
+                   log: Callable[[str], None] = lambda s: None) -> Dict[str, Dict[str, Any]]:
+    """Run every case at every size; returns ``{"<case>@<size>": result}``."""
+    from synth import generate
+    only = set(only) if only else None
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            trades, book = generate(int(size), seed=seed)
+            cases = default_cases(trades, book, bar, fig_dir=tmp if figures else None,
+                                  store_dir=os.path.join(tmp, f"store_{int(size)}"))
+            if extra_cases:
+                cases += extra_cases(trades, book, tmp)
+            for name, func, rows in cases:
+                if only and name not in only:
+                    continue
+                res = time_case(func, rows, repeat)
+                base = results.get(f"{SPEEDUP_BASES.get(name)}@{int(size)}")
+                if base:
+                    res["speedup"] = base["best_s"] / res["best_s"]
+                results[f"{name}@{int(size)}"] = dict(res, case=name, size=int(size))
+                log(f"{name}@{int(size)}: {res['best_s']:.4f}s, {res['rows_per_s'] or 0:,.0f} rows/s, "
+                    f"peak {res['peak_mb']:.1f} MB" + (f", {res['speedup']:.2f}x" if "speedup" in res else ""))
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float = 0.25, min_mb: float = 1.0) -> List[Dict[str, Any]]:
+    """Regressions of ``results`` against ``baseline`` beyond ``threshold`` (relative)."""
+    out = []
+    for key, cur in sorted(results.items()):
+        if cur.get("budget_s") is not None and cur["best_s"] > cur["budget_s"]:
+            out.append({"key": key, "metric": "startup_s", "baseline": cur["budget_s"], "current": cur["best_s"],
+                        "change": cur["best_s"] / cur["budget_s"] - 1})
+        base = baseline.get(key)
+        if not base:
+            continue
+        if base.get("rows_per_s") and cur.get("rows_per_s") is not None \
+                and cur["rows_per_s"] < base["rows_per_s"] * (1 - threshold):
+            out.append({"key": key, "metric": "rows_per_s", "baseline": base["rows_per_s"], "current": cur["rows_per_s"],
+                        "change": cur["rows_per_s"] / base["rows_per_s"] - 1})
+        if base.get("peak_mb") is not None and cur.get("peak_mb") is not None \
+                and cur["peak_mb"] > base["peak_mb"] * (1 + threshold) and cur["peak_mb"] - base["peak_mb"] > min_mb:
+            out.append({"key": key, "metric": "peak_mb", "baseline": base["peak_mb"], "current": cur["peak_mb"],
+                        "change": cur["peak_mb"] / max(base["peak_mb"], 1e-9) - 1})
+    return out
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+def save_results(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    """Write results with the machine/library versions they were measured on."""
+    import numpy as np
+    import pandas as pd
+    meta = {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    os.replace(tmp, path)
@@ -0,0 +1,126 @@
+"""
+Convert collected bookTicker JSON lines into partitioned Parquet book frames.
+
+Accepts the collectors' output (plain or ``.gz``): stamped combined-stream lines
+``{"recv_ns":..,"stream":"btcusdt@bookTicker","data":{...}}``, stamped raw lines
+``{"recv_ns":..,"u":..,"s":..,"b":..}`` and unstamped raw lines. Files are parsed
+by pyarrow's block-parallel JSON reader against an explicit schema, and every
+field extraction / cast is a vectorized Arrow compute call, no ``json.loads``
+per line. Output matches what ``clean_book``/``compute_spread_from_book`` expect::
+
+    <out>/symbol=<SYMBOL>/date=YYYY-MM-DD/<source>.parquet
+    columns: ts, bid, ask, bid_size, ask_size, event_ts, recv_ts, update_id
+
+``ts`` is the exchange event time when the stream carries one (futures ``E``),
+else the local receive time. Unstamped spot lines (no ``E``, no ``recv_ns``, as
+written by the old ``collect_book``) have no time at all. By default they are
+dropped with a warning giving their count. ``assume_ts="mtime"`` stamps them
+with the file's modification time, keeping line order; ``assume_ts="error"``
+rejects the file instead.
+"""
+from __future__ import annotations
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pj
+
+ASSUME_TS = ("drop", "mtime", "error")
+BOOK_COLUMNS = ["ts", "bid", "ask", "bid_size", "ask_size", "event_ts", "recv_ts", "update_id"]
+
+_TICKER = [("u", pa.int64()), ("s", pa.string()), ("b", pa.string()), ("B", pa.string()),
+           ("a", pa.string()), ("A", pa.string()), ("E", pa.int64())]
+SCHEMA = pa.schema([("recv_ns", pa.int64()), ("stream", pa.string()),
+                    ("data", pa.struct(_TICKER))] + _TICKER)
+
+def _field(tbl: pa.Table, name: str) -> pa.ChunkedArray:
+    """``data.<name>`` for combined-stream lines, else the top-level field."""
+    nested = pc.struct_field(tbl["data"], name)
+    return pc.coalesce(nested, tbl[name])
+
+def read_book_jsonl(path: str, block_size: int = 16 << 20, assume_ts: str = "drop") -> pd.DataFrame:
+    """Parse one collected JSONL file (plain or gzipped) into a typed book frame.
+
+    ``assume_ts`` (one of ``ASSUME_TS``) decides what happens to lines without a timestamp.
+    """
+    if assume_ts not in ASSUME_TS:
+        raise ValueError(f"assume_ts must be one of {ASSUME_TS}, got {assume_ts!r}")
+    tbl = pj.read_json(path, read_options=pj.ReadOptions(block_size=block_size),
+                       parse_options=pj.ParseOptions(explicit_schema=SCHEMA, unexpected_field_behavior="ignore"))
+    if tbl.num_rows == 0:
+        return pd.DataFrame(columns=["symbol"] + BOOK_COLUMNS)
+    # Keep bookTicker lines only (combined files are per stream, but be strict)
+    is_book = pc.or_kleene(pc.is_null(tbl["stream"]), pc.ends_with(tbl["stream"], "@bookTicker"))
+    tbl = tbl.filter(pc.and_(pc.fill_null(is_book, False), pc.is_valid(_field(tbl, "b"))))
+    recv = tbl["recv_ns"]
+    event = _field(tbl, "E")
+    ts_ns = pc.coalesce(pc.multiply(event, 1_000_000), recv)
+    unstamped = ts_ns.null_count
+    if unstamped and assume_ts == "error":
+        raise ValueError(f"{path}: {unstamped} bookTicker lines have no timestamp (neither E nor recv_ns)")
+    if unstamped and assume_ts == "mtime":
+        ts_ns = pc.fill_null(ts_ns, pa.scalar(os.stat(path).st_mtime_ns, pa.int64()))
+    elif unstamped:
+        print(f"[WARN] {path}: dropped {unstamped} bookTicker lines without a timestamp "
+              f"(--assume-ts mtime stamps them with the file time)", file=sys.stderr)
+    out = pa.table({
+        "symbol": _field(tbl, "s"),
+        "ts": pc.cast(ts_ns, pa.timestamp("ns")),
+        "bid": pc.cast(_field(tbl, "b"), pa.float64()),
+        "ask": pc.cast(_field(tbl, "a"), pa.float64()),
+        "bid_size": pc.cast(_field(tbl, "B"), pa.float64()),
+        "ask_size": pc.cast(_field(tbl, "A"), pa.float64()),
+        "event_ts": pc.cast(pc.multiply(event, 1_000_000), pa.timestamp("ns")),
+        "recv_ts": pc.cast(recv, pa.timestamp("ns")),
+        "update_id": _field(tbl, "u"),
+    })
+    out = out.filter(pc.is_valid(out["ts"]))
+    return out.to_pandas().sort_values("ts", kind="stable").reset_index(drop=True)
+
+def _source_stem(path: str) -> str:
+    name = os.path.basename(path)
+    for ext in (".gz", ".jsonl", ".json", ".txt"):
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    return name
+
+def convert_book_file(path: str, out_root: str, assume_ts: str = "drop") -> Dict[str, int]:
+    """Convert one file; returns rows written per ``symbol/date`` partition."""
+    df = read_book_jsonl(path, assume_ts=assume_ts)
+    written: Dict[str, int] = {}
+    if df.empty:
+        return written
+    dates = df["ts"].dt.strftime("%Y-%m-%d")
+    for (sym, date), part in df.groupby([df["symbol"].fillna("UNKNOWN").str.upper(), dates], sort=True):
+        pdir = os.path.join(out_root, f"symbol={sym}", f"date={date}")
+        os.makedirs(pdir, exist_ok=True)
+        dest = os.path.join(pdir, f"{_source_stem(path)}.parquet")
+        part[BOOK_COLUMNS].to_parquet(dest + ".tmp", index=False)
+        os.replace(dest + ".tmp", dest)
+        written[f"{sym}/{date}"] = int(len(part))
+    return written
+
+def find_jsonl(sources: List[str]) -> List[str]:
+    """Expand files, directories (recursively) and globs into JSONL paths."""
+    out = set()
+    for src in sources:
+        if os.path.isdir(src):
+            for ext in ("*.jsonl", "*.jsonl.gz"):
+                out.update(glob.glob(os.path.join(src, "**", ext), recursive=True))
+        else:
+            out.update(glob.glob(src))
+    return sorted(out)
+
+def convert_book_files(sources: List[str], out_root: str, workers: int = 4, assume_ts: str = "drop") -> Dict[str, int]:
+    """Convert many files in parallel processes; returns total rows per partition."""
+    totals: Dict[str, int] = {}
+    paths = find_jsonl(sources)
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        for res in ex.map(convert_book_file, paths, [out_root] * len(paths), [assume_ts] * len(paths)):
+            for k, n in res.items():
+                totals[k] = totals.get(k, 0) + n
+    return totals
@@ -0,0 +1,189 @@
+"""
+Streaming pseudo top-of-book from aggTrades, for users with trades only.
+
+The buyer-maker flag tells which side each trade hit: a buyer-maker trade is a
+taker sell that printed at the bid, any other trade a taker buy at the ask
+(files without the flag fall back to the tick rule). The
+quote after each trade is therefore
+
+- fresh side: the trade price snapped to the tick grid (bid floored, ask ceiled)
+- other side: the last price that side traded at, carried forward (also across
+  chunks), moved to one tick away when it would cross or lock the fresh side and
+  pulled in to at most ``max_spread_ticks`` when it has gone stale; before that
+  side has traded at all it sits ``spread_frac`` of the price away
+
+so spreads follow the alternation of buys and sells instead of being constant.
+Each row depends only on the carried last bid/ask, so the output is the same
+for any chunk size and memory is bounded by one chunk. ``bucket`` keeps only the
+last quote of every time bucket (e.g. "100ms"); the last bucket of a chunk is
+held back until the next chunk shows it is complete.
+"""
+from __future__ import annotations
+import io
+import os
+import zipfile
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_cleaning import to_datetime
+from ingest import parse_aggtrades
+
+BOOK_OUT_COLUMNS = ["ts", "bid", "ask"]
+_RENAME = {"timestamp": "ts", "T": "ts", "quantity": "qty", "q": "qty", "p": "price", "isBuyerMaker": "m"}
+
+def read_trade_chunks(path: str, chunksize: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """Chunks with ``ts, price, qty, m`` from an aggTrades CSV/zip, a project CSV, Parquet or a tick store."""
+    if os.path.isdir(path) or path.endswith(".parquet"):
+        from replay import open_source
+        yield from open_source(path, "trade", batch_rows=chunksize)
+        return
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            for name in sorted(n for n in zf.namelist() if n.lower().endswith(".csv")):
+                with zf.open(name) as member:
+                    yield from parse_aggtrades(member, chunksize=chunksize)
+        return
+    with open(path, "rb") as f:
+        first = f.readline().decode("utf-8", "replace").strip().split(",")[0]
+    if first[:1].isdigit() or first == "agg_trade_id":
+        # Binance Vision layout, with or without its header row
+        with open(path, "rb") as f:
+            yield from parse_aggtrades(io.BufferedReader(f), chunksize=chunksize)
+        return
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk = chunk.rename(columns=_RENAME)
+        chunk["ts"] = to_datetime(chunk["ts"])
+        yield chunk
+
+class TradeBookBuilder:
+    """Carry-state converter from trade chunks to bid/ask rows."""
+
+    def __init__(self, tick_size: float = 0.01, spread_frac: float = 0.0001, max_spread_ticks: int = 100,
+                 bucket: Optional[str] = None):
+        if tick_size <= 0:
+            raise ValueError("tick_size must be positive")
+        self.tick = float(tick_size)
+        self.spread_frac = spread_frac
+        self.max_spread_ticks = max_spread_ticks
+        self.bucket_ns = pd.Timedelta(bucket).value if bucket else None
+        self.last_bid = np.nan      # last sell price on the grid (in ticks)
+        self.last_ask = np.nan      # last buy price on the grid (in ticks)
+        self._last_px = np.nan
+        self._last_sell = np.nan
+        self._pending: Optional[pd.DataFrame] = None
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def _ticks(self, price: np.ndarray, side: str) -> np.ndarray:
+        # Round first so prices already on the grid do not move by float error
+        x = np.round(price / self.tick, 6)
+        return np.floor(x) if side == "bid" else np.ceil(x)
+
+    def _tick_rule(self, price: np.ndarray) -> np.ndarray:
+        # Without the flag: downticks are sells, upticks buys, zero ticks repeat the last side
+        dp = np.diff(price, prepend=self._last_px)
+        s = pd.Series(np.where(dp < 0, 1.0, np.where(dp > 0, 0.0, np.nan)))
+        if np.isnan(s.iat[0]):
+            s.iat[0] = self._last_sell
+        sell = s.ffill().fillna(0.0).to_numpy() > 0
+        self._last_px, self._last_sell = price[-1], float(sell[-1])
+        return sell
+
+    def update(self, trades: pd.DataFrame) -> pd.DataFrame:
+        """Quotes after each trade of a time-ordered chunk (bucketed if configured)."""
+        d = trades.dropna(subset=["ts", "price"])
+        self.rows_in += len(d)
+        if d.empty:
+            return self._emit(pd.DataFrame(columns=BOOK_OUT_COLUMNS))
+        price = d["price"].to_numpy("float64")
+        if "m" in d.columns and d["m"].notna().all():
+            sell = d["m"].to_numpy(bool)
+        else:
+            sell = self._tick_rule(price)
+        bid_t = np.where(sell, self._ticks(price, "bid"), np.nan)
+        ask_t = np.where(~sell, self._ticks(price, "ask"), np.nan)
+        bid_t[0] = bid_t[0] if sell[0] else self.last_bid
+        ask_t[0] = ask_t[0] if not sell[0] else self.last_ask
+        bid = pd.Series(bid_t).ffill().to_numpy()
+        ask = pd.Series(ask_t).ffill().to_numpy()
+        self.last_bid, self.last_ask = bid[-1], ask[-1]
+
+        # Resolve the stale side against the fresh one
+        init = np.maximum(np.ceil(price * self.spread_frac / self.tick), 1.0)
+        cap = float(self.max_spread_ticks)
+        stale_ask = np.where(np.isnan(ask), bid + init, np.minimum(ask, bid + cap))
+        stale_bid = np.where(np.isnan(bid), ask - init, np.maximum(bid, ask - cap))
+        ask = np.where(sell, np.maximum(stale_ask, bid + 1), ask)
+        bid = np.where(~sell, np.minimum(stale_bid, ask - 1), bid)
+
+        out = pd.DataFrame({"ts": d["ts"].to_numpy(), "bid": bid * self.tick, "ask": ask * self.tick})
+        return self._emit(out)
+
+    def _emit(self, out: pd.DataFrame) -> pd.DataFrame:
+        if self.bucket_ns is None:
+            self.rows_out += len(out)
+            return out
+        if self._pending is not None:
+            out = pd.concat([self._pending, out], ignore_index=True)
+            self._pending = None
+        if out.empty:
+            return out
+        b = out["ts"].to_numpy("datetime64[ns]").view("int64") // self.bucket_ns
+        last = np.r_[b[1:] != b[:-1], True]
+        # The chunk's final bucket may continue in the next chunk
+        tail = b == b[-1]
+        self._pending = out[tail].iloc[[-1]]
+        res = out[last & ~tail].reset_index(drop=True)
+        self.rows_out += len(res)
+        return res
+
+    def finish(self) -> pd.DataFrame:
+        """The held-back last bucket, if any."""
+        res = self._pending if self._pending is not None else pd.DataFrame(columns=BOOK_OUT_COLUMNS)
+        self._pending = None
+        self.rows_out += len(res)
+        return res.reset_index(drop=True)
+
+class _BookSink:
+    """Append quote chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._pw = None
+        self._header = True
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if not self.parquet and os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        if self.parquet:
+            tbl = pa.Table.from_pandas(df[BOOK_OUT_COLUMNS].astype({"ts": "datetime64[ns]"}), preserve_index=False)
+            if self._pw is None:
+                self._pw = pq.ParquetWriter(self.path, tbl.schema)
+            self._pw.write_table(tbl)
+        else:
+            df[BOOK_OUT_COLUMNS].to_csv(self.path, mode="a", header=self._header, index=False)
+            self._header = False
+
+    def close(self) -> None:
+        if self._pw is not None:
+            self._pw.close()
+
+def convert_trades_to_book(trades_path: str, out_path: str, tick_size: float = 0.01, spread_frac: float = 0.0001,
+                           max_spread_ticks: int = 100, bucket: Optional[str] = None,
+                           chunksize: int = 1_000_000) -> TradeBookBuilder:
+    """Stream ``trades_path`` into a pseudo book at ``out_path`` (.csv or .parquet)."""
+    builder = TradeBookBuilder(tick_size, spread_frac, max_spread_ticks, bucket)
+    sink = _BookSink(out_path)
+    try:
+        for chunk in read_trade_chunks(trades_path, chunksize):
+            sink.write(builder.update(chunk))
+        sink.write(builder.finish())
+    finally:
+        sink.close()
+    return builder
@@ -0,0 +1,70 @@
+"""
+``hft``: one entry point for the project's scripts.
+
+Subcommands are resolved lazily: ``hft --help`` lists them from the table below
+without importing anything, and ``hft <cmd>`` imports only that script's module
+(which in turn defers pandas/scipy/matplotlib/jinja2 to the work that needs
+them). Each script also still runs on its own (``python -m scripts.run_all``).
+"""
+from __future__ import annotations
+import importlib
+import os
+import sys
+import click
+
+# Make 'scripts' and the flat 'src' modules importable from an editable install or a checkout
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for p in [PROJECT_ROOT, os.path.join(PROJECT_ROOT, "src")]:
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+# name -> ("module:attribute", short help shown by `hft --help`)
+COMMANDS = {
+    "prepare": ("scripts.prepare_data:main", "Clean raw trades/book into data/processed."),
+    "download": ("scripts.download_binance:cli", "Download Binance aggTrades (REST)."),
+    "ingest": ("scripts.ingest_archives:main", "Ingest Binance Vision archives into the tick store."),
+    "collect": ("scripts.collect_multi:main", "Collect book/trade streams for many symbols."),
+    "collect-book": ("scripts.collect_book:main", "Collect one symbol's bookTicker stream."),
+    "convert-book": ("scripts.convert_book_jsonl:main", "Convert collected bookTicker JSONL to Parquet."),
+    "convert-trades": ("scripts.convert_trades_to_book:main", "Build a pseudo book from trades."),
+    "run": ("scripts.run_all:main", "Run the analysis pipeline and build the report."),
+    "cross": ("scripts.cross_asset:main", "Cross-symbol lead-lag table and heatmaps."),
+    "report": ("scripts.build_report:main", "Render reports from artifact manifests."),
+    "metrics": ("scripts.quick_metrics:main", "Print headline metrics from the latest run."),
+    "sketch": ("scripts.build_sketches:main", "Per-day quantile sketches and multi-day summaries."),
+    "live": ("scripts.live:main", "Live analytics over collector streams or replays."),
+    "replay": ("scripts.replay:main", "Replay recorded trades/book by timestamp."),
+    "synth": ("scripts.generate_synthetic:main", "Generate synthetic trades and book."),
+    "bench": ("scripts.bench:main", "Benchmark suite with regression check."),
+}
+
+class LazyGroup(click.Group):
+    """A group whose subcommands are imported on first use."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.lazy_commands:
+            target, _ = self.lazy_commands[cmd_name]
+            module, attr = target.split(":")
+            return getattr(importlib.import_module(module), attr)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        # Help text comes from the table so listing commands imports nothing
+        rows = [(name, self.lazy_commands[name][1]) for name in sorted(self.lazy_commands)]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS, context_settings={"help_option_names": ["-h", "--help"]})
+def main():
+    """HFT data analysis: collect, prepare, analyze and report on tick data."""
+
+if __name__ == "__main__":
+    main(prog_name="hft")
@@ -0,0 +1,246 @@
+"""
+Building blocks for market-data collectors.
+
+``RotatingWriter`` decouples the network thread from disk I/O: ``put`` only
+appends to a bounded in-memory queue, and a background thread drains it in
+batches into time/size-rotated (optionally gzip-compressed) JSON-lines files.
+When the queue is full new messages are dropped and counted rather than
+blocking the socket (which would miss pings and get disconnected).
+
+``MultiCollector`` is an asyncio collector for many symbols: book and trade
+streams are subscribed over a few combined-stream connections, each message is
+stamped with the local receive time and routed to a per-symbol, per-stream
+``RotatingWriter``. Connections reconnect with jittered exponential backoff and
+resubscribe, including after a clean close by the server.
+"""
+from __future__ import annotations
+import asyncio
+import gzip
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+
+try:
+    import websockets
+    _HAS_WEBSOCKETS = True
+except Exception:
+    _HAS_WEBSOCKETS = False
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+_STOP = object()
+
+class RotatingWriter:
+    """Queue-backed background writer with rotation and flush-on-close."""
+
+    def __init__(self, out_path: str, rotate_seconds: float = 3600, rotate_bytes: int = 256 << 20,
+                 compress: bool = False, max_queue: int = 200_000, batch: int = 5000):
+        self.out_path = out_path
+        self.rotate_seconds = rotate_seconds
+        self.rotate_bytes = rotate_bytes
+        self.compress = compress
+        self.batch = batch
+        self.q: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.written = 0
+        self.files = 0
+        self.current_path: Optional[str] = None
+        self._f = None
+        self._opened_at = 0.0
+        self._bytes = 0
+        self._thread = threading.Thread(target=self._run, name="rotating-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, line: str) -> bool:
+        """Enqueue one line without blocking; returns False (and counts) when dropped."""
+        try:
+            self.q.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queue_depth": self.q.qsize(), "dropped": self.dropped, "written": self.written,
+                "files": self.files, "current": self.current_path}
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write everything still queued, close the current file and stop the thread."""
+        self.q.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+
+    def _path_for(self, now: float) -> str:
+        root, ext = os.path.splitext(self.out_path)
+        started = datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = f"{root}-{started}-{self.files:04d}{ext or '.jsonl'}"
+        return path + ".gz" if self.compress else path
+
+    def _open(self) -> None:
+        now = time.time()
+        self.current_path = self._path_for(now)
+        os.makedirs(os.path.dirname(self.current_path) or ".", exist_ok=True)
+        if self.compress:
+            self._f = gzip.open(self.current_path, "at", encoding="utf-8", compresslevel=6)
+        else:
+            self._f = open(self.current_path, "a", encoding="utf-8", buffering=1 << 20)
+        self._opened_at = now
+        self._bytes = 0
+        self.files += 1
+
+    def _close_file(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _write(self, lines) -> None:
+        if self._f is None or time.time() - self._opened_at >= self.rotate_seconds or self._bytes >= self.rotate_bytes:
+            self._close_file()
+            self._open()
+        data = "\n".join(lines) + "\n"
+        self._f.write(data)
+        self._bytes += len(data)
+        self.written += len(lines)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                item = self.q.get(timeout=0.5)
+            except queue.Empty:
+                if self._f is not None:
+                    self._f.flush()
+                continue
+            lines = []
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                lines.append(item.rstrip("\n"))
+                if len(lines) >= self.batch:
+                    break
+                try:
+                    item = self.q.get_nowait()
+                except queue.Empty:
+                    break
+            if lines:
+                self._write(lines)
+        # _STOP is queued after every message put before close(): nothing is left behind
+        self._close_file()
+
+
+# === Asyncio multi-symbol collector ===
+
+def stamp(raw: str, recv_ns: int) -> str:
+    """Add ``"recv_ns"`` as the first key of a JSON object message, without parsing it."""
+    body = raw.strip()[1:].lstrip()
+    if body.startswith("}"):
+        return '{"recv_ns":%d}' % recv_ns
+    return '{"recv_ns":%d,%s' % (recv_ns, body)
+
+def stream_name(raw: str) -> Optional[str]:
+    """Stream name of a combined-stream message (``{"stream":"btcusdt@bookTicker",...}``)."""
+    i = raw.find('"stream"')
+    if i < 0:
+        return None
+    i = raw.find('"', raw.find(":", i + 8) + 1) + 1
+    return raw[i:raw.find('"', i)]
+
+class MultiCollector:
+    """Collect book/trade streams of many symbols over a few combined connections.
+
+    Output: ``<out_dir>/<SYMBOL>/<stream>-<start>-<n>.jsonl[.gz]`` with one stamped
+    message per line. ``on_message(stream, raw, recv_ns)`` is called for every
+    data message (e.g. to feed live analytics).
+    """
+
+    def __init__(self, symbols: Iterable[str], out_dir: Optional[str], streams: Tuple[str, ...] = ("bookTicker", "aggTrade"),
+                 url: str = BINANCE_STREAM_URL, streams_per_conn: int = 100, max_backoff: float = 60.0,
+                 writer_kwargs: Optional[Dict[str, Any]] = None,
+                 on_message: Optional[Callable[[str, str, int], None]] = None):
+        if not _HAS_WEBSOCKETS:
+            raise ImportError("MultiCollector requires the 'websockets' package")
+        self.url = url
+        self.names = [f"{s.lower()}@{st}" for s in symbols for st in streams]
+        self.groups = [self.names[i:i + streams_per_conn] for i in range(0, len(self.names), streams_per_conn)]
+        self.max_backoff = max_backoff
+        self.on_message = on_message
+        self.writers: Dict[str, RotatingWriter] = {}
+        if out_dir:
+            for name in self.names:
+                sym, st = name.split("@", 1)
+                self.writers[name] = RotatingWriter(os.path.join(out_dir, sym.upper(), f"{st}.jsonl"), **(writer_kwargs or {}))
+        self.received = 0
+        self.connects = 0
+        self._stop: Optional[asyncio.Event] = None
+
+    def _dispatch(self, raw: str, recv_ns: int) -> None:
+        name = stream_name(raw)
+        if name is None:
+            return      # subscription acks and errors
+        self.received += 1
+        w = self.writers.get(name)
+        if w is not None:
+            w.put(stamp(raw, recv_ns))
+        if self.on_message is not None:
+            self.on_message(name, raw, recv_ns)
+
+    async def _run_conn(self, streams: List[str], conn_id: int) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=20, ping_timeout=20, max_queue=None) as ws:
+                    self.connects += 1
+                    await ws.send(json.dumps({"method": "SUBSCRIBE", "params": streams, "id": conn_id}))
+                    backoff = 1.0
+                    async for raw in ws:
+                        self._dispatch(raw, time.time_ns())
+                print(f"[WS {conn_id}] closed by server, reconnecting", file=sys.stderr)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WS {conn_id}] error: {e!r}, reconnecting in {backoff:.1f}s", file=sys.stderr)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=backoff * (0.5 + random.random()))
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """Collect until ``stop()`` is called, ``duration`` elapses or the task is cancelled."""
+        self._stop = asyncio.Event()
+        tasks = [asyncio.create_task(self._run_conn(g, i + 1)) for i, g in enumerate(self.groups)]
+        try:
+            if duration is None:
+                await self._stop.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=duration)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._stop.set()
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.close()
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    def close(self) -> None:
+        for w in self.writers.values():
+            w.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"received": self.received, "connects": self.connects,
+                "queue_depth": sum(w.q.qsize() for w in self.writers.values()),
+                "dropped": sum(w.dropped for w in self.writers.values())}
@@ -0,0 +1,183 @@
+"""
+Cross-symbol microstructure: aligned bar matrices, FFT lead-lag, Hayashi-Yoshida.
+
+Per symbol, ``symbol_features`` reduces cleaned trades to bar ``logret`` and
+order-flow imbalance (the ``features`` definitions) plus the tick series
+(last log price per timestamp) used by Hayashi-Yoshida; ``compute_symbols`` runs
+that per symbol on a process pool. ``align_bars`` stacks one variable into a
+compact float32 matrix (bars × symbols) on the common bar grid.
+
+``xcorr_matrix`` gets the cross-correlation of every pair of columns at all
+lags in ``[-max_lag, max_lag]`` from one FFT per column: missing bars count as
+zero after demeaning, and each pair is normalized by its full-sample norms.
+A peak at lag ``l > 0`` for the pair (a, b) means ``a`` at ``t`` co-moves with
+``b`` at ``t + l``, i.e. ``a`` leads. The lead-lag ratio is
+``sum_{l>0} rho(l)^2 / sum_{l<0} rho(l)^2`` (above 1: ``a`` leads).
+
+Two independent series still have a largest |rho| somewhere on the lag grid,
+about ``1/sqrt(n)`` in size for ``n`` overlapping bars. A pair gets a
+``leader`` only when its peak clears ``significance_band``, the |rho| that
+the largest of the ``2 * max_lag + 1`` null correlations exceeds with
+probability ``alpha`` (Bonferroni over the lags).
+
+``hayashi_yoshida`` estimates the covariance of two asynchronously observed
+log prices without resampling: the sum of ``r1_i * r2_j`` over all pairs of
+overlapping return intervals, computed with ``searchsorted`` and cumulative
+sums instead of a double loop. Shifting one series over a lag grid and taking
+the largest |correlation| gives a lead-lag estimate that needs no bars at all
+(Hoffmann, Rosenbaum and Yoshida).
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from scipy.fft import next_fast_len, irfft, rfft
+
+LEAD_LAG_COLUMNS = ["variable", "sym_a", "sym_b", "n_overlap", "corr0", "peak_lag", "peak_lag_s", "peak_corr", "band",
+                    "llr", "leader", "hy_corr", "hy_peak_lag_s", "hy_peak_corr"]
+
+def bar_seconds(bar: str) -> float:
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(bar)).total_seconds()
+
+def symbol_features(trades: pd.DataFrame, bar: str = "1s") -> Dict[str, Any]:
+    """Bar returns/flow and the tick log-price series of one symbol's cleaned trades."""
+    from features import resample_trades, add_returns, order_flow
+    bars = add_returns(resample_trades(trades, bar))
+    cols = {"logret": bars["logret"]}
+    if "m" in trades.columns:
+        cols["flow_imb"] = order_flow(trades, bar)["flow_imb"]
+    last = trades.groupby("ts", sort=True)["price"].last()
+    return {"bars": pd.DataFrame(cols).astype("float32"),
+            "tick_ts": last.index.to_numpy("datetime64[ns]").astype("int64"),
+            "tick_logp": np.log(last.to_numpy("float64"))}
+
+def _load_symbol(path: str, bar: str, reader: Callable[[str], pd.DataFrame]) -> Dict[str, Any]:
+    from data_cleaning import clean_trades
+    return symbol_features(clean_trades(reader(path)), bar)
+
+def compute_symbols(paths: Dict[str, str], bar: str, reader: Callable[[str], pd.DataFrame],
+                    workers: int = 4) -> Dict[str, Dict[str, Any]]:
+    """``symbol_features`` for every ``{symbol: trades path}``, one process per symbol."""
+    if workers <= 1 or len(paths) == 1:
+        return {s: _load_symbol(p, bar, reader) for s, p in paths.items()}
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as ex:
+        futs = {s: ex.submit(_load_symbol, p, bar, reader) for s, p in paths.items()}
+        return {s: f.result() for s, f in futs.items()}
+
+def align_bars(per_symbol: Dict[str, pd.DataFrame], column: str, bar: str) -> pd.DataFrame:
+    """One column of every symbol's bars on the bar grid of the time range common to all symbols."""
+    frames = {s: df[column] for s, df in per_symbol.items() if column in df.columns}
+    if not frames:
+        return pd.DataFrame()
+    start = max(s.index.min() for s in frames.values())
+    end = min(s.index.max() for s in frames.values())
+    grid = pd.date_range(start, end, freq=bar, name="ts")
+    return pd.DataFrame({s: x.reindex(grid) for s, x in frames.items()}, index=grid).astype("float32")
+
+def xcorr_matrix(M: np.ndarray, max_lag: int) -> Tuple[np.ndarray, List[Tuple[int, int]], np.ndarray]:
+    """Cross-correlations of all column pairs at lags ``-max_lag..max_lag``.
+
+    Returns ``(lags, pairs, rho)`` with ``rho[k]`` the curve of ``pairs[k] = (i, j)``.
+    """
+    X = np.asarray(M, dtype="float64")
+    X = X - np.nanmean(X, axis=0)
+    X = np.nan_to_num(X, nan=0.0)
+    n, m = X.shape
+    max_lag = int(min(max_lag, n - 1))
+    nfft = next_fast_len(2 * n - 1)
+    F = rfft(X, n=nfft, axis=0)
+    norms = np.sqrt((X ** 2).sum(axis=0))
+    pairs = [(i, j) for i in range(m) for j in range(i + 1, m)]
+    lags = np.arange(-max_lag, max_lag + 1)
+    if not pairs:
+        return lags, pairs, np.empty((0, len(lags)))
+    ii, jj = np.array(pairs).T
+    # c[l] = sum_t x_i[t] x_j[t + l]; negative lags wrap to the end of the buffer
+    C = irfft(np.conj(F[:, ii]) * F[:, jj], n=nfft, axis=0)
+    C = np.concatenate([C[nfft - max_lag:], C[: max_lag + 1]], axis=0)
+    denom = norms[ii] * norms[jj]
+    rho = np.divide(C, denom, out=np.full_like(C, np.nan), where=denom > 0)
+    return lags, pairs, rho.T
+
+def hayashi_yoshida(t1, x1, t2, x2, lag_ns: int = 0) -> Dict[str, float]:
+    """Hayashi-Yoshida covariance and correlation of two tick log-price series.
+
+    ``t*`` are sorted int64 timestamps; with ``lag_ns`` the second series is
+    shifted back by that much (``x2`` at ``t + lag`` against ``x1`` at ``t``).
+    """
+    t1, x1 = np.asarray(t1, "int64"), np.asarray(x1, "float64")
+    t2, x2 = np.asarray(t2, "int64") - int(lag_ns), np.asarray(x2, "float64")
+    if len(t1) < 2 or len(t2) < 2:
+        return {"cov": float("nan"), "corr": float("nan")}
+    r1, r2 = np.diff(x1), np.diff(x2)
+    s1, e1 = t1[:-1], t1[1:]
+    s2, e2 = t2[:-1], t2[1:]
+    # Intervals j of series 2 overlapping (s1_i, e1_i]: e2_j > s1_i and s2_j < e1_i
+    lo = np.searchsorted(e2, s1, side="right")
+    hi = np.searchsorted(s2, e1, side="left")
+    csum = np.concatenate([[0.0], np.cumsum(r2)])
+    cov = float(np.sum(r1 * (csum[np.maximum(hi, lo)] - csum[lo])))
+    denom = np.sqrt(np.sum(r1 ** 2) * np.sum(r2 ** 2))
+    return {"cov": cov, "corr": cov / denom if denom > 0 else float("nan")}
+
+def significance_band(n: int, nlags: int = 1, alpha: float = 0.05) -> float:
+    """|rho| that the largest null cross-correlation over ``nlags`` lags of ``n`` bars exceeds with prob. ``alpha``."""
+    from scipy.stats import norm
+    if n <= 0:
+        return float("nan")
+    return float(norm.isf(alpha / (2 * max(nlags, 1))) / np.sqrt(n))
+
+def hy_lead_lag(t1, x1, t2, x2, lags_ns) -> np.ndarray:
+    """Hayashi-Yoshida correlation for each shift in ``lags_ns`` (> 0: series 1 leads)."""
+    return np.array([hayashi_yoshida(t1, x1, t2, x2, lag)["corr"] for lag in lags_ns])
+
+def lead_lag_table(aligned: Dict[str, pd.DataFrame], max_lag: int, bar: str,
+                   ticks: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Per variable and symbol pair: zero-lag and peak cross-correlation, lead-lag ratio, HY correlation.
+
+    ``leader`` is ``"-"`` unless the peak |correlation| exceeds ``band``, the
+    ``significance_band`` for the pair's ``n_overlap`` bars with both values
+    and the lags scanned. Returns the table and the raw curves
+    ``{variable: (lags, pairs, rho)}``.
+    """
+    bar_s = bar_seconds(bar)
+    rows, curves = [], {}
+    for var, mat in aligned.items():
+        syms = list(mat.columns)
+        vals = mat.to_numpy()
+        lags, pairs, rho = xcorr_matrix(vals, max_lag)
+        seen = np.isfinite(vals)
+        curves[var] = (lags, [(syms[i], syms[j]) for i, j in pairs], rho)
+        for (i, j), r in zip(pairs, rho):
+            a, b = syms[i], syms[j]
+            k = int(np.nanargmax(np.abs(r))) if np.isfinite(r).any() else len(lags) // 2
+            pos, neg = np.nansum(r[lags > 0] ** 2), np.nansum(r[lags < 0] ** 2)
+            llr = pos / neg if neg > 0 else float("nan")
+            n = int((seen[:, i] & seen[:, j]).sum())
+            band = significance_band(n, len(lags))
+            led = lags[k] != 0 and abs(r[k]) > band
+            hy = {"hy_corr": float("nan"), "hy_peak_lag_s": float("nan"), "hy_peak_corr": float("nan")}
+            if var == "logret" and ticks and a in ticks and b in ticks:
+                hy_rho = hy_lead_lag(*ticks[a], *ticks[b], (lags * bar_s * 1e9).astype("int64"))
+                if np.isfinite(hy_rho).any():
+                    h = int(np.nanargmax(np.abs(hy_rho)))
+                    hy = {"hy_corr": float(hy_rho[lags == 0][0]), "hy_peak_lag_s": float(lags[h] * bar_s),
+                          "hy_peak_corr": float(hy_rho[h])}
+            rows.append({"variable": var, "sym_a": a, "sym_b": b, "n_overlap": n, "corr0": float(r[lags == 0][0]),
+                         "peak_lag": int(lags[k]), "peak_lag_s": float(lags[k] * bar_s), "peak_corr": float(r[k]),
+                         "band": band, "llr": llr, "leader": (a if lags[k] > 0 else b) if led else "-", **hy})
+    return pd.DataFrame(rows, columns=LEAD_LAG_COLUMNS), curves
+
+def lead_lag_matrix(table: pd.DataFrame, variable: str, value: str = "peak_lag_s") -> pd.DataFrame:
+    """Symbols × symbols matrix of one table column (antisymmetric for lags, symmetric otherwise)."""
+    t = table[table["variable"] == variable]
+    syms = sorted(set(t["sym_a"]) | set(t["sym_b"]))
+    out = pd.DataFrame(0.0, index=syms, columns=syms)
+    sign = -1.0 if value in ("peak_lag", "peak_lag_s") else 1.0
+    for _, r in t.iterrows():
+        out.loc[r["sym_a"], r["sym_b"]] = r[value]
+        out.loc[r["sym_b"], r["sym_a"]] = sign * r[value]
+    if value not in ("peak_lag", "peak_lag_s"):
+        np.fill_diagonal(out.values, 1.0)
+    return out
@@ -82,7 +82,8 @@ def clean_trades(df: pd.DataFrame) -> pd.DataFrame:
     if "qty" in df.columns:
         df["qty"] = pd.to_numeric(df["qty"], errors="coerce")
 
-    df = df.dropna(subset=["ts"]).sort_values("ts").reset_index(drop=True)
+    # Stable: trades sharing a timestamp keep their arrival order, in any subset of the rows too
+    df = df.dropna(subset=["ts"]).sort_values("ts", kind="stable").reset_index(drop=True)
     return df
 
 
@@ -90,7 +91,7 @@ def clean_book(df: pd.DataFrame) -> pd.DataFrame:
     df = _ensure_ts(df.copy())
     if "ts" in df.columns:
         df["ts"] = to_datetime(df["ts"])
-    df = df.dropna(subset=["ts"]).sort_values("ts").reset_index(drop=True)
+    df = df.dropna(subset=["ts"]).sort_values("ts", kind="stable").reset_index(drop=True)
     if "bid" not in df.columns:
         for alt in ("best_bid","b","bidPrice"):
             if alt in df.columns: df = df.rename(columns={alt:"bid"}); break
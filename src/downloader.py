@@ -1,54 +1,301 @@
-
 """
 Binance REST downloader with retry/backoff for aggregated trades.
+
+Two pagination modes:
+- ``time``: the range is split into independent time windows that are fetched
+  concurrently by a thread pool over one pooled HTTP session.
+- ``id``: a ``fromId`` cursor walks the aggregate trade ids, so every request
+  returns a full page; id continuity (``a`` and ``f``/``l``) is checked and
+  gaps are refetched.
+A shared token bucket keeps the total request weight under the exchange limit
+and pauses all workers when the server answers 429/418 with ``Retry-After``.
+
+``stream_agg_trades`` writes id-cursor pages straight into a partitioned
+Parquet tick store (see ``tickstore``) and resumes from its checkpoint.
 """
 from __future__ import annotations
-import time, math, json, pathlib, sys
+import time, pathlib, sys, threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import Optional, List, Dict, Any
+from tickstore import PartWriter, load_checkpoint
 
 BASE = "https://api.binance.com/api/v3/aggTrades"
+PAGE_LIMIT = 1000
+HOUR_MS = 3_600_000
+COLUMNS = ["ts", "price", "qty", "a", "f", "l", "m"]
+# Binance spot: 6000 request weight per minute per IP; aggTrades costs 4.
+WEIGHT_PER_MINUTE = 6000
+AGG_TRADES_WEIGHT = 4
+# Retries of one request (throttled, 5xx or failed) before the error is raised
+MAX_RETRIES = 6
+
+class TokenBucket:
+    """Thread-safe token bucket for request-weight limits.
+
+    ``rate`` tokens are added per second up to ``capacity``. ``pause`` empties
+    the bucket and blocks every caller for the given time (server back-pressure).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, weight: float = 1.0) -> None:
+        """Block until ``weight`` tokens are available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                else:
+                    wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self._last = max(self._last, now)
+
+    @classmethod
+    def per_minute(cls, weight_per_minute: float = WEIGHT_PER_MINUTE) -> "TokenBucket":
+        # Allow a small burst only; the exchange counts weight per rolling minute.
+        return cls(rate=weight_per_minute / 60.0, capacity=max(1.0, weight_per_minute / 60.0))
 
 def _sleep_backoff(attempt: int):
     time.sleep(min(60, 2 ** attempt))
 
-def _fetch(symbol: str, start_ms: int, end_ms: int, limit: int = 1000, session: Optional[requests.Session] = None):
+def _retry_after(r: requests.Response) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """Session with a connection pool large enough for ``pool_size`` concurrent workers."""
+    ses = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    ses.mount("http://", adapter)
+    ses.mount("https://", adapter)
+    return ses
+
+def _fetch(symbol: str, start_ms: int, end_ms: int, limit: int = PAGE_LIMIT, session: Optional[requests.Session] = None,
+           bucket: Optional[TokenBucket] = None, base_url: str = BASE, weight: float = AGG_TRADES_WEIGHT):
     """Fetch a page from aggTrades with retries and 429 handling."""
-    url = BASE
-    ses = session or requests.Session()
     params = {"symbol": symbol.upper(), "startTime": start_ms, "endTime": end_ms, "limit": limit}
+    return _get(params, session=session, bucket=bucket, base_url=base_url, weight=weight)
+
+def _fetch_from_id(symbol: str, from_id: int, limit: int = PAGE_LIMIT, session: Optional[requests.Session] = None,
+                   bucket: Optional[TokenBucket] = None, base_url: str = BASE, weight: float = AGG_TRADES_WEIGHT):
+    """Fetch a page of aggTrades starting at aggregate id ``from_id``."""
+    params = {"symbol": symbol.upper(), "fromId": from_id, "limit": limit}
+    return _get(params, session=session, bucket=bucket, base_url=base_url, weight=weight)
+
+def _get(params: Dict[str, Any], session: Optional[requests.Session] = None, bucket: Optional[TokenBucket] = None,
+         base_url: str = BASE, weight: float = AGG_TRADES_WEIGHT):
+    url = base_url
+    ses = session or requests.Session()
     attempt = 0
     while True:
+        if bucket is not None:
+            bucket.acquire(weight)
         try:
             r = ses.get(url, params=params, timeout=15)
-            if r.status_code == 429:
-                _sleep_backoff(attempt); attempt += 1; continue
-            if r.status_code >= 500:
-                _sleep_backoff(attempt); attempt += 1; continue
+            if r.status_code in (429, 418) or r.status_code >= 500:
+                if attempt >= MAX_RETRIES:
+                    r.raise_for_status()
+                wait = _retry_after(r) if r.status_code < 500 else None
+                if bucket is not None and wait is not None:
+                    bucket.pause(wait)
+                else:
+                    _sleep_backoff(attempt)
+                attempt += 1; continue
             r.raise_for_status()
             data = r.json()
             return data
         except Exception:
-            if attempt >= 6:
+            if attempt >= MAX_RETRIES:
                 raise
             _sleep_backoff(attempt); attempt += 1
 
-def download_agg_trades(symbol: str, start_ms: int, end_ms: int, out_csv: str):
-    ses = requests.Session()
+def _split_windows(start_ms: int, end_ms: int, window_ms: int) -> List[tuple]:
+    """Split [start_ms, end_ms) into inclusive (start, end) windows for the API."""
+    return [(s, min(s + window_ms, end_ms) - 1) for s in range(start_ms, end_ms, window_ms)]
+
+def _fetch_window(symbol: str, start_ms: int, end_ms: int, session: requests.Session,
+                  bucket: Optional[TokenBucket], base_url: str = BASE) -> List[Dict[str, Any]]:
+    """Fetch every aggTrade of one window, paging inside it when it holds more than a page."""
+    out: List[Dict[str, Any]] = []
     cur = start_ms
-    rows = []
-    while cur < end_ms:
-        batch = _fetch(symbol, cur, min(cur + 60_000, end_ms), session=ses)
+    last_id = -1
+    while cur <= end_ms:
+        batch = _fetch(symbol, cur, end_ms, session=session, bucket=bucket, base_url=base_url)
         if not batch:
-            cur += 60_000; continue
-        for it in batch:
-            rows.append({
-                "T": it.get("T"), "p": float(it.get("p")), "q": float(it.get("q"))
-            })
-            cur = max(cur, it.get("T")+1)
-        time.sleep(0.1)
-    df = pd.DataFrame(rows).rename(columns={"T":"ts","p":"price","q":"qty"})
+            break
+        # Trades sharing the boundary millisecond may appear on both pages: dedupe by id.
+        out.extend(it for it in batch if it["a"] > last_id)
+        last_id = max(last_id, batch[-1]["a"])
+        if len(batch) < PAGE_LIMIT:
+            break
+        nxt = batch[-1]["T"]
+        if nxt == cur:
+            # A full page inside one millisecond: time paging cannot get past it, so walk the ids
+            for page in iter_agg_trades_by_id(symbol, cur, end_ms + 1, session=session, bucket=bucket,
+                                              base_url=base_url, from_id=last_id + 1):
+                out.extend(page)
+            break
+        cur = nxt
+    return out
+
+def _first_id_at(symbol: str, start_ms: int, end_ms: int, session: requests.Session,
+                 bucket: Optional[TokenBucket], base_url: str = BASE) -> Optional[int]:
+    """Aggregate id of the first trade at or after ``start_ms`` (None if the range is empty)."""
+    cur = start_ms
+    while cur < end_ms:
+        # startTime/endTime queries may span at most one hour
+        page = _fetch(symbol, cur, min(cur + HOUR_MS, end_ms) - 1, limit=1, session=session, bucket=bucket, base_url=base_url)
+        if page:
+            return int(page[0]["a"])
+        cur += HOUR_MS
+    return None
+
+def _find_gap(page: List[Dict[str, Any]], expected_id: int) -> Optional[int]:
+    """Index of the first row whose aggregate id ``a`` is not ``expected_id + i``, or None."""
+    for i, it in enumerate(page):
+        if int(it["a"]) != expected_id + i:
+            return i
+    return None
+
+def _trade_id_breaks(page: List[Dict[str, Any]], prev_last: Optional[int]) -> List[tuple]:
+    """Ranges of trade ids missing between consecutive rows (``f`` must follow the previous ``l``).
+
+    These come from the exchange's aggregation itself and cannot be refetched.
+    """
+    breaks = []
+    for it in page:
+        if prev_last is not None and int(it["f"]) != prev_last + 1:
+            breaks.append((prev_last + 1, int(it["f"]) - 1))
+        prev_last = int(it["l"])
+    return breaks
+
+def iter_agg_trades_by_id(symbol: str, start_ms: int, end_ms: int, session: Optional[requests.Session] = None,
+                          bucket: Optional[TokenBucket] = None, base_url: str = BASE, max_refetch: int = 3,
+                          from_id: Optional[int] = None, gaps: Optional[List[Dict[str, Any]]] = None):
+    """Yield pages of aggTrades in [start_ms, end_ms) using ``fromId`` cursor pagination.
+
+    Pages are checked for id continuity: a page that skips ids is cut at the
+    first missing id and the cursor resumes there. If the exchange still skips
+    it after ``max_refetch`` tries the gap is accepted and recorded in ``gaps``
+    (if given), together with ``f``/``l`` trade-id breaks.
+    """
+    ses = session or make_session(1)
+    bucket = bucket or TokenBucket.per_minute()
+    next_id = from_id if from_id is not None else _first_id_at(symbol, start_ms, end_ms, ses, bucket, base_url)
+    prev_last = None
+    tries = 0
+    while next_id is not None:
+        page = _fetch_from_id(symbol, next_id, session=ses, bucket=bucket, base_url=base_url)
+        if not page:
+            return
+        gap = _find_gap(page, next_id)
+        if gap is not None:
+            if gap == 0 and int(page[0]["a"]) < next_id:
+                raise RuntimeError(f"aggTrades cursor went backwards: asked {next_id}, got {page[0]['a']}")
+            if gap == 0 and tries < max_refetch:
+                tries += 1; continue
+            if gap == 0:
+                # Server does not have the missing ids: accept and move on
+                if gaps is not None:
+                    gaps.append({"kind": "a", "from": next_id, "to": int(page[0]["a"]) - 1})
+                next_id = int(page[0]["a"])
+                tries = 0
+                continue
+            page = page[:gap]
+        tries = 0
+        done = int(page[-1]["T"]) >= end_ms
+        if done:
+            page = [it for it in page if int(it["T"]) < end_ms]
+        if gaps is not None:
+            gaps += [{"kind": "f/l", "from": lo, "to": hi} for lo, hi in _trade_id_breaks(page, prev_last)]
+        if page:
+            prev_last = int(page[-1]["l"])
+            next_id = int(page[-1]["a"]) + 1
+            yield page
+        if done:
+            return
+
+def _records_to_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=["T", "p", "q", "a", "f", "l", "m"])
+    df = df.rename(columns={"T":"ts","p":"price","q":"qty"})
+    df["price"] = df["price"].astype("float64")
+    df["qty"] = df["qty"].astype("float64")
+    return df[COLUMNS]
+
+def download_agg_trades(symbol: str, start_ms: int, end_ms: int, out_csv: str, workers: int = 8,
+                        window_ms: int = 60_000, weight_per_minute: float = WEIGHT_PER_MINUTE,
+                        base_url: str = BASE, mode: str = "time"):
+    """Download aggTrades in [start_ms, end_ms) to CSV (ts, price, qty, a, f, l, m).
+
+    ``mode="time"`` fetches windows concurrently and reassembles them in time order;
+    ``mode="id"`` pages sequentially with a ``fromId`` cursor and gap detection.
+    """
+    if mode not in ("id", "time"):
+        raise ValueError(f"Unknown pagination mode: {mode}")
+    bucket = TokenBucket.per_minute(weight_per_minute)
+    with make_session(workers) as ses:
+        if mode == "id":
+            gaps: List[Dict[str, Any]] = []
+            pages = list(iter_agg_trades_by_id(symbol, start_ms, end_ms, ses, bucket, base_url, gaps=gaps))
+            for g in gaps:
+                print(f"[WARN] {symbol} aggTrades gap in {g['kind']} ids {g['from']}..{g['to']}", file=sys.stderr)
+        else:
+            windows = _split_windows(start_ms, end_ms, window_ms)
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                pages = list(ex.map(lambda w: _fetch_window(symbol, w[0], w[1], ses, bucket, base_url), windows))
+    df = _records_to_frame([it for page in pages for it in page])
     pathlib.Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(out_csv, index=False)
     return out_csv
+
+def stream_agg_trades(symbol: str, start_ms: int, end_ms: int, out_dir: str, rows_per_part: int = 500_000,
+                      weight_per_minute: float = WEIGHT_PER_MINUTE, base_url: str = BASE) -> str:
+    """Stream aggTrades in [start_ms, end_ms) into Parquet part files under ``out_dir``.
+
+    Pages are written as they arrive (memory is bounded by ``rows_per_part``) and
+    the store's checkpoint is updated after every part, so rerunning the same
+    command after a crash or Ctrl-C continues after the last saved id.
+    """
+    ckpt = load_checkpoint(out_dir)
+    if ckpt.get("symbol") not in (None, symbol.upper()):
+        raise ValueError(f"{out_dir} holds {ckpt['symbol']} data, not {symbol.upper()}")
+    from_id = ckpt["last_id"] + 1 if ckpt.get("last_id") is not None else None
+    if ckpt.get("last_ts") and pd.Timestamp(ckpt["last_ts"]).value // 1_000_000 >= end_ms - 1:
+        return out_dir
+    gaps: List[Dict[str, Any]] = []
+    # On an error or Ctrl-C the writer still flushes what arrived, so the checkpoint covers every stored row
+    with make_session(1) as ses, PartWriter(out_dir, rows_per_part=rows_per_part, meta={"symbol": symbol.upper()}) as w:
+        for page in iter_agg_trades_by_id(symbol, start_ms, end_ms, ses, TokenBucket.per_minute(weight_per_minute),
+                                          base_url, from_id=from_id, gaps=gaps):
+            df = _records_to_frame(page)
+            df["ts"] = pd.to_datetime(df["ts"], unit="ms")
+            w.write(df)
+    for g in gaps:
+        print(f"[WARN] {symbol} aggTrades gap in {g['kind']} ids {g['from']}..{g['to']}", file=sys.stderr)
+    return out_dir
@@ -4,8 +4,26 @@ import pandas as pd
 
 """
 Feature engineering: resampling to bars, returns, volatility, spread metrics.
+The scalar-friendly definitions (``spread_bp``, ``signed_qty``, ``flow_imbalance``)
+and rolling defaults are shared with the live engine in ``live.py``.
 """
 
+VOL_WINDOW = 60
+VOL_MIN_PERIODS = 20
+
+def spread_bp(bid, ask):
+    """Quoted spread in basis points of the mid price (scalars or arrays)."""
+    mid = (bid + ask) / 2.0
+    return ((ask - bid) / mid) * 10000.0
+
+def signed_qty(qty, is_buyer_maker):
+    """Taker-signed size: buyer-maker trades are sells by the taker (negative)."""
+    return np.where(is_buyer_maker, -qty, qty)
+
+def flow_imbalance(buy_vol, sell_vol):
+    """Order-flow imbalance in [-1, 1]: (buy - sell) / (buy + sell)."""
+    return (buy_vol - sell_vol) / (buy_vol + sell_vol)
+
 def resample_trades(trades: pd.DataFrame, rule: str = "1s") -> pd.DataFrame:
     """Aggregate tick trades to time bars.
 
@@ -36,7 +54,7 @@ def add_returns(df_bar: pd.DataFrame, price_col: str = "close") -> pd.DataFrame:
     d["absret"] = d["logret"].abs()
     return d
 
-def rolling_vol(d: pd.DataFrame, col: str = "logret", window: int = 60, min_periods: int = 20) -> pd.Series:
+def rolling_vol(d: pd.DataFrame, col: str = "logret", window: int = VOL_WINDOW, min_periods: int = VOL_MIN_PERIODS) -> pd.Series:
     """Rolling volatility (std of returns) with safety on min periods."""
     return d[col].rolling(window=window, min_periods=min_periods).std()
 
@@ -47,9 +65,20 @@ def compute_spread_from_book(book: pd.DataFrame) -> pd.DataFrame:
         return b
     b["mid"] = (b["bid"] + b["ask"]) / 2.0
     b["spread"] = b["ask"] - b["bid"]
-    b["spread_bp"] = (b["spread"] / b["mid"]) * 10000.0
+    b["spread_bp"] = spread_bp(b["bid"], b["ask"])
     return b
 
+def order_flow(trades: pd.DataFrame, rule: str = "1s") -> pd.DataFrame:
+    """Per-bar taker buy/sell volume and flow imbalance from the buyer-maker flag ``m``."""
+    d = trades.set_index("ts").sort_index()
+    sq = pd.Series(signed_qty(d["qty"].to_numpy(), d["m"].astype(bool).to_numpy()), index=d.index)
+    out = pd.DataFrame({
+        "buy_vol": sq.clip(lower=0).resample(rule).sum(),
+        "sell_vol": (-sq).clip(lower=0).resample(rule).sum(),
+    })
+    out["flow_imb"] = flow_imbalance(out["buy_vol"], out["sell_vol"])
+    return out
+
 def merge_trade_book(bars: pd.DataFrame, book_features: pd.DataFrame) -> pd.DataFrame:
     """Merge bar-level features with nearest-forward book snapshot."""
     if "mid" not in book_features.columns and "spread_bp" not in book_features.columns:
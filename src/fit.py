@@ -1,6 +1,7 @@
 
 import numpy as np
 import pandas as pd
+from contextlib import nullcontext
 from typing import List, Dict, Any
 from scipy import stats
 
@@ -40,10 +41,12 @@ def _anderson_ad_stat(data: np.ndarray, dist_name: str) -> float:
     ad = -n - (1.0 / n) * np.sum((2 * i - 1) * (np.log(u) + np.log(1 - u[::-1])))
     return float(ad)
 
-def fit_candidates(data: np.ndarray, candidates: List[str], positive_only: bool = False) -> pd.DataFrame:
+def fit_candidates(data: np.ndarray, candidates: List[str], positive_only: bool = False,
+                   profiler=None) -> pd.DataFrame:
     """Fit multiple distributions and return a ranked table by AIC.
 
     Columns: distribution, params, aic, bic, ks_stat, ks_p, ad_stat
+    With a ``profiling.StageProfiler`` each candidate is timed as ``fit:<name>``.
     """
     x = np.asarray(data).astype("float64")
     x = x[~np.isnan(x)]
@@ -53,26 +56,27 @@ def fit_candidates(data: np.ndarray, candidates: List[str], positive_only: bool
     if x.size == 0:
         return pd.DataFrame(columns=["distribution","params","aic","bic","ks_stat","ks_p","ad_stat"])
     for name in candidates:
-        try:
-            dist = getattr(stats, name)
-            params = dist.fit(x)
-            ll = np.sum(dist.logpdf(x, *params))
-            k = len(params)
-            aic = 2 * k - 2 * ll
-            bic = np.log(x.size) * k - 2 * ll
-            ks_stat, ks_p = stats.kstest(x, name, args=params)
-            ad_stat = _anderson_ad_stat(x, name)
-            rows.append({
-                "distribution": name,
-                "params": params,
-                "aic": aic,
-                "bic": bic,
-                "ks_stat": ks_stat,
-                "ks_p": ks_p,
-                "ad_stat": ad_stat,
-            })
-        except Exception:
-            continue
+        with profiler.section(f"fit:{name}", rows_in=int(x.size)) if profiler else nullcontext():
+            try:
+                dist = getattr(stats, name)
+                params = dist.fit(x)
+                ll = np.sum(dist.logpdf(x, *params))
+                k = len(params)
+                aic = 2 * k - 2 * ll
+                bic = np.log(x.size) * k - 2 * ll
+                ks_stat, ks_p = stats.kstest(x, name, args=params)
+                ad_stat = _anderson_ad_stat(x, name)
+                rows.append({
+                    "distribution": name,
+                    "params": params,
+                    "aic": aic,
+                    "bic": bic,
+                    "ks_stat": ks_stat,
+                    "ks_p": ks_p,
+                    "ad_stat": ad_stat,
+                })
+            except Exception:
+                continue
     if not rows:
         return pd.DataFrame(columns=["distribution","params","aic","bic","ks_stat","ks_p","ad_stat"])
     return pd.DataFrame(rows).sort_values(["aic","bic"]).reset_index(drop=True)
@@ -0,0 +1,139 @@
+"""
+Bulk ingestion of Binance Vision aggTrades archives into the tick store.
+
+Each ``<SYMBOL>-aggTrades-YYYY-MM-DD.zip`` (or monthly ``YYYY-MM``) archive is
+stream-decompressed member by member straight into a typed chunked CSV parser;
+nothing is extracted to disk. Archives are processed in parallel by a process
+pool, each writing its own part files (named after the archive) into the date
+partitions of the store. A ledger records the SHA-256 of every ingested archive
+so reruns skip what is already there; a sibling ``.CHECKSUM`` file, when
+present, is verified before ingesting.
+"""
+from __future__ import annotations
+import glob
+import hashlib
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
+import pandas as pd
+from tickstore import PartWriter, remove_parts, save_json_atomic, TRADE_COLUMNS
+
+LEDGER = "_ingested.json"
+AGG_COLS = ["a", "price", "qty", "f", "l", "ts", "m", "M"]
+AGG_DTYPES = {"a": "int64", "price": "float64", "qty": "float64", "f": "int64", "l": "int64",
+              "ts": "int64", "m": "bool", "M": "bool"}
+
+def sha256_file(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for b in iter(lambda: f.read(block), b""):
+            h.update(b)
+    return h.hexdigest()
+
+def expected_checksum(zip_path: str) -> Optional[str]:
+    """SHA-256 from a Binance ``<archive>.CHECKSUM`` file (``<hex>  <name>``), if present."""
+    path = zip_path + ".CHECKSUM"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        txt = f.read().split()
+    return txt[0].lower() if txt else None
+
+def parse_aggtrades(stream, chunksize: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """Parse an aggTrades CSV byte stream into typed chunks (tick store columns).
+
+    Handles both headerless archives and the newer ones with a header row, and
+    second, millisecond or microsecond timestamps. ``ts`` is tz-naive UTC.
+    """
+    buf = stream if isinstance(stream, io.BufferedReader) else io.BufferedReader(stream)
+    first = buf.peek(64)[:1]
+    header = 0 if first and not first.isdigit() else None
+    reader = pd.read_csv(buf, header=header, names=AGG_COLS, dtype=AGG_DTYPES, chunksize=chunksize,
+                         engine="c")
+    for chunk in reader:
+        last = chunk["ts"].iloc[-1]
+        unit = "us" if last > 1e14 else "s" if last < 1e11 else "ms"
+        chunk["ts"] = pd.to_datetime(chunk["ts"], unit=unit)
+        yield chunk[TRADE_COLUMNS]
+
+def ingest_archive(zip_path: str, out_root: str, rows_per_part: int = 1_000_000,
+                   chunksize: int = 1_000_000) -> Dict[str, Any]:
+    """Verify and ingest one archive; returns its ledger entry.
+
+    On any error the archive's part files are removed before re-raising, so a
+    failed archive leaves nothing in the store for ``read_ticks`` to pick up.
+    """
+    prefix = os.path.basename(zip_path)[: -len(".zip")]
+    rows = 0
+    try:
+        digest = sha256_file(zip_path)
+        want = expected_checksum(zip_path)
+        if want is not None and want != digest:
+            raise ValueError(f"Checksum mismatch for {zip_path}: {digest} != {want}")
+        remove_parts(out_root, prefix)      # leftovers of an earlier ingest of this archive
+        with zipfile.ZipFile(zip_path) as zf, \
+                PartWriter(out_root, rows_per_part=rows_per_part, prefix=prefix, checkpoint=False) as w:
+            for name in sorted(n for n in zf.namelist() if n.lower().endswith(".csv")):
+                # ZipExtFile verifies the member CRC when the stream is exhausted
+                with zf.open(name) as member:
+                    for chunk in parse_aggtrades(member, chunksize=chunksize):
+                        w.write(chunk)
+                        rows += len(chunk)
+    except BaseException:
+        # The writer flushed its buffer on the way out: drop every part this archive wrote
+        remove_parts(out_root, prefix)
+        raise
+    return {"sha256": digest, "size": os.path.getsize(zip_path), "rows": rows,
+            "verified": want is not None, "ingested_at": datetime.utcnow().isoformat(timespec="seconds")}
+
+def load_ledger(out_root: str) -> Dict[str, Any]:
+    path = os.path.join(out_root, LEDGER)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def find_archives(sources: List[str]) -> List[str]:
+    """Expand directories and globs into a sorted list of .zip archives."""
+    out = set()
+    for src in sources:
+        if os.path.isdir(src):
+            out.update(glob.glob(os.path.join(src, "*.zip")))
+        else:
+            out.update(p for p in glob.glob(src) if p.lower().endswith(".zip"))
+    return sorted(out)
+
+def _already_ingested(entry: Optional[Dict[str, Any]], zip_path: str) -> bool:
+    if not entry or entry.get("size") != os.path.getsize(zip_path):
+        return False
+    want = expected_checksum(zip_path)
+    return want is None or want == entry.get("sha256")
+
+def ingest_archives(sources: List[str], out_root: str, workers: int = 4, rows_per_part: int = 1_000_000,
+                    force: bool = False) -> Dict[str, Any]:
+    """Ingest every archive matched by ``sources`` in parallel; returns a summary."""
+    os.makedirs(out_root, exist_ok=True)
+    ledger = load_ledger(out_root)
+    todo, skipped = [], []
+    for p in find_archives(sources):
+        name = os.path.basename(p)
+        (skipped if not force and _already_ingested(ledger.get(name), p) else todo).append(p)
+
+    failed: Dict[str, str] = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ex:
+        futs = {ex.submit(ingest_archive, p, out_root, rows_per_part): p for p in todo}
+        for fut in as_completed(futs):
+            name = os.path.basename(futs[fut])
+            try:
+                ledger[name] = fut.result()
+            except Exception as e:
+                # Its parts were removed: it must be ingested again next time
+                failed[name] = str(e)
+                ledger.pop(name, None)
+            # Only the parent writes the ledger, after each archive is fully on disk
+            save_json_atomic(os.path.join(out_root, LEDGER), ledger)
+    return {"ingested": len(todo) - len(failed), "skipped": len(skipped), "failed": failed}
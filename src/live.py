@@ -0,0 +1,356 @@
+"""
+Live streaming analytics over fixed-size ring buffers.
+
+``LiveAnalytics`` consumes trades and top-of-book updates one at a time and
+maintains, incrementally and in bounded memory:
+
+- time bars (open/high/low/close, vol, ntrades, vwap) with the same binning as
+  ``features.resample_trades``, including empty bars for quiet intervals
+- ret/logret/absret and rolling volatility with ``features`` defaults
+- taker buy/sell volume and flow imbalance per bar and over the last N trades
+- mid and ``spread_bp`` (via ``features.spread_bp``) as of each bar close
+
+so that closed bars agree with the batch pipeline (before the forward-fill that
+``merge_trade_book`` applies). ``LiveHub`` routes collector messages (stamped
+JSON lines or ``MultiCollector`` callbacks) to one engine per symbol, and
+publishers write the current snapshot at a fixed cadence.
+"""
+from __future__ import annotations
+import heapq
+import json
+import math
+import os
+import socket
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from features import VOL_WINDOW, VOL_MIN_PERIODS, spread_bp, flow_imbalance, signed_qty
+
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
+
+NAN = float("nan")
+
+class RingBuffer:
+    """Fixed-capacity ring buffer of float64 rows with named fields."""
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self._col = {f: i for i, f in enumerate(self.fields)}
+        self.data = np.full((self.capacity, len(self.fields)), np.nan)
+        self.n = 0      # rows ever appended
+
+    def __len__(self) -> int:
+        return min(self.n, self.capacity)
+
+    def append(self, row: Sequence[float]) -> None:
+        self.data[self.n % self.capacity] = row
+        self.n += 1
+
+    def set_last(self, field: str, value: float) -> None:
+        self.data[(self.n - 1) % self.capacity, self._col[field]] = value
+
+    def last(self, k: Optional[int] = None, field: Optional[str] = None) -> np.ndarray:
+        """The most recent ``k`` rows (all if None) in arrival order; one column if ``field``."""
+        k = len(self) if k is None else min(k, len(self))
+        idx = np.arange(self.n - k, self.n) % self.capacity
+        return self.data[idx, self._col[field]] if field else self.data[idx]
+
+    def latest(self) -> Dict[str, float]:
+        if not self.n:
+            return {}
+        return dict(zip(self.fields, self.data[(self.n - 1) % self.capacity].tolist()))
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.last(), columns=list(self.fields))
+
+BAR_FIELDS = ("ts", "open", "high", "low", "close", "vol", "ntrades", "vwap", "ret", "logret", "absret",
+              "vol_roll", "buy_vol", "sell_vol", "flow_imb", "mid", "spread_bp")
+TICK_FIELDS = ("ts", "price", "qty", "signed_qty")
+BOOK_FIELDS = ("ts", "bid", "ask", "bid_size", "ask_size", "spread_bp")
+
+class LiveAnalytics:
+    """Incremental bar/return/volatility/flow/spread metrics for one symbol.
+
+    Timestamps are integer nanoseconds since the epoch (UTC). Events must arrive
+    in time order; each update is O(1) except bar closes, which are O(vol_window).
+    An event older than the open bar cannot be applied to its (closed) bar: it
+    is rejected and counted in ``n_late``.
+    """
+
+    def __init__(self, bar: str = "1s", bar_capacity: int = 3600, tick_capacity: int = 100_000,
+                 book_capacity: int = 10_000, vol_window: int = VOL_WINDOW, vol_min_periods: int = VOL_MIN_PERIODS,
+                 flow_window: int = 1000):
+        self.bar = bar
+        self.bar_ns = pd.Timedelta(bar).value
+        self.vol_window = vol_window
+        self.vol_min_periods = vol_min_periods
+        self.bars = RingBuffer(bar_capacity, BAR_FIELDS)
+        self.trades = RingBuffer(tick_capacity, TICK_FIELDS)
+        self.book = RingBuffer(book_capacity, BOOK_FIELDS)
+        self.flow_window = min(flow_window, tick_capacity)
+        self._flow_buy = 0.0
+        self._flow_sell = 0.0
+        self.bid = self.ask = NAN
+        self.n_trades = 0
+        self.n_book = 0
+        self.n_late = 0
+        self.latency = RingBuffer(4096, ("ns",))
+        self._bin: Optional[int] = None
+        self._prev_close = NAN
+        self._reset_bar()
+
+    # --- bars ---
+
+    def _reset_bar(self) -> None:
+        self._o = self._h = self._l = self._c = NAN
+        self._v = self._pv = self._buy = self._sell = 0.0
+        self._n = 0
+
+    def _close_bar(self) -> None:
+        c, p = self._c, self._prev_close
+        ret = c / p - 1 if self._n and p == p else NAN
+        logret = math.log(c) - math.log(p) if self._n and p == p else NAN
+        vwap = self._pv / self._v if self._v else NAN
+        mid = (self.bid + self.ask) / 2.0
+        self.bars.append((self._bin, self._o, self._h, self._l, c, self._v, self._n, vwap, ret, logret, abs(logret),
+                          NAN, self._buy, self._sell,
+                          flow_imbalance(self._buy, self._sell) if self._buy + self._sell else NAN,
+                          mid, spread_bp(self.bid, self.ask)))
+        x = self.bars.last(self.vol_window, "logret")
+        x = x[~np.isnan(x)]
+        if x.size >= max(self.vol_min_periods, 2):
+            self.bars.set_last("vol_roll", float(np.std(x, ddof=1)))
+        self._prev_close = c
+        self._reset_bar()
+
+    def _advance(self, ts_ns: int) -> bool:
+        """Move the open bar up to ``ts_ns``; False (and counted) if that bar is already closed."""
+        b = ts_ns - ts_ns % self.bar_ns
+        if self._bin is None:
+            self._bin = b
+            return True
+        if b < self._bin:
+            self.n_late += 1
+            return False
+        if b == self._bin:
+            return True
+        self._close_bar()
+        nxt = self._bin + self.bar_ns
+        # Empty bars for quiet intervals, at most one ring's worth
+        nxt = max(nxt, b - self.bars.capacity * self.bar_ns)
+        while nxt < b:
+            self._bin = nxt
+            self._close_bar()
+            nxt += self.bar_ns
+        self._bin = b
+        return True
+
+    # --- event handlers ---
+
+    def on_trade(self, ts_ns: int, price: float, qty: float, is_buyer_maker: Optional[bool] = None) -> None:
+        if not self._advance(ts_ns):
+            return
+        if self._n == 0:
+            self._o = self._h = self._l = price
+        else:
+            if price > self._h: self._h = price
+            if price < self._l: self._l = price
+        self._c = price
+        self._v += qty
+        self._pv += price * qty
+        self._n += 1
+        if is_buyer_maker is None:
+            sq = NAN
+        else:
+            sq = float(signed_qty(qty, is_buyer_maker))
+            if is_buyer_maker: self._sell += qty
+            else: self._buy += qty
+            # Rolling flow over the last flow_window trades
+            if self.trades.n >= self.flow_window:
+                old = self.trades.data[(self.trades.n - self.flow_window) % self.trades.capacity, 3]
+                if old > 0: self._flow_buy -= old
+                elif old < 0: self._flow_sell += old
+            if sq > 0: self._flow_buy += sq
+            else: self._flow_sell -= sq
+        self.trades.append((ts_ns, price, qty, sq))
+        self.n_trades += 1
+
+    def on_book(self, ts_ns: int, bid: float, ask: float, bid_size: float = NAN, ask_size: float = NAN) -> None:
+        if not self._advance(ts_ns):
+            return
+        self.bid, self.ask = bid, ask
+        self.book.append((ts_ns, bid, ask, bid_size, ask_size, spread_bp(bid, ask)))
+        self.n_book += 1
+
+    def record_latency(self, ns: int) -> None:
+        self.latency.append((ns,))
+
+    # --- output ---
+
+    def bars_frame(self) -> pd.DataFrame:
+        """Closed bars in the ring as a frame indexed like ``resample_trades`` output."""
+        df = self.bars.frame()
+        df.index = pd.to_datetime(df.pop("ts").astype("int64"))
+        df.index.name = "ts"
+        df["ntrades"] = df["ntrades"].astype("int64")
+        return df
+
+    def snapshot(self) -> Dict[str, Any]:
+        lat = self.latency.last(field="ns")
+        last_trade = self.trades.latest()
+        bar = self.bars.latest()
+        snap = {
+            "bar": self.bar,
+            "ts": pd.Timestamp(int(last_trade["ts"])).isoformat() if last_trade else None,
+            "last_price": last_trade.get("price"),
+            "bid": self.bid, "ask": self.ask,
+            "mid": (self.bid + self.ask) / 2.0, "spread_bp": spread_bp(self.bid, self.ask),
+            "flow_imb_ticks": flow_imbalance(self._flow_buy, self._flow_sell) if self._flow_buy + self._flow_sell else None,
+            "n_trades": self.n_trades, "n_book": self.n_book, "n_late": self.n_late,
+            "last_bar": dict(bar, ts=pd.Timestamp(int(bar["ts"])).isoformat()) if bar else None,
+            "update_us_p50": float(np.percentile(lat, 50)) / 1e3 if lat.size else None,
+            "update_us_p99": float(np.percentile(lat, 99)) / 1e3 if lat.size else None,
+        }
+        return _nan_to_none(snap)
+
+def _nan_to_none(v):
+    """NaN -> None at any depth, so snapshots serialize to strict JSON."""
+    if isinstance(v, dict):
+        return {k: _nan_to_none(x) for k, x in v.items()}
+    if isinstance(v, float) and v != v:
+        return None
+    return v
+
+# === Message routing ===
+
+def parse_message(raw, recv_ns: Optional[int] = None):
+    """Parse a collector message into ``(symbol, kind, ts_ns, fields)`` or None.
+
+    Trades use the exchange trade time ``T``; book updates use the event time
+    ``E`` when present, else the local receive time.
+    """
+    d = _loads(raw)
+    data = d.get("data", d)
+    recv = d.get("recv_ns", recv_ns)
+    sym = data.get("s")
+    if data.get("e") in ("aggTrade", "trade"):
+        return sym, "trade", int(data["T"]) * 1_000_000, (float(data["p"]), float(data["q"]), bool(data["m"]))
+    if "b" in data and "a" in data:
+        ts = int(data["E"]) * 1_000_000 if "E" in data else recv
+        if ts is None:
+            return None
+        return sym, "book", int(ts), (float(data["b"]), float(data["a"]), float(data.get("B", NAN)), float(data.get("A", NAN)))
+    return None
+
+class LiveHub:
+    """One ``LiveAnalytics`` per symbol, fed from raw collector messages."""
+
+    def __init__(self, **engine_kwargs):
+        self.engine_kwargs = engine_kwargs
+        self.engines: Dict[str, LiveAnalytics] = {}
+
+    def engine(self, symbol: str) -> LiveAnalytics:
+        eng = self.engines.get(symbol)
+        if eng is None:
+            eng = self.engines[symbol] = LiveAnalytics(**self.engine_kwargs)
+        return eng
+
+    def on_message(self, raw, recv_ns: Optional[int] = None) -> Optional[str]:
+        msg = parse_message(raw, recv_ns)
+        return self.dispatch(msg) if msg is not None else None
+
+    def dispatch(self, msg) -> str:
+        """Apply one ``parse_message`` result to its symbol's engine; returns its kind."""
+        sym, kind, ts, f = msg
+        eng = self.engine(sym or "UNKNOWN")
+        t0 = time.perf_counter_ns()
+        if kind == "trade":
+            eng.on_trade(ts, *f)
+        else:
+            eng.on_book(ts, *f)
+        eng.record_latency(time.perf_counter_ns() - t0)
+        return kind
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"generated_at": pd.Timestamp.now(tz="UTC").isoformat(),
+                "symbols": {s: e.snapshot() for s, e in sorted(self.engines.items())}}
+
+# === Publishers ===
+
+class JsonFilePublisher:
+    """Atomically rewrite a JSON file with the latest snapshot."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def publish(self, snap: Dict[str, Any]) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f, default=str)
+        os.replace(tmp, self.path)
+
+class UdpPublisher:
+    """Send each snapshot as one JSON datagram to a local socket."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9999):
+        self.addr = (host, int(port))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def publish(self, snap: Dict[str, Any]) -> None:
+        self.sock.sendto(json.dumps(snap, default=str).encode(), self.addr)
+
+class Cadence:
+    """Call publishers at most every ``every`` seconds of wall time."""
+
+    def __init__(self, hub: LiveHub, publishers: List[Any], every: float = 1.0):
+        self.hub = hub
+        self.publishers = publishers
+        self.every = every
+        self._next = time.monotonic() + every
+
+    def tick(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now >= self._next:
+            snap = self.hub.snapshot()
+            for p in self.publishers:
+                p.publish(snap)
+            self._next = now + self.every
+
+def _file_events(path: str, order: int) -> Iterator[tuple]:
+    """``(ts_ns, order, line_no, msg)`` for every parseable line of a stamped JSONL file (plain or .gz)."""
+    import gzip
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            msg = parse_message(line)
+            if msg is not None:
+                yield msg[2], order, i, msg
+
+def run_replay_files(hub: LiveHub, paths: Iterable[str], cadence: Optional[Cadence] = None) -> Dict[str, Any]:
+    """Feed stamped JSONL files through the hub, merged by event time across files.
+
+    Collectors write one file per stream (``aggTrade-*``, ``bookTicker-*``), each
+    in time order, so a heap over the open files interleaves them as they
+    happened; equal timestamps keep path order. Events that still arrive late
+    (a file out of order) are rejected by the engines and reported as ``late``.
+    """
+    n = 0
+    t0 = time.perf_counter()
+    for _, _, _, msg in heapq.merge(*(_file_events(p, k) for k, p in enumerate(paths))):
+        hub.dispatch(msg)
+        n += 1
+        if cadence is not None and not n % 256:
+            cadence.tick()
+    if cadence is not None:
+        cadence.tick(force=True)
+    dt = time.perf_counter() - t0
+    return {"events": n, "late": sum(e.n_late for e in hub.engines.values()), "seconds": dt,
+            "events_per_sec": n / dt if dt else None}
@@ -0,0 +1,246 @@
+"""
+Declared pipeline stages and a concurrent scheduler.
+
+A ``Stage`` names the artifacts it reads (``inputs``) and produces
+(``outputs``); the dependency graph follows from those names, plus ``after``
+for ordering-only edges. ``Pipeline.run`` executes the selected stages as soon
+as their inputs exist, so independent work (the fits, the bar export, the
+figures) overlaps and wall time approaches the critical path.
+
+Stages run on a thread pool by default, which only overlaps I/O and NumPy work
+that releases the GIL. CPU-bound Python stages (distribution fits, figures)
+are declared with ``process=True`` and run on a process pool instead: their
+function and inputs are pickled to a worker and the outputs pickled back, so
+the function must be importable (module level or a ``functools.partial`` of
+one). Their ``imports`` are loaded in this process before the pool forks, so
+workers start with scipy/matplotlib already imported instead of each paying
+for it. Stages that share a ``lock`` name never run at the same time.
+
+Selection: ``only`` runs the named stages plus everything upstream they need;
+``until`` runs the stages in pipeline order up to and including the named one
+(and their upstream).
+"""
+from __future__ import annotations
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+class Stage:
+    """One unit of work: ``func(**inputs)`` returns its outputs.
+
+    With one output the return value is that artifact; with several, a tuple
+    in ``outputs`` order; with none it is ignored. A ``process`` stage is also
+    passed ``profiler=`` (the run's profiler, or one local to its worker).
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Sequence[str] = (), outputs: Sequence[str] = (),
+                 after: Sequence[str] = (), lock: Optional[str] = None, process: bool = False,
+                 imports: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.after = tuple(after)
+        self.lock = lock
+        self.process = process
+        self.imports = tuple(imports)
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+def _noop() -> None:
+    return None
+
+def _import_all(modules: Sequence[str]) -> None:
+    for m in modules:
+        importlib.import_module(m)
+
+def _call_in_worker(func: Callable[..., Any], inputs: Dict[str, Any], name: str,
+                    prof_config: Optional[Dict[str, Any]]):
+    """Run a process stage in a pool worker; profiler records travel back with the result."""
+    prof = None
+    if prof_config is not None:
+        from profiling import StageProfiler
+        prof = StageProfiler(**prof_config)
+        prof.start()
+    t0 = time.perf_counter()
+    try:
+        if prof is None:
+            res = func(**inputs, profiler=None)
+        else:
+            with prof.section(name, rows_in=prof.count_rows(inputs)) as sec:
+                res = func(**inputs, profiler=prof)
+                sec.rows_out = prof.count_rows(res)
+    finally:
+        if prof is not None:
+            prof.stop()
+    return res, t0, time.perf_counter(), prof.records if prof is not None else []
+
+class Pipeline:
+    """A DAG of stages over named artifacts."""
+
+    def __init__(self, stages: Iterable[Stage], provided: Iterable[str] = ()):
+        self.stages: Dict[str, Stage] = {}
+        self.producer: Dict[str, str] = {}
+        self.provided = set(provided)
+        for st in stages:
+            if st.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {st.name}")
+            self.stages[st.name] = st
+            for out in st.outputs:
+                if out in self.producer or out in self.provided:
+                    raise ValueError(f"Artifact {out!r} is produced twice")
+                self.producer[out] = st.name
+        self.deps: Dict[str, Set[str]] = {}
+        for st in self.stages.values():
+            deps = set()
+            for inp in st.inputs:
+                if inp in self.producer:
+                    deps.add(self.producer[inp])
+                elif inp not in self.provided:
+                    raise ValueError(f"Stage {st.name!r} needs {inp!r}, which nothing produces")
+            for a in st.after:
+                if a not in self.stages:
+                    raise ValueError(f"Stage {st.name!r} runs after unknown stage {a!r}")
+                deps.add(a)
+            self.deps[st.name] = deps
+        self.order = self._toposort()
+        self.timings: Dict[str, float] = {}
+        self.spans: Dict[str, tuple] = {}
+
+    def _toposort(self) -> List[str]:
+        """Topological order, keeping declaration order among ready stages."""
+        done: List[str] = []
+        left = list(self.stages)
+        while left:
+            ready = [n for n in left if self.deps[n].issubset(done)]
+            if not ready:
+                raise ValueError(f"Dependency cycle among stages: {left}")
+            done.append(ready[0])
+            left.remove(ready[0])
+        return done
+
+    def upstream(self, names: Iterable[str]) -> Set[str]:
+        """The named stages and everything they transitively depend on."""
+        out: Set[str] = set()
+        todo = list(names)
+        while todo:
+            n = todo.pop()
+            if n not in self.stages:
+                raise KeyError(f"Unknown stage {n!r}; known: {', '.join(self.order)}")
+            if n not in out:
+                out.add(n)
+                todo.extend(self.deps[n])
+        return out
+
+    def select(self, only: Optional[Iterable[str]] = None, until: Optional[str] = None) -> List[str]:
+        """Stage names to run, in pipeline order."""
+        chosen = set(self.order)
+        if until:
+            if until not in self.stages:
+                raise KeyError(f"Unknown stage {until!r}; known: {', '.join(self.order)}")
+            chosen = self.upstream(self.order[: self.order.index(until) + 1])
+        if only:
+            chosen &= self.upstream(only)
+        return [n for n in self.order if n in chosen]
+
+    def run(self, artifacts: Optional[Dict[str, Any]] = None, workers: int = 4,
+            only: Optional[Iterable[str]] = None, until: Optional[str] = None, profiler=None) -> Dict[str, Any]:
+        """Run the selected stages; returns all artifacts (provided ones included).
+
+        ``workers`` bounds both pools: threads for ordinary stages, processes
+        (also at most one per core) for ``process`` stages. With ``workers=1``
+        or a single core, process stages run on the threads too. With a
+        ``profiling.StageProfiler`` every stage runs inside a section that
+        records its input/output row counts.
+        """
+        arts = dict(artifacts or {})
+        missing = self.provided - set(arts)
+        if missing:
+            raise ValueError(f"Missing provided artifacts: {sorted(missing)}")
+        todo = self.select(only, until)
+        pending = list(todo)
+        finished: Set[str] = set()
+        running: Dict[Any, str] = {}
+        locks: Set[str] = set()
+        t_start = time.perf_counter()
+        workers = max(1, workers)
+        procs = None
+        # More processes than cores only adds pickling; with one, process stages run on the threads
+        nproc = min(workers, sum(self.stages[n].process for n in todo), os.cpu_count() or 1)
+        if nproc > 1:
+            # Fork all workers now, before any stage thread exists to hold a lock across the fork
+            modules = sorted({m for n in todo if self.stages[n].process for m in self.stages[n].imports})
+            _import_all(modules)     # inherited by forked workers; the initializer covers spawn
+            procs = ProcessPoolExecutor(max_workers=nproc, initializer=_import_all, initargs=(modules,))
+            wait([procs.submit(_noop) for _ in range(nproc)])
+
+        def call(st: Stage):
+            inputs = {k: arts[k] for k in st.inputs}
+            extra = {"profiler": profiler} if st.process else {}
+            t0 = time.perf_counter()
+            if profiler is None:
+                res = st.func(**inputs, **extra)
+            else:
+                with profiler.section(st.name, rows_in=profiler.count_rows(inputs)) as sec:
+                    res = st.func(**inputs, **extra)
+                    sec.rows_out = profiler.count_rows(res)
+            return res, t0, time.perf_counter()
+
+        def submit(ex, st: Stage):
+            if procs is None or not st.process:
+                return ex.submit(call, st)
+            prof_config = profiler.child_config() if profiler is not None else None
+            return procs.submit(_call_in_worker, st.func, {k: arts[k] for k in st.inputs}, st.name, prof_config)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as ex:
+                while pending or running:
+                    for n in list(pending):
+                        st = self.stages[n]
+                        if not (self.deps[n] & set(todo)).issubset(finished) or (st.lock and st.lock in locks):
+                            continue
+                        pending.remove(n)
+                        if st.lock:
+                            locks.add(st.lock)
+                        running[submit(ex, st)] = n
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        n = running.pop(fut)
+                        st = self.stages[n]
+                        if st.lock:
+                            locks.discard(st.lock)
+                        try:
+                            res, t0, t1, *records = fut.result()
+                        except Exception as e:
+                            for f in running:
+                                f.cancel()
+                            raise RuntimeError(f"Stage {n!r} failed: {e}") from e
+                        if records and profiler is not None:
+                            profiler.merge(records[0])
+                        if len(st.outputs) == 1:
+                            arts[st.outputs[0]] = res
+                        elif st.outputs:
+                            arts.update(zip(st.outputs, res))
+                        self.timings[n] = t1 - t0
+                        self.spans[n] = (t0 - t_start, t1 - t_start)
+                        finished.add(n)
+        finally:
+            if procs is not None:
+                procs.shutdown(cancel_futures=True)
+        self.wall = time.perf_counter() - t_start
+        return arts
+
+    def critical_path(self) -> float:
+        """Longest chain of stage durations among the stages that ran (seconds)."""
+        longest: Dict[str, float] = {}
+        for n in self.order:
+            if n in self.timings:
+                longest[n] = self.timings[n] + max((longest.get(d, 0.0) for d in self.deps[n]), default=0.0)
+        return max(longest.values(), default=0.0)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"wall": getattr(self, "wall", None), "sum": sum(self.timings.values()),
+                "critical_path": self.critical_path(), "stages": dict(self.timings)}
@@ -0,0 +1,173 @@
+"""
+Per-stage profiling: wall and CPU time, rows in/out, peak memory.
+
+``StageProfiler.section(name)`` is a context manager; sections nest (a pipeline
+stage contains read/clean/resample/... sub-sections, a fit stage one section per
+candidate) and each becomes one record. CPU time is the running thread's
+(``time.thread_time``), so it stays meaningful when stages run on a pool.
+Every record carries ``max_rss_mb``, the process's high-water resident set size
+when the section ends (``getrusage``; free to read, but it never goes down, so
+a section shows up only if it raises it). ``trace_memory`` adds ``peak_mb``,
+the section's own peak from ``tracemalloc`` (allocations made through Python
+and NumPy), at several times the run time. Both are process-wide: run stages
+one at a time when memory numbers matter. With ``dump_dir`` every top-level section also writes a cProfile
+``<name>.prof`` for ``snakeviz``/``pstats``.
+
+Stages on a process pool profile into a worker-local ``StageProfiler`` built
+from ``child_config()``; its records come back with the result and are
+``merge``d, on the same clock (``perf_counter`` is system-wide on Linux).
+
+A disabled profiler (``NULL_PROFILER``) makes every section a no-op, so
+instrumented code pays nothing in normal runs.
+"""
+from __future__ import annotations
+import cProfile
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_FIELDS = ["name", "parent", "depth", "start_s", "wall_s", "cpu_s", "rows_in", "rows_out", "rows_per_s", "peak_mb",
+                  "max_rss_mb"]
+
+def count_rows(obj: Any) -> Optional[int]:
+    """Rows of a frame/array, summed over a dict/list/tuple of them; None if none."""
+    if obj is None:
+        return None
+    if getattr(obj, "shape", None):         # frames, series, arrays (not scalars)
+        return int(obj.shape[0])
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)):
+        counts = [c for c in (count_rows(x) for x in obj if not isinstance(x, (str, bytes))) if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+def max_rss_mb() -> Optional[float]:
+    """High-water RSS of this process in MB, None where ``resource`` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10     # bytes on macOS, KiB on Linux
+
+class Section:
+    """Mutable record of one profiled section; set ``rows_out`` inside the block."""
+
+    def __init__(self, name: str, parent: Optional[str], depth: int, rows_in: Optional[int]):
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.peak_abs = 0
+
+class StageProfiler:
+    """Collects one record per section; thread-safe, sections nest per thread."""
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True, dump_dir: Optional[str] = None,
+                 t0: Optional[float] = None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.dump_dir = dump_dir if enabled else None
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._t0 = time.perf_counter() if t0 is None else t0
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+
+    def start(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _stack(self) -> List[Section]:
+        st = getattr(self._local, "stack", None)
+        if st is None:
+            st = self._local.stack = []
+        return st
+
+    @contextmanager
+    def section(self, name: str, rows_in: Optional[int] = None) -> Iterator[Section]:
+        stack = self._stack()
+        sec = Section(name, stack[-1].name if stack else None, len(stack), rows_in)
+        if not self.enabled:
+            yield sec
+            return
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            mem0 = tracemalloc.get_traced_memory()[0]
+            if stack:
+                # Resetting the peak below would lose the parent's high-water mark so far
+                stack[-1].peak_abs = max(stack[-1].peak_abs, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        prof = cProfile.Profile() if self.dump_dir and not stack else None
+        stack.append(sec)
+        w0, c0 = time.perf_counter(), time.thread_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield sec
+        finally:
+            if prof is not None:
+                prof.disable()
+                prof.dump_stats(os.path.join(self.dump_dir, re.sub(r"[^\w.-]+", "_", name) + ".prof"))
+            wall, cpu = time.perf_counter() - w0, time.thread_time() - c0
+            stack.pop()
+            peak_mb = None
+            if tracing:
+                sec.peak_abs = max(sec.peak_abs, tracemalloc.get_traced_memory()[1])
+                peak_mb = max(sec.peak_abs - mem0, 0) / 2**20
+                if stack:
+                    stack[-1].peak_abs = max(stack[-1].peak_abs, sec.peak_abs)
+            rows = sec.rows_out if sec.rows_out is not None else sec.rows_in
+            rec = {"name": name, "parent": sec.parent, "depth": sec.depth, "start_s": w0 - self._t0,
+                   "wall_s": wall, "cpu_s": cpu, "rows_in": sec.rows_in, "rows_out": sec.rows_out,
+                   "rows_per_s": rows / wall if rows and wall > 0 else None, "peak_mb": peak_mb,
+                   "max_rss_mb": max_rss_mb()}
+            with self._lock:
+                self.records.append(rec)
+
+    def child_config(self) -> Optional[Dict[str, Any]]:
+        """Arguments for a worker process's profiler (None when disabled)."""
+        if not self.enabled:
+            return None
+        return {"trace_memory": self.trace_memory, "dump_dir": self.dump_dir, "t0": self._t0}
+
+    def merge(self, records: List[Dict[str, Any]]) -> None:
+        """Add records collected by a worker's profiler."""
+        with self._lock:
+            self.records.extend(records)
+
+    count_rows = staticmethod(count_rows)
+
+    def table(self):
+        """Records as a frame, parents before their sections in start order."""
+        import pandas as pd
+        df = pd.DataFrame(self.records, columns=PROFILE_FIELDS)
+        df[["rows_in", "rows_out"]] = df[["rows_in", "rows_out"]].astype("Int64")
+        return df.sort_values(["start_s", "depth"], kind="stable").reset_index(drop=True)
+
+    def write(self, json_path: str, csv_path: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        records = self.table().astype(object).where(lambda d: d.notna(), None).to_dict("records")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"records": records}, f, indent=2)
+        if csv_path:
+            with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+                w.writeheader()
+                w.writerows(records)
+
+NULL_PROFILER = StageProfiler(enabled=False)
@@ -0,0 +1,189 @@
+"""
+Time-ordered replay of recorded trades and book updates.
+
+Each source is a stream of time-sorted chunks read from the Parquet tick store
+(``date=YYYY-MM-DD/*.parquet``), single Parquet files (memory-mapped, read by
+row group) or CSV. ``merge_streams`` k-way merges any number of sources by
+timestamp one batch at a time: everything up to the smallest "last timestamp"
+among the buffered chunks is safe to emit, so each batch is ordered with one
+vectorized stable argsort and memory stays bounded by a chunk per source. At
+equal timestamps events keep source order (e.g. trades before book).
+
+``Replayer`` emits the merged events to a handler as fast as possible or paced
+against the wall clock at ``speed`` x real time, and reports achieved events/sec
+and how far it fell behind schedule.
+"""
+from __future__ import annotations
+import glob
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_cleaning import to_datetime
+from tickstore import list_parts
+
+TRADE_FIELDS = ["price", "qty", "m"]
+BOOK_FIELDS = ["bid", "ask", "bid_size", "ask_size"]
+FIELDS = {"trade": TRADE_FIELDS, "book": BOOK_FIELDS}
+
+def _paths(path: str, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    if os.path.isdir(path):
+        return list_parts(path, start, end)
+    return sorted(glob.glob(path))
+
+def _frames(path: str, columns: List[str], batch_rows: int, start: Optional[str], end: Optional[str]) -> Iterator[pd.DataFrame]:
+    for p in _paths(path, start, end):
+        if p.endswith(".parquet"):
+            pf = pq.ParquetFile(pa.memory_map(p, "r"))
+            cols = [c for c in columns if c in pf.schema_arrow.names]
+            for batch in pf.iter_batches(batch_size=batch_rows, columns=cols):
+                yield batch.to_pandas()
+        else:
+            for chunk in pd.read_csv(p, chunksize=batch_rows):
+                yield chunk
+
+def open_source(path: str, kind: str, start: Optional[str] = None, end: Optional[str] = None,
+                batch_rows: int = 65_536) -> Iterator[pd.DataFrame]:
+    """Chunks of ``ts`` + the ``kind`` ("trade"/"book") fields from a store, file or glob.
+
+    Missing book sizes become NaN and a missing buyer-maker flag becomes None.
+    """
+    fields = FIELDS[kind]
+    lo = pd.Timestamp(start) if start else None
+    hi = pd.Timestamp(end) + pd.Timedelta(days=1) if end else None
+    for df in _frames(path, ["ts"] + fields, batch_rows, start, end):
+        df = df.copy()
+        df["ts"] = to_datetime(df["ts"])
+        for c in fields:
+            if c not in df.columns:
+                df[c] = None if c == "m" else np.nan
+        if lo is not None:
+            df = df[df["ts"] >= lo]
+        if hi is not None:
+            df = df[df["ts"] < hi]
+        if len(df):
+            yield df[["ts"] + fields]
+
+class _Buffer:
+    """The unconsumed tail (from ``pos``) of one source's current chunk."""
+
+    def __init__(self, name: str, chunks: Iterable[pd.DataFrame]):
+        self.name = name
+        self.it = iter(chunks)
+        self.ts = np.empty(0, dtype="int64")
+        self.rows: List[tuple] = []
+        self.pos = 0
+        self.last_ts: Optional[int] = None
+        self.done = False
+
+    def __len__(self) -> int:
+        return len(self.ts) - self.pos
+
+    def refill(self) -> None:
+        while not len(self) and not self.done:
+            try:
+                df = next(self.it)
+            except StopIteration:
+                self.done = True
+                return
+            ts = df["ts"].to_numpy("datetime64[ns]").view("int64")
+            if len(ts) and not (np.diff(ts) >= 0).all():
+                order = np.argsort(ts, kind="stable")
+                df, ts = df.iloc[order], ts[order]
+            if len(ts) and self.last_ts is not None and ts[0] < self.last_ts:
+                raise ValueError(f"source {self.name!r} is not in time order at {pd.Timestamp(int(ts[0]))}")
+            self.ts, self.pos = ts, 0
+            self.rows = list(zip(*(df[c].tolist() for c in df.columns[1:])))
+
+    def take(self, upto: int) -> Tuple[np.ndarray, List[tuple]]:
+        end = self.pos + int(np.searchsorted(self.ts[self.pos:], upto, side="right"))
+        ts, rows = self.ts[self.pos:end], self.rows[self.pos:end]
+        self.pos = end
+        if len(ts):
+            self.last_ts = int(ts[-1])
+        return ts, rows
+
+def merge_streams(sources: Dict[str, Iterable[pd.DataFrame]]) -> Iterator[Tuple[np.ndarray, List[str], List[tuple]]]:
+    """Merge time-sorted chunk streams; yields batches of ``(ts_ns, kinds, rows)`` in time order."""
+    bufs = [_Buffer(name, chunks) for name, chunks in sources.items()]
+    for b in bufs:
+        b.refill()
+    while True:
+        live = [b for b in bufs if len(b)]
+        if not live:
+            return
+        # No source can later produce an event before the smallest buffered tail
+        wm = min(int(b.ts[-1]) for b in live)
+        ts_parts, kinds, rows = [], [], []
+        for b in live:
+            ts, r = b.take(wm)
+            ts_parts.append(ts)
+            kinds += [b.name] * len(r)
+            rows += r
+            b.refill()
+        ts = np.concatenate(ts_parts)
+        order = np.argsort(ts, kind="stable")
+        yield ts[order], [kinds[i] for i in order], [rows[i] for i in order]
+
+class Replayer:
+    """Replay merged sources into ``handler(kind, ts_ns, row)``.
+
+    ``speed=None`` (or 0) emits as fast as possible; otherwise events are held
+    until ``(ts - first_ts) / speed`` seconds of wall time have passed.
+    """
+
+    def __init__(self, sources: Dict[str, Iterable[pd.DataFrame]], speed: Optional[float] = None,
+                 clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        self.sources = sources
+        self.speed = speed or None
+        self.clock = clock
+        self.sleep = sleep
+
+    def run(self, handler: Callable[[str, int, tuple], Any], limit: Optional[int] = None) -> Dict[str, Any]:
+        counts: Dict[str, int] = {k: 0 for k in self.sources}
+        n = 0
+        first_ts = last_ts = None
+        max_lag = 0.0
+        t0 = self.clock()
+        for ts, kinds, rows in merge_streams(self.sources):
+            if first_ts is None:
+                first_ts = int(ts[0])
+            if self.speed:
+                due = t0 + (ts - first_ts) / 1e9 / self.speed
+            for i in range(len(ts)):
+                if self.speed:
+                    delay = due[i] - self.clock()
+                    if delay > 0:
+                        self.sleep(delay)
+                    elif -delay > max_lag:
+                        max_lag = -delay
+                handler(kinds[i], int(ts[i]), rows[i])
+                counts[kinds[i]] += 1
+                n += 1
+                if limit is not None and n >= limit:
+                    break
+            last_ts = int(ts[i]) if len(ts) else last_ts
+            if limit is not None and n >= limit:
+                break
+        wall = self.clock() - t0
+        span = (last_ts - first_ts) / 1e9 if n else 0.0
+        return {"events": n, "by_kind": counts, "wall_seconds": wall, "data_seconds": span,
+                "events_per_sec": n / wall if wall else None,
+                "achieved_speed": span / wall if wall else None,
+                "max_lag_ms": max_lag * 1e3}
+
+def engine_handler(engine) -> Callable[[str, int, tuple], None]:
+    """Handler feeding a ``live.LiveAnalytics`` and recording its per-event latency."""
+    def handle(kind: str, ts_ns: int, row: tuple) -> None:
+        t = time.perf_counter_ns()
+        if kind == "trade":
+            price, qty, m = row
+            engine.on_trade(ts_ns, price, qty, None if m is None else bool(m))
+        else:
+            engine.on_book(ts_ns, *row)
+        engine.record_latency(time.perf_counter_ns() - t)
+    return handle
@@ -1,62 +1,86 @@
-
 import os
+import json
+import importlib.util
 from datetime import datetime
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 
-try:
-    from jinja2 import Environment, FileSystemLoader, select_autoescape
-    _HAS_JINJA2 = True
-except Exception:
-    _HAS_JINJA2 = False
+# jinja2 is imported on first render, not at import time (the pipeline imports this module for the manifest)
+_HAS_JINJA2 = importlib.util.find_spec("jinja2") is not None
 
 """
 HTML report builder. If Jinja2 is unavailable, falls back to a minimal template.
+
+Reports can be rendered straight from an artifact manifest (JSON written by the
+pipeline) so that re-theming, editing notes or building a multi-run index page
+never re-reads tables or recomputes anything.
 """
 
-def build_report(output_html: str, context: Dict[str, Any], templates_dir: str = "templates") -> None:
-    """Render the report to HTML."""
-    os.makedirs(os.path.dirname(output_html) or ".", exist_ok=True)
-    if _HAS_JINJA2:
-        env = Environment(loader=FileSystemLoader(templates_dir), autoescape=select_autoescape())
-        tpl = env.get_template("report.html")
-        html = tpl.render(**context)
-    else:
-        rows_figs = []
-        for fig in context.get("figures", []):
-            rows_figs.append(f"""
-            <div class='card'>
-                <h3>{fig.get('title','')}</h3>
-                <img src="{fig.get('path','')}" style="max-width:100%"/>
-                <p class='caption'>{fig.get('caption','')}</p>
-            </div>
-            """.strip())
-        rows_tbls = []
-        for tb in context.get("stats_tables", []):
-            rows_tbls.append(f"""
-            <div class='card'>
-                <h3>{tb.get('name','')}</h3>
-                {tb.get('table','')}
-            </div>
-            """.strip())
-        notes_html = "".join([f"<li>{n}</li>" for n in context.get("notes", [])])
-        html = f"""
-        <html><head><meta charset='utf-8'><title>{context.get('title','HFT Report')}</title>
-        <style>
-        body {{ font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin: 24px; }}
-        .grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(360px, 1fr)); gap: 16px; }}
-        .card {{ border: 1px solid #eee; border-radius: 12px; padding: 12px; box-shadow: 0 1px 6px rgba(0,0,0,0.06);}}
-        table {{ border-collapse: collapse; width: 100%; }}
-        th, td {{ border: 1px solid #ddd; padding: 6px; text-align: right; }}
-        th {{ background:#fafafa; text-align: left; }}
-        </style></head><body>
+MANIFEST_VERSION = 1
+
+_FALLBACK_CSS = """
+        body { font-family: -apple-system, Segoe UI, Roboto, Helvetica, Arial, sans-serif; margin: 24px; }
+        .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(360px, 1fr)); gap: 16px; }
+        .card { border: 1px solid #eee; border-radius: 12px; padding: 12px; box-shadow: 0 1px 6px rgba(0,0,0,0.06);}
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ddd; padding: 6px; text-align: right; }
+        th { background:#fafafa; text-align: left; }
+"""
+
+@lru_cache(maxsize=16)
+def _get_template(templates_dir: str, name: str):
+    """Compile a template once per (directory, name); the Environment is cached with it."""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    env = Environment(loader=FileSystemLoader(templates_dir), autoescape=select_autoescape())
+    return env.get_template(name)
+
+def _fallback_body(context: Dict[str, Any]) -> str:
+    rows_figs = []
+    for fig in context.get("figures", []):
+        rows_figs.append(f"""
+        <div class='card'>
+            <h3>{fig.get('title','')}</h3>
+            <img src="{fig.get('path','')}" style="max-width:100%"/>
+            <p class='caption'>{fig.get('caption','')}</p>
+        </div>
+        """.strip())
+    rows_tbls = []
+    for tb in context.get("stats_tables", []):
+        rows_tbls.append(f"""
+        <div class='card'>
+            <h3>{tb.get('name','')}</h3>
+            {tb.get('table','')}
+        </div>
+        """.strip())
+    notes_html = "".join([f"<li>{n}</li>" for n in context.get("notes", [])])
+    return f"""
         <h1>{context.get('title','HFT Report')}</h1>
         <div>Generated at {context.get('generated_at','')} · Symbol {context.get('symbol','')} · Bar {context.get('bar','')}</div>
         <h2>Key Figures</h2>
         <div class='grid'>{''.join(rows_figs)}</div>
         <h2>Statistics</h2>
         <div class='grid'>{''.join(rows_tbls)}</div>
-        <h2>Notes</h2><ul>{notes_html}</ul>
+        <h2>Notes</h2><ul>{notes_html}</ul>"""
+
+def _fallback_page(title: str, body: str) -> str:
+    return f"""
+        <html><head><meta charset='utf-8'><title>{title}</title>
+        <style>{_FALLBACK_CSS}</style></head><body>
+        {body}
         </body></html>"""
+
+def build_report(output_html: str, context: Dict[str, Any], templates_dir: str = "templates",
+                 template_name: str = "report.html") -> None:
+    """Render the report to HTML."""
+    os.makedirs(os.path.dirname(output_html) or ".", exist_ok=True)
+    if _HAS_JINJA2:
+        tpl = _get_template(os.path.abspath(templates_dir), template_name)
+        html = tpl.render(**context)
+    elif template_name == "index.html":
+        body = "".join(_fallback_body(r) for r in context.get("runs", []))
+        html = _fallback_page(context.get("title", "HFT Report Index"), body)
+    else:
+        html = _fallback_page(context.get("title", "HFT Report"), _fallback_body(context))
     with open(output_html, "w", encoding="utf-8") as f:
         f.write(html)
 
@@ -70,4 +94,96 @@ def default_context(title: str, symbol: str, bar: str) -> Dict[str, Any]:
         "stats_tables": [],
         "figures": [],
         "notes": [],
+        "metrics": {},
+        "timings": [],
+        "profile": [],
+    }
+
+# === Artifact manifest ===
+
+def new_manifest(title: str, symbol: str, bar: str) -> Dict[str, Any]:
+    """Create an empty artifact manifest.
+
+    Paths of tables and figures are stored relative to the manifest file, so a
+    results directory can be moved or combined with others.
+    """
+    m = default_context(title, symbol, bar)
+    m.pop("stats_tables")
+    m.update({"version": MANIFEST_VERSION, "tables": [], "timings": {}})
+    return m
+
+def add_table(manifest: Dict[str, Any], name: str, csv_path: str, html: str) -> None:
+    """Register a table artifact (CSV on disk plus its pre-rendered HTML)."""
+    manifest["tables"].append({"name": name, "csv": csv_path, "html": html})
+
+def add_figure(manifest: Dict[str, Any], title: str, path: str, caption: str = "") -> None:
+    """Register a figure artifact."""
+    manifest["figures"].append({"title": title, "path": path, "caption": caption})
+
+def write_manifest(path: str, manifest: Dict[str, Any]) -> str:
+    """Write the manifest as JSON, making artifact paths relative to its directory."""
+    base = os.path.dirname(os.path.abspath(path))
+    m = dict(manifest)
+    m["tables"] = [dict(t, csv=_relpath(t.get("csv"), base)) for t in manifest.get("tables", [])]
+    m["figures"] = [dict(f, path=_relpath(f.get("path"), base)) for f in manifest.get("figures", [])]
+    os.makedirs(base, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(m, f, indent=2, default=str)
+    os.replace(tmp, path)
+    return path
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load a manifest and resolve artifact paths to absolute paths."""
+    with open(path, "r", encoding="utf-8") as f:
+        m = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    m["tables"] = [dict(t, csv=_abspath(t.get("csv"), base)) for t in m.get("tables", [])]
+    m["figures"] = [dict(f, path=_abspath(f.get("path"), base)) for f in m.get("figures", [])]
+    return m
+
+def _relpath(p: Optional[str], base: str) -> Optional[str]:
+    if not p or not os.path.isabs(p):
+        return p
+    return os.path.relpath(p, base)
+
+def _abspath(p: Optional[str], base: str) -> Optional[str]:
+    if not p or os.path.isabs(p):
+        return p
+    return os.path.normpath(os.path.join(base, p))
+
+def context_from_manifest(manifest: Dict[str, Any], output_html: str,
+                          title: Optional[str] = None, notes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Turn a loaded manifest into a template context for a report at ``output_html``."""
+    out_dir = os.path.dirname(os.path.abspath(output_html))
+    ctx = default_context(title or manifest.get("title", "HFT Report"),
+                          manifest.get("symbol", ""), manifest.get("bar", ""))
+    ctx["generated_at"] = manifest.get("generated_at", ctx["generated_at"])
+    ctx["stats_tables"] = [{"name": t["name"], "table": t.get("html", "")} for t in manifest.get("tables", [])]
+    ctx["figures"] = [dict(f, path=os.path.relpath(f["path"], out_dir) if f.get("path") else "")
+                      for f in manifest.get("figures", [])]
+    ctx["notes"] = list(notes) if notes is not None else list(manifest.get("notes", []))
+    ctx["metrics"] = manifest.get("metrics", {})
+    timings = manifest.get("timings", {})
+    ctx["timings"] = [{"stage": k, "seconds": v} for k, v in timings.items()] if isinstance(timings, dict) else timings
+    ctx["profile"] = manifest.get("profile", [])
+    return ctx
+
+def render_manifest(manifest_path: str, output_html: str, templates_dir: str = "templates",
+                    title: Optional[str] = None, notes: Optional[List[str]] = None) -> str:
+    """Render a single-run report from a manifest file alone."""
+    m = load_manifest(manifest_path)
+    build_report(output_html, context_from_manifest(m, output_html, title=title, notes=notes), templates_dir)
+    return output_html
+
+def render_index(manifest_paths: List[str], output_html: str, templates_dir: str = "templates",
+                 title: str = "HFT Report Index") -> str:
+    """Combine several manifests (symbols, days) into one index report."""
+    runs = [context_from_manifest(load_manifest(p), output_html) for p in manifest_paths]
+    ctx = {
+        "title": title,
+        "generated_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC"),
+        "runs": runs,
     }
+    build_report(output_html, ctx, templates_dir, template_name="index.html")
+    return output_html
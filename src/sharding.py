@@ -0,0 +1,214 @@
+"""
+Time-sharded bar features on a process pool, bit-identical to the serial path.
+
+The serial path (``run_all``'s ``bars`` stage) is::
+
+    bars = add_returns(resample_trades(tdf, bar))
+    bars["vol_roll"] = rolling_vol(bars)
+    bars = merge_trade_book(bars, bdf)          # join per-bar book, then ffill
+
+The bar grid is split into contiguous, bar-aligned shards. Each shard resamples
+only its own trades and book rows, plus a halo of one bar before its start, so
+``ret``/``logret`` across the boundary use the true previous close, and takes
+the last book quote of each of its bars. Every per-bar value depends only on
+rows inside that bar, so the stitched frames are exactly the serial ones before
+rolling and filling.
+
+The O(ticks) work happens in the workers, the parent only finds the shard
+edges and stitches:
+
+- ``sharded_features_from_store`` takes tick store directories. The parent
+  reads the first/last timestamp from the Parquet footers; each worker reads
+  its ``[lo - halo, hi)`` rows (only the date partitions it needs, filtered by
+  ``ts``) and cleans them itself. ``sharded_store_outputs`` also returns the
+  trade sizes and row counts from the same reads, so the parent never loads
+  the ticks at all.
+- ``sharded_features`` takes cleaned frames. Forked workers inherit them and
+  slice their own rows, so nothing is copied or pickled per shard. Where fork
+  is unavailable, the slices are pickled to the workers instead.
+
+Cleaning sorts stably, so a shard cleaned on its own has its rows (ties
+included) in the order they have in the fully cleaned frame.
+
+The parent then computes ``vol_roll`` and the as-of forward fill on the
+stitched frame. Both are O(bars) and cheap next to the O(ticks) shard work.
+They need state from arbitrarily far back: pandas' rolling std is an online
+update whose rounding depends on where it starts, and a fill can reach across
+any gap. So a fixed halo would match the serial result only to ~1e-18, not
+bit for bit.
+
+The bar must divide one day so that shard-local resampling uses the same bin
+edges as the serial run.
+"""
+from __future__ import annotations
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from features import resample_trades, add_returns, rolling_vol, VOL_WINDOW, VOL_MIN_PERIODS
+
+# Frames of the running sharded_features calls, inherited by its forked workers
+_FRAMES: Dict[int, Tuple[pd.DataFrame, Optional[pd.DataFrame]]] = {}
+_KEYS = itertools.count()
+
+def serial_features(tdf: pd.DataFrame, bdf: Optional[pd.DataFrame] = None, bar: str = "1s") -> pd.DataFrame:
+    """The reference single-process computation (what ``run_all`` does without ``--shards``)."""
+    from features import merge_trade_book
+    bars = add_returns(resample_trades(tdf, rule=bar), price_col="close")
+    bars["vol_roll"] = rolling_vol(bars, col="logret", window=VOL_WINDOW, min_periods=VOL_MIN_PERIODS)
+    if bdf is not None and {"mid", "spread_bp"}.issubset(bdf.columns):
+        bars = merge_trade_book(bars, bdf)
+    return bars
+
+def shard_edges(first_bar: pd.Timestamp, last_bar: pd.Timestamp, bar: str, shards: int) -> List[pd.Timestamp]:
+    """``shards + 1`` bar-aligned edges covering ``[first_bar, last_bar]`` (fewer if there are few bars)."""
+    step = pd.Timedelta(bar)
+    nbars = int((last_bar - first_bar) // step) + 1
+    cuts = np.unique(np.linspace(0, nbars, max(1, shards) + 1).round().astype("int64"))
+    return [first_bar + int(c) * step for c in cuts]
+
+def _shard_ranges(first: Any, last: Any, bar: str, shards: int) -> List[Tuple[pd.Timestamp, pd.Timestamp, bool]]:
+    """``(start, end, halo)`` per shard for ticks spanning ``[first, last]``."""
+    if pd.Timedelta("1D") % pd.Timedelta(bar) != pd.Timedelta(0):
+        raise ValueError(f"Sharded bars need a bar that divides one day, got {bar!r}")
+    edges = shard_edges(pd.Timestamp(first).floor(bar), pd.Timestamp(last).floor(bar), bar, shards)
+    return [(lo, hi, k > 0) for k, (lo, hi) in enumerate(zip(edges[:-1], edges[1:]))]
+
+def _shard_bars(trades: pd.DataFrame, book: Optional[pd.DataFrame], bar: str, start: pd.Timestamp,
+                end: pd.Timestamp, halo: bool) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+    """Bars of ``[start, end)`` with returns, and the per-bar last book row; ``trades`` may start one bar early."""
+    step = pd.Timedelta(bar)
+    lo = start - step if halo else start
+    grid = pd.date_range(lo, end - step, freq=bar, name="ts")
+    res = resample_trades(trades, rule=bar)
+    bars = res.reindex(grid)
+    # Empty bars: sums and counts are 0 in the serial resample, prices NaN
+    bars["vol"] = bars["vol"].fillna(0.0)
+    bars["ntrades"] = bars["ntrades"].fillna(0).astype(res["ntrades"].dtype)
+    bars = add_returns(bars, price_col="close")
+    if halo:
+        bars = bars.iloc[1:]
+    book_bars = book[["mid", "spread_bp"]].resample(bar).last() if book is not None else None
+    return bars, book_bars
+
+def _rows(ts: np.ndarray, lo: pd.Timestamp, hi: pd.Timestamp) -> Tuple[int, int]:
+    i, j = np.searchsorted(ts, [lo.to_datetime64(), hi.to_datetime64()], side="left")
+    return int(i), int(j)
+
+def _frame_shard(key: int, t_rows: Tuple[int, int], b_rows: Optional[Tuple[int, int]], bar: str,
+                 start: pd.Timestamp, end: pd.Timestamp, halo: bool):
+    trades, book = _FRAMES[key]
+    return _shard_bars(trades.iloc[slice(*t_rows)], book.iloc[slice(*b_rows)] if book is not None else None,
+                       bar, start, end, halo)
+
+def _read_range(root: str, lo: Optional[pd.Timestamp], hi: Optional[pd.Timestamp]) -> pd.DataFrame:
+    """Store rows with ``lo <= ts < hi`` (None: unbounded), in store order, from the date partitions they can be in."""
+    from tickstore import list_parts
+    start = f"{lo:%Y-%m-%d}" if lo is not None else None
+    end = f"{hi - pd.Timedelta(1, 'ns'):%Y-%m-%d}" if hi is not None else None
+    # With no partition in range, one file filtered to nothing still gives the store's column types
+    parts = list_parts(root, start, end) or list_parts(root)[:1]
+    filters = [f for f in (("ts", ">=", lo), ("ts", "<", hi)) if f[2] is not None] or None
+    return pd.concat([pd.read_parquet(p, filters=filters) for p in parts], ignore_index=True)
+
+def _store_shard(trades_root: str, book_root: Optional[str], quotes: bool, bar: str, start: pd.Timestamp,
+                 end: pd.Timestamp, halo: bool, first: bool, last: bool):
+    """``_shard_bars`` of a store range, plus the shard's own trade sizes and cleaned row counts."""
+    from data_cleaning import clean_trades, clean_book
+    from features import compute_spread_from_book
+    trades = clean_trades(_read_range(trades_root, start - pd.Timedelta(bar) if halo else start, end))
+    book = None
+    n_book = 0
+    if book_root:
+        # The outer shards also take the book rows before/after the trades: only counted, as in the serial load
+        book = compute_spread_from_book(clean_book(_read_range(book_root, None if first else start,
+                                                               None if last else end)))
+        n_book = len(book)
+    bars, book_bars = _shard_bars(trades, book if quotes else None, bar, start, end, halo)
+    own = trades["ts"].to_numpy() >= start.to_datetime64()
+    qty = trades["qty"].to_numpy()[own] if "qty" in trades.columns else None
+    return bars, book_bars, qty, int(own.sum()), n_book
+
+def _map(func: Callable, jobs: Sequence[Tuple], workers: int, mp_context=None) -> List[Any]:
+    if workers <= 1 or len(jobs) <= 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=mp_context) as ex:
+        return list(ex.map(func, *zip(*jobs)))
+
+def _stitch(parts: List[Tuple[pd.DataFrame, Optional[pd.DataFrame]]], bar: str, with_book: bool) -> pd.DataFrame:
+    bars = pd.concat([p[0] for p in parts])
+    bars.index.freq = pd.Timedelta(bar)
+    bars["vol_roll"] = rolling_vol(bars, col="logret", window=VOL_WINDOW, min_periods=VOL_MIN_PERIODS)
+    if with_book:
+        # As merge_trade_book: left join of the per-bar book, then carry every column forward
+        bars = bars.join(pd.concat([p[1] for p in parts])).ffill()
+    return bars
+
+def sharded_features(tdf: pd.DataFrame, bdf: Optional[pd.DataFrame] = None, bar: str = "1s",
+                     shards: Optional[int] = None, workers: Optional[int] = None) -> pd.DataFrame:
+    """``serial_features`` computed over time shards on a process pool; same result bit for bit."""
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    if tdf.empty or shards <= 1:
+        return serial_features(tdf, bdf, bar)
+    # Cleaned frames are sorted already; otherwise sort as the serial resample does, so ties keep its order
+    trades = tdf if tdf["ts"].is_monotonic_increasing else tdf.set_index("ts").sort_index().reset_index()
+    book = None
+    if bdf is not None and {"mid", "spread_bp"}.issubset(bdf.columns):
+        book = bdf if bdf.index.is_monotonic_increasing else bdf.sort_index()
+    tts = trades["ts"].to_numpy()
+    bts = book.index.to_numpy() if book is not None else None
+    step = pd.Timedelta(bar)
+    ranges = _shard_ranges(tts[0], tts[-1], bar, shards)
+    rows = [(_rows(tts, lo - step if halo else lo, hi), _rows(bts, lo, hi) if book is not None else None)
+            for lo, hi, halo in ranges]
+    if workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        jobs = [(trades.iloc[slice(*t)], book.iloc[slice(*b)] if book is not None else None, bar, lo, hi, halo)
+                for (t, b), (lo, hi, halo) in zip(rows, ranges)]
+        return _stitch(_map(_shard_bars, jobs, workers), bar, book is not None)
+    key = next(_KEYS)
+    _FRAMES[key] = (trades, book)
+    try:
+        jobs = [(key, t, b, bar, lo, hi, halo) for (t, b), (lo, hi, halo) in zip(rows, ranges)]
+        parts = _map(_frame_shard, jobs, workers, multiprocessing.get_context("fork") if workers > 1 else None)
+    finally:
+        del _FRAMES[key]
+    return _stitch(parts, bar, book is not None)
+
+def sharded_store_outputs(trades_root: str, book_root: Optional[str] = None, bar: str = "1s",
+                          shards: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Bars, trade sizes and row counts of cleaned tick stores, each worker reading and cleaning its own range.
+
+    With ``tdf = clean_trades(read_ticks(trades_root))`` and ``bdf =
+    compute_spread_from_book(clean_book(read_ticks(book_root)))``, returns
+    ``{"bars": serial_features(tdf, bdf, bar), "sizes": tdf[["qty"]], "trades": len(tdf),
+    "book_rows": len(bdf)}``; bars and sizes bit for bit, sizes with a fresh index.
+    """
+    from tickstore import store_columns, ts_range
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers
+    first, last = ts_range(trades_root)
+    if first is None:
+        raise ValueError(f"No trades in {trades_root}")
+    # Without quotes there is no mid/spread to join, as in the serial path; the rows still count
+    quotes = bool(book_root) and {"bid", "ask"}.issubset(store_columns(book_root))
+    ranges = _shard_ranges(first, last, bar, shards)
+    jobs = [(trades_root, book_root, quotes, bar, lo, hi, halo, k == 0, k == len(ranges) - 1)
+            for k, (lo, hi, halo) in enumerate(ranges)]
+    parts = _map(_store_shard, jobs, workers)
+    qty = [p[2] for p in parts]
+    return {"bars": _stitch([p[:2] for p in parts], bar, quotes),
+            "sizes": pd.DataFrame({"qty": np.concatenate(qty)} if qty[0] is not None else {}),
+            "trades": sum(p[3] for p in parts), "book_rows": sum(p[4] for p in parts)}
+
+def sharded_features_from_store(trades_root: str, book_root: Optional[str] = None, bar: str = "1s",
+                                shards: Optional[int] = None, workers: Optional[int] = None) -> pd.DataFrame:
+    """``serial_features`` of cleaned tick stores, each worker reading and cleaning its own time range.
+
+    Same result bit for bit as ``serial_features(clean_trades(read_ticks(trades_root)),
+    compute_spread_from_book(clean_book(read_ticks(book_root))), bar)``.
+    """
+    return sharded_store_outputs(trades_root, book_root, bar, shards, workers)["bars"]
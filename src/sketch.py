@@ -0,0 +1,280 @@
+"""
+Mergeable streaming quantile sketches (KLL) for out-of-core summaries.
+
+``KLLSketch`` keeps a stack of compactors: level ``h`` holds items of weight
+``2**h`` and has capacity ``k * (2/3)**(H-h-1)``. When a level overflows it is
+sorted and every other item (random offset) moves up a level, so the total
+weight stays exactly ``n`` and memory stays around ``3k`` items whatever ``n``.
+Sketches built per chunk, per file or per process merge by concatenating levels
+and compacting again; the error bound is the same as for one sketch over all
+the data. Queried ranks are within ``rank_error(k)`` of the true rank (as a
+fraction of ``n``) with ~99% probability, i.e. about 1.3% for ``k=200``; the
+minimum and maximum are exact.
+
+Day sketches: ``build_partition_sketches`` streams one ``date=`` partition of a
+tick store (Parquet batches) into sketches of ``qty`` and bar ``absret`` (trade
+stores) or ``spread_bp`` (book stores) and stores them as ``sketch.json`` next
+to the parts (the first bar return of each day, which spans midnight, is left
+out). Multi-day summaries merge those files and never re-read ticks.
+"""
+from __future__ import annotations
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from tickstore import partition_dir, save_json_atomic
+
+DEFAULT_K = 200
+SKETCH_FILE = "sketch.json"
+SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+TAIL_QUANTILES = (0.99, 0.999, 0.9999)
+
+def rank_error(k: int) -> float:
+    """Normalized rank error at ~99% confidence (empirical fit for KLL with c=2/3)."""
+    return 2.296 / k ** 0.9723
+
+class KLLSketch:
+    """Streaming quantile sketch; ``update`` takes scalars or arrays (NaNs ignored)."""
+
+    def __init__(self, k: int = DEFAULT_K, seed: Optional[int] = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = int(k)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - h - 1))))
+
+    def _compress(self) -> None:
+        while True:
+            h = next((i for i, lvl in enumerate(self.levels) if len(lvl) > self._capacity(i)), None)
+            if h is None:
+                return
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            lvl = np.sort(self.levels[h])
+            keep = len(lvl) % 2     # an odd item stays behind at this level
+            self.levels[h] = lvl[:keep]
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], lvl[keep + self._rng.integers(2)::2]])
+
+    def update(self, values) -> "KLLSketch":
+        x = np.asarray(values, dtype="float64").ravel()
+        x = x[~np.isnan(x)]
+        if x.size:
+            self.n += x.size
+            self.min = min(self.min, float(x.min()))
+            self.max = max(self.max, float(x.max()))
+            self.levels[0] = np.concatenate([self.levels[0], x])
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold ``other`` into this sketch (in place); returns self."""
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, lvl in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], lvl])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Value(s) at quantile(s) ``q`` in [0, 1]; NaN for an empty sketch."""
+        q = np.asarray(q, dtype="float64")
+        if self.n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else float("nan")
+        items, cw = self._weighted()
+        idx = np.minimum(np.searchsorted(cw, q * cw[-1], side="left"), len(items) - 1)
+        out = np.where(q <= 0, self.min, np.where(q >= 1, self.max, items[idx]))
+        return out if q.ndim else float(out)
+
+    def cdf(self, x):
+        """Estimated fraction of values <= ``x``."""
+        x = np.asarray(x, dtype="float64")
+        if self.n == 0:
+            return np.full(x.shape, np.nan) if x.ndim else float("nan")
+        items, cw = self._weighted()
+        idx = np.searchsorted(items, x, side="right")
+        out = np.where(idx > 0, cw[np.maximum(idx - 1, 0)] / cw[-1], 0.0)
+        return out if x.ndim else float(out)
+
+    def ecdf(self, points: int = 200):
+        """``(x, F(x))`` points of the ECDF, evenly spaced in probability."""
+        x = self.quantile(np.linspace(0.0, 1.0, points))
+        return x, self.cdf(x)
+
+    def summary(self, quantiles: Sequence[float] = SUMMARY_QUANTILES,
+                tails: Sequence[float] = TAIL_QUANTILES) -> Dict[str, Any]:
+        qs = list(quantiles) + [t for t in tails if t not in quantiles]
+        vals = self.quantile(qs) if self.n else [None] * len(qs)
+        return {"n": self.n, "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "rank_error": rank_error(self.k),
+                "quantiles": {f"p{q * 100:g}": (None if v is None else float(v)) for q, v in zip(qs, vals)}}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "n": self.n, "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "levels": [lvl.tolist() for lvl in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], seed: Optional[int] = None) -> "KLLSketch":
+        sk = cls(d["k"], seed=seed)
+        sk.n = int(d["n"])
+        if sk.n:
+            sk.min, sk.max = float(d["min"]), float(d["max"])
+        sk.levels = [np.asarray(lvl, dtype="float64") for lvl in d["levels"]] or [np.empty(0)]
+        return sk
+
+def merge_all(sketches: Iterable[KLLSketch], k: int = DEFAULT_K) -> KLLSketch:
+    out = KLLSketch(k, seed=0)
+    for sk in sketches:
+        out.merge(sk)
+    return out
+
+class BarReturns:
+    """Bar ``absret`` from trade chunks, matching ``add_returns(resample_trades(...))``.
+
+    The last (possibly incomplete) bar of each chunk is held back until the next
+    chunk, and the previous close is carried so returns across chunk boundaries
+    are exact; empty bars give NaN returns as in the batch path.
+    """
+
+    def __init__(self, rule: str = "1s"):
+        self.rule = rule
+        self.carry: Optional[pd.DataFrame] = None
+        self.prev: Optional[pd.Series] = None
+
+    def update(self, trades: pd.DataFrame, final: bool = False) -> np.ndarray:
+        d = trades if self.carry is None else pd.concat([self.carry, trades], ignore_index=True)
+        self.carry = None
+        if not final and len(d):
+            cut = d["ts"].iloc[-1].floor(self.rule)
+            tail = (d["ts"] >= cut).to_numpy()
+            self.carry, d = d[tail], d[~tail]
+        if d.empty:
+            return np.empty(0)
+        # Same as resample_trades(...)["close"]
+        close = d.set_index("ts")["price"].resample(self.rule).last()
+        prev = self.prev
+        if prev is not None:
+            close = pd.concat([prev, close]).asfreq(self.rule)
+        self.prev = close.iloc[-1:]
+        absret = np.log(close).diff().abs().to_numpy()
+        return absret[1:] if prev is not None else absret
+
+    def finish(self) -> np.ndarray:
+        """Returns of the held-back last bar."""
+        return self.update(self.carry.iloc[:0], final=True) if self.carry is not None else np.empty(0)
+
+def _iter_batches(paths: List[str], columns: List[str], batch_rows: int) -> Iterator[pd.DataFrame]:
+    import pyarrow.parquet as pq
+    for path in paths:
+        pf = pq.ParquetFile(path, memory_map=True)
+        cols = [c for c in columns if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=batch_rows, columns=cols):
+            yield batch.to_pandas()
+
+def _is_book(paths: List[str]) -> bool:
+    import pyarrow.parquet as pq
+    return "bid" in pq.ParquetFile(paths[0]).schema_arrow.names
+
+def build_partition_sketches(pdir: str, bar: str = "1s", k: int = DEFAULT_K, batch_rows: int = 1_000_000,
+                             seed: Optional[int] = 0) -> Dict[str, Any]:
+    """Sketch one ``date=`` partition and write ``<pdir>/sketch.json``; returns its content."""
+    from features import spread_bp
+    paths = sorted(os.path.join(pdir, f) for f in os.listdir(pdir) if f.endswith(".parquet"))
+    rows = 0
+    if paths and _is_book(paths):
+        kind = "book"
+        sketches = {"spread_bp": KLLSketch(k, seed)}
+        for df in _iter_batches(paths, ["bid", "ask"], batch_rows):
+            sketches["spread_bp"].update(spread_bp(df["bid"].to_numpy(), df["ask"].to_numpy()))
+            rows += len(df)
+    else:
+        kind = "trades"
+        sketches = {"qty": KLLSketch(k, seed), "absret": KLLSketch(k, seed)}
+        rets = BarReturns(bar)
+        for df in _iter_batches(paths, ["ts", "price", "qty"], batch_rows):
+            sketches["qty"].update(df["qty"].to_numpy())
+            sketches["absret"].update(rets.update(df[["ts", "price"]]))
+            rows += len(df)
+        sketches["absret"].update(rets.finish())
+    out = {"kind": kind, "bar": bar, "k": k, "rows": rows, "parts": [os.path.basename(p) for p in paths],
+           "sketches": {name: sk.to_dict() for name, sk in sketches.items()}}
+    save_json_atomic(os.path.join(pdir, SKETCH_FILE), out)
+    return out
+
+def _dates(root: str, start: Optional[str], end: Optional[str]) -> List[str]:
+    if not os.path.isdir(root):
+        return []
+    dates = [d[len("date="):] for d in sorted(os.listdir(root)) if d.startswith("date=")]
+    return [d for d in dates if not ((start and d < start) or (end and d > end))]
+
+def _up_to_date(pdir: str, bar: str, k: int) -> bool:
+    path = os.path.join(pdir, SKETCH_FILE)
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    parts = sorted(f for f in os.listdir(pdir) if f.endswith(".parquet"))
+    newest = max((os.path.getmtime(os.path.join(pdir, p)) for p in parts), default=0.0)
+    return (meta.get("bar") == bar and meta.get("k") == k and meta.get("parts") == parts
+            and os.path.getmtime(path) >= newest)
+
+def build_store_sketches(root: str, start: Optional[str] = None, end: Optional[str] = None, bar: str = "1s",
+                         k: int = DEFAULT_K, workers: int = 4, force: bool = False) -> Dict[str, List[str]]:
+    """(Re)build missing or stale day sketches of a store in parallel; returns built/skipped dates."""
+    todo, skipped = [], []
+    for date in _dates(root, start, end):
+        pdir = partition_dir(root, date)
+        (skipped if not force and _up_to_date(pdir, bar, k) else todo).append(date)
+    built = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as ex:
+            futs = {ex.submit(build_partition_sketches, partition_dir(root, d), bar, k): d for d in todo}
+            for fut in as_completed(futs):
+                fut.result()
+                built.append(futs[fut])
+    return {"built": sorted(built), "skipped": skipped}
+
+def load_store_sketches(root: str, start: Optional[str] = None, end: Optional[str] = None,
+                        k: int = DEFAULT_K) -> Dict[str, KLLSketch]:
+    """Merge the stored day sketches of ``[start, end]`` into one sketch per variable."""
+    merged: Dict[str, KLLSketch] = {}
+    for date in _dates(root, start, end):
+        path = os.path.join(partition_dir(root, date), SKETCH_FILE)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            day = json.load(f)
+        for name, d in day["sketches"].items():
+            merged.setdefault(name, KLLSketch(k, seed=0)).merge(KLLSketch.from_dict(d))
+    return merged
+
+def sketch_frame_columns(frames: Iterable[pd.DataFrame], columns: Sequence[str],
+                         k: int = DEFAULT_K) -> Dict[str, KLLSketch]:
+    """One sketch per column over a stream of frames (e.g. Parquet batches)."""
+    sketches = {c: KLLSketch(k) for c in columns}
+    for df in frames:
+        for c in columns:
+            if c in df.columns:
+                sketches[c].update(df[c].to_numpy())
+    return sketches
@@ -0,0 +1,154 @@
+"""
+Synthetic aggTrades and top-of-book data at any size, generated in chunks.
+
+One latent state drives everything, so the stylized facts the pipeline looks
+for show up together:
+
+- volatility clustering: log-volatility is an AR(1) (``vol_persistence``)
+- bursts: rare shocks to an activity level that decays slowly (``burst_*``),
+  raising both trade intensity and volatility
+- heavy tails: Student-t mid-price innovations and Pareto trade sizes
+- sides: the buyer-maker flag persists (order splitting), trades print at the
+  bid or ask they hit, and spreads in ticks widen with volatility
+
+The recursions are run with ``scipy.signal.lfilter`` whose filter state is
+carried between chunks, so a chunked run reproduces a one-shot run exactly and
+memory stays at one chunk regardless of ``n_trades`` (10^4 to 10^9 rows).
+Trades have the tick store columns (``ts, price, qty, a, f, l, m``) with
+millisecond timestamps like Binance; the book has one quote per trade.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from tickstore import PartWriter, TRADE_COLUMNS
+
+BOOK_COLUMNS = ["ts", "bid", "ask", "bid_size", "ask_size"]
+
+class SynthParams:
+    """Generator settings (per-trade scales)."""
+
+    def __init__(self, start: str = "2025-08-01", price0: float = 30_000.0, tick: float = 0.01,
+                 trades_per_sec: float = 20.0, vol_bp: float = 0.5, vol_persistence: float = 0.999,
+                 vol_of_vol: float = 0.02, burst_prob: float = 1e-4, burst_size: float = 1.5,
+                 burst_decay: float = 0.995, side_persistence: float = 0.7, size_alpha: float = 1.6,
+                 min_qty: float = 1e-4, tail_df: float = 4.0):
+        self.start = start
+        self.price0 = price0
+        self.tick = tick
+        self.trades_per_sec = trades_per_sec
+        self.vol_bp = vol_bp
+        self.vol_persistence = vol_persistence
+        self.vol_of_vol = vol_of_vol
+        self.burst_prob = burst_prob
+        self.burst_size = burst_size
+        self.burst_decay = burst_decay
+        self.side_persistence = side_persistence
+        self.size_alpha = size_alpha
+        self.min_qty = min_qty
+        self.tail_df = tail_df
+
+def iter_synthetic(n_trades: int, chunk_rows: int = 1_000_000, seed: int = 0,
+                   params: Optional[SynthParams] = None) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Yield ``(trades, book)`` chunks totalling ``n_trades`` rows each."""
+    p = params or SynthParams()
+    # One random stream per quantity, so the draws (and the output) do not depend on chunk_rows
+    (r_vol, r_burst, r_dt, r_ret, r_side, r_spread, r_qty, r_fill, r_bsz, r_asz) = (
+        np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(10))
+    zi_h = np.zeros(1)
+    zi_b = np.zeros(1)
+    t_ns = pd.Timestamp(p.start).value
+    log_mid = np.log(p.price0)
+    side = 0
+    next_a = 0
+    next_f = 0
+    t_scale = np.sqrt((p.tail_df - 2) / p.tail_df)
+    done = 0
+    while done < n_trades:
+        m = min(chunk_rows, n_trades - done)
+        h, zi_h = lfilter([1.0], [1.0, -p.vol_persistence], r_vol.normal(0.0, p.vol_of_vol, m), zi=zi_h)
+        shocks = (r_burst.random(m) < p.burst_prob) * p.burst_size
+        b, zi_b = lfilter([1.0], [1.0, -p.burst_decay], shocks, zi=zi_b)
+
+        intensity = p.trades_per_sec * np.exp(0.5 * h + b)
+        dt = (r_dt.exponential(1.0, m) / intensity * 1e9).astype("int64")
+        ts = t_ns + np.cumsum(dt)
+        t_ns = int(ts[-1])
+
+        sigma = p.vol_bp * 1e-4 * np.exp(h + 0.5 * b)
+        lm = log_mid + np.cumsum(sigma * r_ret.standard_t(p.tail_df, m) * t_scale)
+        log_mid = float(lm[-1])
+        mid = np.exp(lm)
+
+        flips = r_side.random(m) > p.side_persistence
+        s = (side + np.cumsum(flips)) % 2
+        side = int(s[-1])
+        is_sell = s == 1
+
+        spread_ticks = 1 + np.floor(r_spread.exponential(0.5, m) * np.exp(h + b))
+        bid = np.floor(mid / p.tick - spread_ticks / 2) * p.tick
+        ask = bid + spread_ticks * p.tick
+        qty = np.round(p.min_qty * (r_qty.pareto(p.size_alpha, m) + 1.0), 8)
+
+        n_fills = r_fill.geometric(0.6, m)
+        f = next_f + np.cumsum(n_fills) - n_fills
+        next_f = int(f[-1] + n_fills[-1])
+        a = next_a + np.arange(m)
+        next_a += m
+
+        ts_ms = pd.to_datetime(ts // 1_000_000 * 1_000_000)
+        trades = pd.DataFrame({"ts": ts_ms, "price": np.round(np.where(is_sell, bid, ask), 8), "qty": qty,
+                               "a": a, "f": f, "l": f + n_fills - 1, "m": is_sell})
+        book = pd.DataFrame({"ts": ts_ms, "bid": np.round(bid, 8), "ask": np.round(ask, 8),
+                             "bid_size": np.round(p.min_qty * (r_bsz.pareto(p.size_alpha, m) + 1.0) * 10, 8),
+                             "ask_size": np.round(p.min_qty * (r_asz.pareto(p.size_alpha, m) + 1.0) * 10, 8)})
+        done += m
+        yield trades[TRADE_COLUMNS], book
+
+def generate(n_trades: int, seed: int = 0, params: Optional[SynthParams] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """In-memory trades and book (for tests and benchmarks up to a few million rows)."""
+    chunks = list(iter_synthetic(n_trades, chunk_rows=max(n_trades, 1), seed=seed, params=params))
+    return chunks[0] if len(chunks) == 1 else (pd.concat([c[0] for c in chunks]), pd.concat([c[1] for c in chunks]))
+
+def write_synthetic(out_dir: str, n_trades: int, chunk_rows: int = 1_000_000, seed: int = 0, fmt: str = "store",
+                    params: Optional[SynthParams] = None) -> Dict[str, Any]:
+    """Write trades and book under ``out_dir`` chunk by chunk.
+
+    ``fmt="store"``: date-partitioned tick stores ``trades/`` and ``book/``;
+    ``fmt="parquet"``: ``trades.parquet`` and ``book.parquet`` (one row group per chunk);
+    ``fmt="csv"``: ``trades.csv`` and ``book.csv`` (small sizes, e.g. for ``run_all``).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    os.makedirs(out_dir, exist_ok=True)
+    rows = 0
+    if fmt == "store":
+        meta = {"synthetic": {"seed": seed, "n_trades": n_trades}}
+        with PartWriter(os.path.join(out_dir, "trades"), rows_per_part=chunk_rows, meta=meta) as tw, \
+                PartWriter(os.path.join(out_dir, "book"), rows_per_part=chunk_rows, id_col=None, meta=meta) as bw:
+            for trades, book in iter_synthetic(n_trades, chunk_rows, seed, params):
+                tw.write(trades); bw.write(book); rows += len(trades)
+    elif fmt == "parquet":
+        writers: Dict[str, Any] = {}
+        try:
+            for trades, book in iter_synthetic(n_trades, chunk_rows, seed, params):
+                for name, df in (("trades", trades), ("book", book)):
+                    tbl = pa.Table.from_pandas(df, preserve_index=False)
+                    if name not in writers:
+                        writers[name] = pq.ParquetWriter(os.path.join(out_dir, f"{name}.parquet"), tbl.schema)
+                    writers[name].write_table(tbl)
+                rows += len(trades)
+        finally:
+            for w in writers.values():
+                w.close()
+    elif fmt == "csv":
+        for i, (trades, book) in enumerate(iter_synthetic(n_trades, chunk_rows, seed, params)):
+            mode, header = ("w", True) if i == 0 else ("a", False)
+            trades.to_csv(os.path.join(out_dir, "trades.csv"), mode=mode, header=header, index=False)
+            book.to_csv(os.path.join(out_dir, "book.csv"), mode=mode, header=header, index=False)
+            rows += len(trades)
+    else:
+        raise ValueError(f"Unknown format: {fmt!r} (expected store, parquet or csv)")
+    return {"rows": rows, "out_dir": out_dir, "format": fmt, "seed": seed}
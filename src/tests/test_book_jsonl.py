@@ -0,0 +1,46 @@
+import gzip
+import json
+import os
+import pandas as pd
+import pytest
+from book_jsonl import convert_book_files, read_book_jsonl
+from data_cleaning import clean_book
+from features import compute_spread_from_book
+from tickstore import read_ticks
+
+def test_convert_stamped_jsonl_to_parquet(tmp_path):
+    raw = tmp_path / "raw"; raw.mkdir()
+    recv0 = 1_754_006_400_000_000_000
+    with gzip.open(raw / "bookTicker-20250801T000000-0000.jsonl.gz", "wt") as f:
+        for i in range(100):
+            msg = {"stream": "btcusdt@bookTicker", "data": {"u": i, "s": "BTCUSDT", "b": f"{100 + i}.0", "B": "1.5", "a": f"{100 + i}.5", "A": "2"}}
+            f.write(json.dumps({"recv_ns": recv0 + i * 1_000_000, **msg}) + "\n")
+    with open(raw / "book-20250801T000000-0000.jsonl", "w") as f:
+        for i in range(10):
+            f.write(json.dumps({"recv_ns": recv0 + i, "u": i, "s": "ETHUSDT", "b": "10.0", "B": "1", "a": "10.2", "A": "1", "E": 1_754_006_400_000 + i}) + "\n")
+
+    totals = convert_book_files([str(raw)], str(tmp_path / "book"), workers=2)
+    assert totals == {"BTCUSDT/2025-08-01": 100, "ETHUSDT/2025-08-01": 10}
+
+    btc = read_ticks(str(tmp_path / "book" / "symbol=BTCUSDT"))
+    assert btc["bid"].iloc[-1] == 199.0 and btc["ask_size"].iloc[0] == 2.0
+    assert btc["ts"].is_monotonic_increasing and btc["event_ts"].isna().all()
+    eth = read_ticks(str(tmp_path / "book" / "symbol=ETHUSDT"))
+    assert (eth["ts"] == eth["event_ts"]).all()
+
+    spread = compute_spread_from_book(clean_book(btc))
+    assert abs(spread["spread_bp"].iloc[0] - 0.5 / 100.25 * 1e4) < 1e-9
+
+def test_unstamped_spot_lines_are_reported_stamped_or_rejected(tmp_path, capsys):
+    # Old collect_book output: raw spot bookTicker lines, no E and no recv_ns
+    path = tmp_path / "book.jsonl"
+    path.write_text("".join(json.dumps({"u": i, "s": "BTCUSDT", "b": f"{100 + i}.0", "B": "1", "a": f"{100 + i}.5", "A": "1"}) + "\n"
+                            for i in range(5)))
+    assert read_book_jsonl(str(path)).empty
+    assert "dropped 5 bookTicker lines" in capsys.readouterr().err
+
+    df = read_book_jsonl(str(path), assume_ts="mtime")
+    assert len(df) == 5 and (df["ts"] == pd.Timestamp(os.stat(path).st_mtime_ns, unit="ns")).all()
+    assert df["bid"].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0] and df["recv_ts"].isna().all()
+    with pytest.raises(ValueError, match="5 bookTicker lines"):
+        read_book_jsonl(str(path), assume_ts="error")
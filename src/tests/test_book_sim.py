@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from book_sim import TradeBookBuilder, convert_trades_to_book
+
+def _trades(n=10_000, seed=5):
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp("2025-08-01").value + np.cumsum(rng.integers(1, 50, n)) * 1_000_000
+    m = rng.random(n) < 0.5
+    mid = 30_000 + np.cumsum(rng.normal(0, 0.5, n))
+    price = np.round(np.where(m, mid - 0.05, mid + 0.05), 2)
+    return pd.DataFrame({"ts": pd.to_datetime(ts), "price": price, "qty": rng.random(n), "m": m})
+
+def test_sides_ticks_and_chunk_invariance():
+    trades = _trades()
+    whole = TradeBookBuilder(tick_size=0.01).update(trades)
+    b = TradeBookBuilder(tick_size=0.01)
+    parts = pd.concat([b.update(trades.iloc[i:i + 777]) for i in range(0, len(trades), 777)], ignore_index=True)
+    pd.testing.assert_frame_equal(whole, parts)
+    assert (whole["ask"] > whole["bid"]).all()
+    sells = trades["m"].to_numpy()
+    assert np.allclose(whole["bid"][sells], trades["price"][sells])
+    assert np.allclose(whole["ask"][~sells], trades["price"][~sells])
+    assert np.allclose(whole[["bid", "ask"]] / 0.01, np.round(whole[["bid", "ask"]] / 0.01))
+    both = max(np.argmax(sells), np.argmax(~sells))
+    spread = (whole["ask"] - whole["bid"]).iloc[both:]
+    assert spread.nunique() > 10 and spread.max() <= 100 * 0.01 + 1e-9
+
+def test_bucketed_file_output_matches_in_memory(tmp_path):
+    trades = _trades(5_000)
+    src = tmp_path / "trades.csv"
+    trades.assign(ts=trades["ts"].astype("int64") // 1_000_000).to_csv(src, index=False)
+    b = convert_trades_to_book(str(src), str(tmp_path / "book.parquet"), bucket="1s", chunksize=333)
+    got = pd.read_parquet(tmp_path / "book.parquet")
+    ref = TradeBookBuilder().update(trades)
+    ref = ref.groupby(ref["ts"].dt.floor("1s")).tail(1).reset_index(drop=True)
+    assert b.rows_in == 5_000 and b.rows_out == len(got) == len(ref)
+    assert (got["ts"].to_numpy() == ref["ts"].to_numpy()).all()
+    assert np.allclose(got[["bid", "ask"]], ref[["bid", "ask"]])
+
+def test_tick_rule_without_flag():
+    trades = _trades(2_000).drop(columns="m")
+    book = TradeBookBuilder().update(trades)
+    up = np.r_[False, np.diff(trades["price"]) > 0]
+    assert np.allclose(book["ask"][up], trades["price"][up])
+
+def test_vision_timestamp_units(tmp_path):
+    trades = _trades(200)
+    ns = trades["ts"].astype("int64")
+    for unit, scale in (("s", 1_000_000_000), ("ms", 1_000_000), ("us", 1_000)):
+        src = tmp_path / f"trades_{unit}.csv"
+        vision = pd.DataFrame({"a": range(len(trades)), "price": trades["price"], "qty": trades["qty"], "f": 0,
+                               "l": 0, "ts": ns // scale, "m": trades["m"], "M": True})
+        vision.to_csv(src, header=False, index=False)
+        convert_trades_to_book(str(src), str(tmp_path / f"book_{unit}.csv"))
+        got = pd.to_datetime(pd.read_csv(tmp_path / f"book_{unit}.csv")["ts"])
+        assert (got.to_numpy() == trades["ts"].dt.floor(unit).to_numpy()).all(), unit
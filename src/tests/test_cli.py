@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+from click.testing import CliRunner
+from cli import main, COMMANDS
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+def test_help_lists_commands():
+    res = CliRunner().invoke(main, ["--help"])
+    assert res.exit_code == 0
+    for name in ["prepare", "download", "collect", "run", "report", "metrics"]:
+        assert name in COMMANDS and name in res.output
+
+def test_run_help_and_stage_listing_skip_heavy_imports():
+    code = ("import sys; sys.argv = ['hft', 'run', '--list-stages', '--use-sample']; import cli\n"
+            "try:\n    cli.main()\nexcept SystemExit:\n    pass\n"
+            "print(sorted(m for m in ('pandas', 'scipy', 'matplotlib', 'jinja2') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(CLI), capture_output=True, text=True,
+                         check=True).stdout
+    assert "fit_spread" in out and out.strip().endswith("[]")
+
+def test_every_module_is_packaged():
+    import tomllib
+    root = os.path.dirname(os.path.dirname(CLI))
+    with open(os.path.join(root, "pyproject.toml"), "rb") as f:
+        setup = tomllib.load(f)["tool"]["setuptools"]
+    src = {n[:-3] for n in os.listdir(os.path.dirname(CLI)) if n.endswith(".py") and n != "__init__.py"}
+    assert set(setup["py-modules"]) == src and "scripts" in setup["packages"]
+    for target, _ in COMMANDS.values():
+        assert target.split(".")[0] in setup["packages"]
+
+def test_every_subcommand_help_skips_heavy_imports():
+    # One interpreter: each command is blamed only for the heavy modules it loads first
+    code = ("import sys, cli\nheavy = ('pandas', 'numpy', 'scipy', 'matplotlib', 'pyarrow', 'jinja2', 'requests')\n"
+            "for name in sorted(cli.COMMANDS):\n"
+            "    try:\n        cli.main([name, '--help'])\n    except SystemExit:\n        pass\n"
+            "    loaded = sorted(m for m in heavy if m in sys.modules)\n"
+            "    if loaded:\n        sys.stderr.write(f'{name}: {loaded}\\n')\n")
+    res = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(CLI), capture_output=True, text=True,
+                         check=True)
+    assert res.stderr == "" and all(name in res.stdout for name in COMMANDS)
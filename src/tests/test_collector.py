@@ -0,0 +1,63 @@
+import asyncio
+import gzip
+import glob
+import json
+import pytest
+from collector import RotatingWriter, MultiCollector, stamp
+
+def test_rotating_writer_flushes_and_rotates(tmp_path):
+    w = RotatingWriter(str(tmp_path / "book.jsonl"), rotate_bytes=2000, compress=True, batch=50)
+    for i in range(1000):
+        w.put('{"u":%d,"b":"100.0","a":"100.1"}' % i)
+    w.close()
+    files = sorted(glob.glob(str(tmp_path / "book-*.jsonl.gz")))
+    assert len(files) > 1 and w.stats()["files"] == len(files)
+    lines = [ln for f in files for ln in gzip.open(f, "rt").read().splitlines()]
+    assert len(lines) == 1000 and lines[-1].startswith('{"u":999,')
+    assert w.stats()["dropped"] == 0 and w.stats()["queue_depth"] == 0
+
+def test_rotating_writer_counts_drops(tmp_path):
+    w = RotatingWriter(str(tmp_path / "book.jsonl"), max_queue=10)
+    ok = sum(w.put("{}") for _ in range(10_000))
+    w.close()
+    assert ok + w.dropped == 10_000
+    assert w.written == ok
+
+def test_multi_collector_reconnects_and_routes(tmp_path):
+    pytest.importorskip("websockets")
+    import websockets
+    subscribes = []
+
+    async def handler(ws, *args):
+        sub = json.loads(await ws.recv())
+        subscribes.append(sub["params"])
+        await ws.send(json.dumps({"result": None, "id": sub["id"]}))
+        for i in range(5):
+            for name in sub["params"]:
+                sym = name.split("@")[0].upper()
+                await ws.send(json.dumps({"stream": name, "data": {"u": i, "s": sym, "b": "1.0", "B": "2", "a": "1.1", "A": "3"}}))
+        # clean close: the collector must reconnect and resubscribe
+
+    async def scenario():
+        async with websockets.serve(handler, "127.0.0.1", 0) as srv:
+            port = srv.sockets[0].getsockname()[1]
+            col = MultiCollector(["BTCUSDT", "ETHUSDT"], str(tmp_path), streams=("bookTicker",),
+                                 url=f"ws://127.0.0.1:{port}", streams_per_conn=1)
+            task = asyncio.create_task(col.run())
+            for _ in range(200):
+                await asyncio.sleep(0.05)
+                if col.connects >= 4 and col.received >= 20:
+                    break
+            col.stop()
+            await task
+            return col
+
+    col = asyncio.run(scenario())
+    assert len(col.groups) == 2 and col.connects >= 4
+    assert sorted(map(tuple, subscribes[:2])) == [("btcusdt@bookTicker",), ("ethusdt@bookTicker",)]
+    lines = [json.loads(ln) for f in glob.glob(str(tmp_path / "BTCUSDT" / "bookTicker-*.jsonl")) for ln in open(f)]
+    assert len(lines) >= 10 and all(d["data"]["s"] == "BTCUSDT" and d["recv_ns"] > 0 for d in lines)
+
+def test_stamp_keeps_valid_json():
+    assert json.loads(stamp('{"u":1,"b":"2"}', 7)) == {"recv_ns": 7, "u": 1, "b": "2"}
+    assert json.loads(stamp("{}", 7)) == {"recv_ns": 7}
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from crossasset import hayashi_yoshida, xcorr_matrix, align_bars, lead_lag_table, symbol_features
+from synth import generate
+
+def test_hayashi_yoshida_matches_double_loop():
+    rng = np.random.default_rng(0)
+    t1 = np.sort(rng.choice(5_000, 200, replace=False))
+    t2 = np.sort(rng.choice(5_000, 150, replace=False))
+    x1, x2 = np.cumsum(rng.normal(size=200)), np.cumsum(rng.normal(size=150))
+    ref = sum((x1[i] - x1[i - 1]) * (x2[j] - x2[j - 1])
+              for i in range(1, 200) for j in range(1, 150) if t1[i] > t2[j - 1] and t2[j] > t1[i - 1])
+    assert np.isclose(hayashi_yoshida(t1, x1, t2, x2)["cov"], ref)
+    # Synchronous observations reduce to the realized covariance
+    assert np.isclose(hayashi_yoshida(t1, x1, t1, x1)["corr"], 1.0)
+
+def test_fft_xcorr_matches_direct_sums():
+    rng = np.random.default_rng(1)
+    M = rng.normal(size=(500, 3))
+    lags, pairs, rho = xcorr_matrix(M, 5)
+    X = M - M.mean(axis=0)
+    for (i, j), r in zip(pairs, rho):
+        nrm = np.sqrt((X[:, i] ** 2).sum() * (X[:, j] ** 2).sum())
+        for lag in (-5, -2, 0, 3):
+            direct = (X[:len(X) - lag, i] * X[lag:, j]).sum() if lag >= 0 else (X[-lag:, i] * X[:lag, j]).sum()
+            assert np.isclose(r[lags == lag][0], direct / nrm)
+
+def test_lead_lag_table_finds_planted_lead():
+    a, _ = generate(40_000, seed=1)
+    b, _ = generate(40_000, seed=2)
+    pa = a.groupby("ts")["price"].last()
+    lead = pa.reindex(b["ts"] - pd.Timedelta("3s"), method="ffill").bfill().to_numpy()
+    b = b.assign(price=lead * np.exp(np.random.default_rng(3).normal(0, 1e-6, len(b))))
+    feats = {"AAA": symbol_features(a, "1s"), "BBB": symbol_features(b, "1s")}
+    aligned = {"logret": align_bars({s: f["bars"] for s, f in feats.items()}, "logret", "1s")}
+    assert aligned["logret"].dtypes.eq("float32").all() and aligned["logret"].index.freq == "s"
+    table, curves = lead_lag_table(aligned, 10, "1s", ticks={s: (f["tick_ts"], f["tick_logp"]) for s, f in feats.items()})
+    row = table.iloc[0]
+    assert (row["sym_a"], row["sym_b"], row["leader"]) == ("AAA", "BBB", "AAA")
+    assert row["peak_lag"] == 3 and row["peak_corr"] > 0.8 and row["llr"] > 1
+    assert row["hy_peak_lag_s"] == 3.0 and row["hy_peak_corr"] > 0.8
+
+def test_independent_symbols_have_no_leader():
+    feats = {s: symbol_features(generate(20_000, seed=seed)[0], "1s") for s, seed in (("AAA", 1), ("BBB", 2))}
+    aligned = {"logret": align_bars({s: f["bars"] for s, f in feats.items()}, "logret", "1s")}
+    row = lead_lag_table(aligned, 60, "1s")[0].iloc[0]
+    n = aligned["logret"].notna().all(axis=1).sum()
+    assert row["n_overlap"] == n and row["band"] > 2 / np.sqrt(n)
+    assert abs(row["peak_corr"]) < row["band"] and row["leader"] == "-"
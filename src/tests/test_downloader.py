@@ -0,0 +1,162 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import pytest
+import requests
+from downloader import MAX_RETRIES, download_agg_trades, iter_agg_trades_by_id, stream_agg_trades
+from tickstore import load_checkpoint, read_ticks
+
+# 5000 synthetic aggTrades over 10 minutes, with a 1500-trade burst in one second
+T0 = 1_754_006_400_000
+TIMES = sorted([T0 + i * 120 for i in range(3500)] + [T0 + 200_000 + (i % 1000) for i in range(1500)])
+TRADES = [{"a": i, "p": f"{100 + i * 0.01:.2f}", "q": "0.5", "f": i, "l": i, "T": t, "m": bool(i % 2), "M": True}
+          for i, t in enumerate(TIMES)]
+FLAKY_ID = 2500      # skipped by the first page that should contain it
+MISSING_ID = 4000    # never served
+
+class _Handler(BaseHTTPRequestHandler):
+    # Per-server state lives on the subclass made by _serve, so tests do not share it
+    trades = TRADES
+    calls = 0
+    flaky_served = False
+    throttle_all = False     # answer every request with 429
+    queries = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.calls += 1
+            first = cls.calls == 1
+        if first or cls.throttle_all:
+            self.send_response(429); self.send_header("Retry-After", "0"); self.end_headers(); return
+        q = {k: int(v[0]) for k, v in parse_qs(urlparse(self.path).query).items() if k != "symbol"}
+        cls.queries.append(q)
+        if "fromId" in q:
+            rows = [t for t in cls.trades if t["a"] >= q["fromId"] and t["a"] != MISSING_ID]
+            if not cls.flaky_served and rows and rows[0]["a"] <= FLAKY_ID < rows[-1]["a"]:
+                cls.flaky_served = True
+                rows = [t for t in rows if t["a"] != FLAKY_ID]
+            rows = rows[: q["limit"]]
+        else:
+            rows = [t for t in cls.trades if q["startTime"] <= t["T"] <= q["endTime"]][: q["limit"]]
+        body = json.dumps(rows).encode()
+        self.send_response(200); self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body))); self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _serve(trades=TRADES, **attrs):
+    handler = type("_FreshHandler", (_Handler,), {"trades": trades, "calls": 0, "flaky_served": False,
+                                                  "lock": threading.Lock(), "queries": [], **attrs})
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    srv.handler = handler
+    return srv, f"http://127.0.0.1:{srv.server_port}/api/v3/aggTrades"
+
+def test_concurrent_download_local_server(tmp_path):
+    srv, url = _serve()
+    try:
+        out = download_agg_trades("BTCUSDT", T0, T0 + 600_000, str(tmp_path / "t.csv"), workers=4, base_url=url)
+    finally:
+        srv.shutdown()
+    df = pd.read_csv(out)
+    assert len(df) == len(TRADES)
+    assert df["ts"].is_monotonic_increasing
+    assert srv.handler.calls > 10
+
+def test_time_windows_keep_dense_millisecond(tmp_path):
+    # 1500 trades share one millisecond: more than a page, so the window must continue by id
+    times = [T0 + i * 100 for i in range(200)] + [T0 + 30_000] * 1500 + [T0 + 40_000 + i for i in range(200)]
+    trades = [dict(t, T=ts) for t, ts in zip(TRADES, times)]
+    srv, url = _serve(trades)
+    try:
+        out = download_agg_trades("BTCUSDT", T0, T0 + 60_000, str(tmp_path / "t.csv"), workers=1, base_url=url)
+    finally:
+        srv.shutdown()
+    df = pd.read_csv(out)
+    assert df["a"].tolist() == list(range(len(trades)))
+
+def test_persistent_throttling_gives_up(tmp_path):
+    srv, url = _serve(throttle_all=True)
+    try:
+        with pytest.raises(requests.HTTPError, match="429"):
+            download_agg_trades("BTCUSDT", T0, T0 + 60_000, str(tmp_path / "t.csv"), workers=1, base_url=url)
+    finally:
+        srv.shutdown()
+    assert srv.handler.calls == MAX_RETRIES + 1
+
+def test_id_cursor_refetches_gaps(tmp_path):
+    srv, url = _serve()
+    gaps = []
+    try:
+        pages = list(iter_agg_trades_by_id("BTCUSDT", T0, T0 + 600_000, base_url=url, gaps=gaps))
+    finally:
+        srv.shutdown()
+    ids = [t["a"] for page in pages for t in page]
+    assert FLAKY_ID in ids and MISSING_ID not in ids
+    assert len(ids) == len(TRADES) - 1
+    assert {"kind": "a", "from": MISSING_ID, "to": MISSING_ID} in gaps
+    assert all(len(p) == 1000 for p in pages[:2])
+
+def test_stream_resumes_from_checkpoint(tmp_path):
+    root = str(tmp_path / "aggTrades")
+    srv, url = _serve()
+    try:
+        stream_agg_trades("BTCUSDT", T0, T0 + 300_000, root, rows_per_part=700, base_url=url)
+        first = load_checkpoint(root)
+        stream_agg_trades("BTCUSDT", T0, T0 + 600_000, root, rows_per_part=700, base_url=url)
+    finally:
+        srv.shutdown()
+    df = read_ticks(root)
+    assert first["last_id"] < df["a"].max()
+    assert df["a"].is_unique and df["ts"].is_monotonic_increasing
+    assert len(df) == len(TRADES) - 1   # MISSING_ID is never served
+
+class _InterruptedSession(requests.Session):
+    """A session whose ``get`` is interrupted (as by Ctrl-C) after ``calls`` requests."""
+
+    def __init__(self, calls):
+        super().__init__()
+        self.left = calls
+        self.closed = False
+
+    def get(self, *args, **kwargs):
+        self.left -= 1
+        if self.left < 0:
+            raise KeyboardInterrupt
+        return super().get(*args, **kwargs)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+def test_stream_resumes_after_interrupted_run(tmp_path, monkeypatch):
+    import downloader
+    root = str(tmp_path / "aggTrades")
+    ses = _InterruptedSession(5)     # 429, first-id lookup, then 3 of the 5 pages
+    monkeypatch.setattr(downloader, "make_session", lambda pool_size=8: ses)
+    srv, url = _serve()
+    try:
+        with pytest.raises(KeyboardInterrupt):
+            stream_agg_trades("BTCUSDT", T0, T0 + 600_000, root, rows_per_part=700, base_url=url)
+    finally:
+        srv.shutdown()
+    assert ses.closed
+    ckpt = load_checkpoint(root)
+    assert ckpt["last_id"] == read_ticks(root)["a"].max() and 0 < ckpt["last_id"] < len(TRADES) - 1
+
+    monkeypatch.undo()
+    srv, url = _serve()
+    try:
+        stream_agg_trades("BTCUSDT", T0, T0 + 600_000, root, rows_per_part=700, base_url=url)
+    finally:
+        srv.shutdown()
+    assert [q["fromId"] for q in srv.handler.queries if "fromId" in q][0] == ckpt["last_id"] + 1
+    ids = read_ticks(root)["a"]
+    assert ids.is_unique and sorted(ids) == [i for i in range(len(TRADES)) if i != MISSING_ID]
@@ -0,0 +1,52 @@
+import hashlib
+import zipfile
+from ingest import ingest_archives, load_ledger
+from tickstore import list_parts, read_ticks
+
+def _lines(start_id, t0, n):
+    return [f"{start_id + i},{100 + i * 0.01:.2f},0.5,{start_id + i},{start_id + i},{t0 + i * 1000},{'true' if i % 2 else 'false'},true"
+            for i in range(n)]
+
+def _write_archive(path, start_id, t0, n, header=False):
+    lines = ["agg_trade_id,price,quantity,first_trade_id,last_trade_id,transact_time,is_buyer_maker,is_best_match"] if header else []
+    lines += _lines(start_id, t0, n)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(path.name.replace(".zip", ".csv"), "\n".join(lines) + "\n")
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    (path.parent / (path.name + ".CHECKSUM")).write_text(f"{digest}  {path.name}\n")
+
+def test_ingest_archives_parallel_and_skip(tmp_path):
+    src = tmp_path / "archives"; src.mkdir()
+    _write_archive(src / "BTCUSDT-aggTrades-2025-08-01.zip", 0, 1_754_006_400_000, 500)
+    _write_archive(src / "BTCUSDT-aggTrades-2025-08-02.zip", 500, 1_754_092_800_000_000, 300, header=True)
+    out = str(tmp_path / "store")
+
+    res = ingest_archives([str(src)], out, workers=2, rows_per_part=200)
+    assert res == {"ingested": 2, "skipped": 0, "failed": {}}
+    df = read_ticks(out)
+    assert len(df) == 800 and df["a"].is_monotonic_increasing
+    assert str(df["ts"].iloc[-1].date()) == "2025-08-02"
+    assert df["m"].dtype == bool and df["m"].iloc[1]
+    assert load_ledger(out)["BTCUSDT-aggTrades-2025-08-01.zip"]["verified"]
+
+    assert ingest_archives([str(src / "*.zip")], out, workers=2)["skipped"] == 2
+
+    (src / "BTCUSDT-aggTrades-2025-08-02.zip.CHECKSUM").write_text("0" * 64)
+    res = ingest_archives([str(src)], out, workers=1, force=True)
+    assert list(res["failed"]) == ["BTCUSDT-aggTrades-2025-08-02.zip"]
+    assert "BTCUSDT-aggTrades-2025-08-02.zip" not in load_ledger(out)
+
+def test_corrupt_archive_leaves_no_parts(tmp_path):
+    # Stored (uncompressed) members: flipping a byte of the second one fails its CRC after the first is written
+    path = tmp_path / "BTCUSDT-aggTrades-2025-08-01.zip"
+    first, second = _lines(0, 1_754_006_400_000, 500), _lines(500, 1_754_007_000_000, 100)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("a.csv", "\n".join(first) + "\n")
+        zf.writestr("b.csv", "\n".join(second) + "\n")
+    data = path.read_bytes()
+    path.write_bytes(data.replace(second[-1].encode(), second[-1].replace("0.5", "0.6").encode()))
+    out = str(tmp_path / "store")
+    res = ingest_archives([str(path)], out, workers=1, rows_per_part=200)
+    assert "CRC" in res["failed"][path.name]
+    assert list_parts(out) == [] and read_ticks(out).empty
+    assert path.name not in load_ledger(out)
@@ -0,0 +1,100 @@
+import json
+import numpy as np
+import pandas as pd
+from features import resample_trades, add_returns, rolling_vol, order_flow, compute_spread_from_book
+from live import LiveAnalytics, LiveHub, RingBuffer, JsonFilePublisher, Cadence, run_replay_files
+
+def _ticks(n=20_000, seed=7):
+    rng = np.random.default_rng(seed)
+    t0 = pd.Timestamp("2025-08-01").value
+    # a quiet gap in the middle produces empty bars
+    dt = rng.exponential(30e6, n).astype("int64")
+    dt[n // 2] += 5_000_000_000
+    ts = t0 + np.cumsum(dt)
+    price = 100 * np.exp(np.cumsum(rng.normal(0, 2e-4, n)))
+    qty = rng.pareto(2.5, n) + 0.01
+    m = rng.random(n) < 0.5
+    trades = pd.DataFrame({"ts": pd.to_datetime(ts), "price": price, "qty": qty, "m": m})
+    book = pd.DataFrame({"ts": pd.to_datetime(ts + 1), "bid": price - 0.01, "ask": price + 0.01 + rng.random(n) * 0.02,
+                         "bid_size": 1.0, "ask_size": 1.0})
+    return trades, book
+
+def test_ring_buffer_wraps_in_order():
+    rb = RingBuffer(4, ("a", "b"))
+    for i in range(10):
+        rb.append((i, -i))
+    assert len(rb) == 4 and rb.last(field="a").tolist() == [6, 7, 8, 9]
+    assert rb.last(2)[:, 1].tolist() == [-8, -9] and rb.latest() == {"a": 9.0, "b": -9.0}
+
+def test_live_bars_match_batch_features():
+    trades, book = _ticks()
+    eng = LiveAnalytics(bar="1s", bar_capacity=10_000)
+    tt, bt = trades["ts"].astype("int64").to_numpy(), book["ts"].astype("int64").to_numpy()
+    for i in range(len(trades)):
+        eng.on_trade(int(tt[i]), trades["price"].iat[i], trades["qty"].iat[i], bool(trades["m"].iat[i]))
+        eng.on_book(int(bt[i]), book["bid"].iat[i], book["ask"].iat[i])
+    live = eng.bars_frame()
+
+    bars = add_returns(resample_trades(trades, "1s"))
+    bars["vol_roll"] = rolling_vol(bars)
+    bars = bars.join(order_flow(trades, "1s"))
+    bars = bars.join(compute_spread_from_book(book)[["spread_bp"]].resample("1s").last())
+    bars = bars.iloc[:-1]      # the last bar is still open in the live engine
+    assert live.index.equals(bars.index)
+    assert (live["ntrades"].to_numpy() == bars["ntrades"].to_numpy()).all()
+    for col in ["open", "high", "low", "close", "vol", "vwap", "ret", "logret", "absret", "vol_roll",
+                "buy_vol", "sell_vol", "flow_imb"]:
+        assert np.allclose(live[col], bars[col], rtol=1e-9, atol=1e-12, equal_nan=True), col
+    has_book = bars["spread_bp"].notna()
+    assert np.allclose(live.loc[has_book, "spread_bp"], bars.loc[has_book, "spread_bp"])
+
+def test_hub_replay_merges_stream_files_by_time(tmp_path):
+    # As MultiCollector records them: one file per stream, so a path-ordered replay would see all trades first
+    trades, book = _ticks(2_000)
+    with open(tmp_path / "aggTrade-20250801T000000-0000.jsonl", "w") as f:
+        for r in trades.itertuples():
+            data = {"e": "aggTrade", "s": "BTCUSDT", "p": str(r.price), "q": str(r.qty), "m": bool(r.m),
+                    "T": r.ts.value // 1_000_000}
+            f.write(json.dumps({"recv_ns": r.ts.value, "stream": "btcusdt@aggTrade", "data": data}) + "\n")
+    # Book stamped at the trade's exchange millisecond + 1 ns, so ts and bars line up with the batch frame
+    book = book.assign(ts=trades["ts"].dt.floor("ms") + pd.Timedelta(1, "ns"))
+    with open(tmp_path / "bookTicker-20250801T000000-0000.jsonl", "w") as f:
+        for r in book.itertuples():
+            data = {"s": "BTCUSDT", "b": repr(r.bid), "B": "1", "a": repr(r.ask), "A": "2"}
+            f.write(json.dumps({"recv_ns": r.ts.value, "stream": "btcusdt@bookTicker", "data": data}) + "\n")
+    hub = LiveHub(bar="1s", bar_capacity=256, tick_capacity=256)
+    out = tmp_path / "snap.json"
+    paths = sorted(str(p) for p in tmp_path.glob("*.jsonl"))
+    stats = run_replay_files(hub, paths, Cadence(hub, [JsonFilePublisher(str(out))], every=60))
+    assert stats["events"] == 4_000 and stats["late"] == 0
+    snap = json.loads(out.read_text())["symbols"]["BTCUSDT"]
+    assert snap["n_trades"] == 2_000 and snap["n_book"] == 2_000 and snap["n_late"] == 0
+    last = book.iloc[-1]
+    assert abs(snap["spread_bp"] - (last["ask"] - last["bid"]) / ((last["ask"] + last["bid"]) / 2) * 1e4) < 1e-9
+    assert snap["update_us_p50"] is not None
+    eng = hub.engines["BTCUSDT"]
+    assert eng.trades.data.shape == (256, 4)
+    live = eng.bars_frame()
+    ref = compute_spread_from_book(book)[["spread_bp"]].resample("1s").last().reindex(live.index)
+    has_book = ref["spread_bp"].notna()
+    assert has_book.sum() > 10
+    assert np.allclose(live.loc[has_book, "spread_bp"], ref.loc[has_book, "spread_bp"])
+
+def test_late_events_are_rejected_and_counted():
+    eng = LiveAnalytics(bar="1s")
+    t0 = pd.Timestamp("2025-08-01").value
+    eng.on_trade(t0, 100.0, 1.0, False)
+    eng.on_trade(t0 + 2_000_000_000, 101.0, 1.0, False)
+    eng.on_trade(t0 + 500_000_000, 99.0, 5.0, True)      # its bar is closed already
+    eng.on_book(t0 + 900_000_000, 98.0, 99.0)
+    assert eng.n_late == 2 and eng.n_trades == 2 and eng.n_book == 0
+    assert eng.bars.last(field="vol").tolist() == [1.0, 0.0] and eng.snapshot()["n_late"] == 2
+
+def test_snapshot_is_strict_json_after_first_bar():
+    eng = LiveAnalytics(bar="1s")
+    t0 = pd.Timestamp("2025-08-01").value
+    eng.on_trade(t0, 100.0, 1.0, False)
+    eng.on_trade(t0 + 1_500_000_000, 100.5, 1.0, True)     # closes the first bar, whose returns are NaN
+    snap = eng.snapshot()
+    assert snap["last_bar"] is not None and snap["last_bar"]["ret"] is None
+    json.dumps(snap, allow_nan=False)
@@ -0,0 +1,87 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+import pytest
+from pipeline import Stage, Pipeline
+from profiling import StageProfiler
+
+def _sleep(out, dt=0.2):
+    def run(**_):
+        time.sleep(dt)
+        return out
+    return run
+
+def _dag():
+    return Pipeline([
+        Stage("load", lambda: 1, outputs=["x"]),
+        Stage("a", _sleep("A"), inputs=["x"], outputs=["a"]),
+        Stage("b", _sleep("B"), inputs=["x"], outputs=["b"]),
+        Stage("c", _sleep("C"), inputs=["x"], outputs=["c"]),
+        Stage("join", lambda a, b, c: a + b + c, inputs=["a", "b", "c"], outputs=["abc"]),
+    ])
+
+def test_independent_stages_run_concurrently():
+    p = _dag()
+    arts = p.run(workers=4)
+    assert arts["abc"] == "ABC"
+    s = p.summary()
+    assert s["wall"] < 0.45 and s["sum"] >= 0.6 and 0.2 <= s["critical_path"] < 0.3
+
+def test_selection_only_and_until():
+    p = _dag()
+    assert p.select(only=["b"]) == ["load", "b"]
+    assert p.select(until="b") == ["load", "a", "b"]
+    arts = p.run(only=["a"])
+    assert "a" in arts and "b" not in arts and set(p.timings) == {"load", "a"}
+    with pytest.raises(KeyError):
+        p.select(only=["nope"])
+
+def test_locked_stages_never_overlap_and_errors_propagate():
+    active, peak = [0], [0]
+    guard = threading.Lock()
+    def draw(**_):
+        with guard:
+            active[0] += 1; peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with guard:
+            active[0] -= 1
+    stages = [Stage(f"fig{i}", draw, lock="matplotlib") for i in range(4)]
+    Pipeline(stages).run(workers=4)
+    assert peak[0] == 1
+
+    def boom():
+        raise ValueError("bad input")
+    with pytest.raises(RuntimeError, match="boom"):
+        Pipeline([Stage("boom", boom, outputs=["y"]), Stage("use", lambda y: y, inputs=["y"])]).run()
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("p", lambda q: 1, inputs=["q"], outputs=["p"]), Stage("q", lambda p: 1, inputs=["p"], outputs=["q"])])
+
+def _spin(n, profiler=None, **inputs):
+    # Pure-Python CPU work that holds the GIL (a distribution fit stands in for this in run_all)
+    with (profiler.section("spin") if profiler else contextlib.nullcontext()):
+        total = sum(i * i for i in range(n))
+    return total + inputs.get("x", 0)
+
+def test_process_stages_run_on_worker_processes(monkeypatch):
+    import pipeline
+    monkeypatch.setattr(pipeline.os, "cpu_count", lambda: 2)     # exercise the pool even on a single core
+    prof = StageProfiler(trace_memory=False)
+    p = Pipeline([Stage("load", lambda: 1, outputs=["x"])] +
+                 [Stage(f"s{i}", functools.partial(_spin, 200_000), inputs=["x"], outputs=[f"y{i}"], process=True,
+                        imports=["json"]) for i in range(3)])
+    arts = p.run(workers=2, profiler=prof)
+    assert arts["y0"] == arts["y2"] == sum(i * i for i in range(200_000)) + 1
+    rec = prof.table()
+    assert (rec["name"] == "spin").sum() == 3 and set(rec.loc[rec["name"] == "spin", "parent"]) == {"s0", "s1", "s2"}
+
+@pytest.mark.skipif((os.cpu_count() or 1) < 4, reason="needs 4 cores to show the speed-up")
+def test_cpu_bound_process_stages_approach_critical_path():
+    stages = [Stage("load", lambda: 1, outputs=["x"])]
+    stages += [Stage(f"s{i}", functools.partial(_spin, 3_000_000), inputs=["x"], outputs=[f"y{i}"], process=True)
+               for i in range(4)]
+    p = Pipeline(stages)
+    p.run(workers=4)
+    s = p.summary()
+    assert s["wall"] < 0.6 * s["sum"] and s["wall"] < 1.5 * s["critical_path"]
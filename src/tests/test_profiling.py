@@ -0,0 +1,49 @@
+import json
+import numpy as np
+import pandas as pd
+from pipeline import Stage, Pipeline
+from profiling import StageProfiler, NULL_PROFILER, count_rows
+
+def test_nested_sections_record_time_rows_and_memory(tmp_path):
+    prof = StageProfiler(dump_dir=str(tmp_path / "prof"))
+    prof.start()
+    with prof.section("stage", rows_in=10) as outer:
+        with prof.section("alloc") as inner:
+            x = np.ones(4_000_000)      # ~30 MB
+            inner.rows_out = len(x)
+            del x
+        with prof.section("small"):
+            sum(range(1000))
+        outer.rows_out = 5
+    prof.stop()
+    df = prof.table()
+    assert list(df["name"]) == ["stage", "alloc", "small"]
+    rec = df.set_index("name")
+    assert rec.loc["alloc", "parent"] == "stage" and rec.loc["alloc", "depth"] == 1
+    assert rec.loc["alloc", "peak_mb"] > 25 and rec.loc["stage", "peak_mb"] >= rec.loc["alloc", "peak_mb"]
+    assert rec.loc["small", "peak_mb"] < 5
+    assert rec.loc["stage", "rows_out"] == 5 and rec.loc["alloc", "rows_per_s"] > 0
+    assert (df["wall_s"] >= 0).all() and (df["cpu_s"] >= 0).all()
+    assert (tmp_path / "prof" / "stage.prof").exists()
+
+    prof.write(str(tmp_path / "p.json"), str(tmp_path / "p.csv"))
+    assert json.loads((tmp_path / "p.json").read_text())["records"][1]["rows_out"] == 4_000_000
+    assert len(pd.read_csv(tmp_path / "p.csv")) == 3
+
+def test_pipeline_stages_are_profiled_with_row_counts():
+    prof = StageProfiler(trace_memory=False)
+    frame = pd.DataFrame({"x": range(100)})
+    p = Pipeline([Stage("make", lambda: frame, outputs=["df"]),
+                  Stage("head", lambda df: df.head(7), inputs=["df"], outputs=["h"])])
+    p.run(profiler=prof)
+    rec = prof.table().set_index("name")
+    assert rec.loc["make", "rows_out"] == 100
+    # Without tracemalloc only the (free) high-water RSS is recorded
+    assert rec["peak_mb"].isna().all() and (rec["max_rss_mb"] > 0).all()
+    assert rec.loc["head", "max_rss_mb"] >= rec.loc["make", "max_rss_mb"]
+    assert rec.loc["head", "rows_in"] == 100 and rec.loc["head", "rows_out"] == 7
+    assert count_rows({"a": frame, "b": ["x", "y"], "c": np.float64(1.0)}) == 100
+
+    with NULL_PROFILER.section("noop") as s:
+        s.rows_out = 1
+    assert NULL_PROFILER.records == []
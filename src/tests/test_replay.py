@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from tickstore import PartWriter
+from live import LiveAnalytics
+from replay import open_source, merge_streams, Replayer, engine_handler
+
+def _store(tmp_path):
+    rng = np.random.default_rng(3)
+    t0 = pd.Timestamp("2025-08-01 23:59:00").value
+    tt = t0 + np.cumsum(rng.integers(0, 40_000_000, 5_000))
+    trades = pd.DataFrame({"ts": pd.to_datetime(tt), "price": 100 + rng.normal(0, 0.1, 5_000),
+                           "qty": rng.random(5_000), "a": np.arange(5_000), "f": 0, "l": 0, "m": rng.random(5_000) < 0.5})
+    with PartWriter(str(tmp_path / "trades"), rows_per_part=700) as w:
+        w.write(trades)
+    bt = np.sort(t0 + rng.integers(0, int(tt[-1] - t0), 3_000))
+    book = pd.DataFrame({"ts": pd.to_datetime(bt), "bid": 99.9, "ask": 100.1})
+    book.to_parquet(tmp_path / "book.parquet", row_group_size=400)
+    return trades, book
+
+def test_merge_is_time_ordered_and_complete(tmp_path):
+    trades, book = _store(tmp_path)
+    sources = {"trade": open_source(str(tmp_path / "trades"), "trade", batch_rows=300),
+               "book": open_source(str(tmp_path / "book.parquet"), "book", batch_rows=256)}
+    ts, kinds = [], []
+    for t, k, rows in merge_streams(sources):
+        ts.append(t); kinds += k
+    ts = np.concatenate(ts)
+    assert len(ts) == 8_000 and (np.diff(ts) >= 0).all()
+    assert kinds.count("trade") == 5_000
+    expected = np.sort(np.concatenate([trades["ts"].astype("int64"), book["ts"].astype("int64")]))
+    assert (ts == expected).all()
+
+def test_replay_paces_against_clock_and_feeds_engine(tmp_path):
+    _store(tmp_path)
+    now = [0.0]
+    rep = Replayer({"trade": open_source(str(tmp_path / "trades"), "trade"),
+                    "book": open_source(str(tmp_path / "book.parquet"), "book", start="2025-08-01", end="2025-08-01")},
+                   speed=10.0, clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+    eng = LiveAnalytics(bar="1s")
+    stats = rep.run(engine_handler(eng))
+    assert stats["by_kind"]["trade"] == 5_000 and stats["by_kind"]["book"] < 3_000
+    assert abs(stats["achieved_speed"] - 10.0) < 1e-6 and stats["max_lag_ms"] == 0.0
+    assert eng.n_trades == 5_000 and eng.snapshot()["spread_bp"] is not None
+
+    fast = Replayer({"trade": open_source(str(tmp_path / "trades"), "trade")}).run(lambda *a: None, limit=1_000)
+    assert fast["events"] == 1_000 and fast["events_per_sec"] > 0
@@ -0,0 +1,22 @@
+import os
+from report import new_manifest, add_table, add_figure, write_manifest, render_manifest, render_index
+
+TEMPLATES = os.path.join(os.path.dirname(__file__), "..", "..", "templates")
+
+def test_render_from_manifest(tmp_path):
+    res = tmp_path / "results"
+    m = new_manifest("Test", "BTCUSDT", "1s")
+    add_table(m, "spread_fit", str(res / "tables" / "spread_fit.csv"), "<table class='stats'><tr><td>lognorm</td></tr></table>")
+    add_figure(m, "Spread", str(res / "figures" / "spread.png"), "caption")
+    m["timings"]["fits"] = 0.5
+    mp = write_manifest(str(res / "manifest.json"), m)
+
+    out = tmp_path / "reports" / "summary.html"
+    render_manifest(mp, str(out), templates_dir=TEMPLATES, notes=["edited note"])
+    html = out.read_text(encoding="utf-8")
+    assert "lognorm" in html and "edited note" in html
+    assert os.path.join("..", "results", "figures", "spread.png") in html
+
+    idx = tmp_path / "reports" / "index.html"
+    render_index([mp, mp], str(idx), templates_dir=TEMPLATES)
+    assert idx.read_text(encoding="utf-8").count("spread_fit") == 2
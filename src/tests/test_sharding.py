@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from data_cleaning import clean_trades, clean_book
+from features import compute_spread_from_book
+from sharding import (serial_features, sharded_features, sharded_features_from_store, sharded_store_outputs,
+                      shard_edges)
+from synth import generate, SynthParams
+from tickstore import PartWriter, read_ticks
+
+def _inputs(n=60_000):
+    # Sparse trades over ~2 days: empty bars, gaps across shard edges and a day boundary
+    trades, book = generate(n, seed=4, params=SynthParams(trades_per_sec=0.5))
+    tdf = clean_trades(trades.assign(ts=trades["ts"].astype("int64") // 1_000_000))
+    bdf = compute_spread_from_book(clean_book(book.assign(ts=book["ts"].astype("int64") // 1_000_000)))
+    return tdf, bdf
+
+def test_shard_edges_cover_grid():
+    t0 = pd.Timestamp("2024-01-01")
+    edges = shard_edges(t0, t0 + pd.Timedelta("9s"), "1s", 3)
+    assert edges[0] == t0 and edges[-1] == t0 + pd.Timedelta("10s") and len(edges) == 4
+    assert len(shard_edges(t0, t0, "1s", 8)) == 2
+
+@pytest.mark.parametrize("with_book", [False, True])
+@pytest.mark.parametrize("shards,workers", [(5, 1), (3, 2)])
+def test_sharded_matches_serial_bit_for_bit(with_book, shards, workers):
+    tdf, bdf = _inputs()
+    bdf = bdf if with_book else None
+    ref = serial_features(tdf, bdf, "1s")
+    got = sharded_features(tdf, bdf, "1s", shards=shards, workers=workers)
+    pd.testing.assert_frame_equal(got, ref, check_exact=True, check_freq=True)
+
+def test_bar_must_divide_day():
+    tdf, _ = _inputs(1_000)
+    with pytest.raises(ValueError):
+        sharded_features(tdf, bar="7min", shards=2, workers=1)
+
+@pytest.mark.parametrize("shards,workers", [(1, 1), (7, 1), (4, 3)])
+def test_store_shards_read_their_own_ranges_and_match_serial(tmp_path, shards, workers):
+    # Timestamps floored to 250ms: many ties, whose order decides each bar's open and close
+    trades, book = generate(40_000, seed=6, params=SynthParams(trades_per_sec=0.5))
+    trades, book = trades.assign(ts=trades["ts"].dt.floor("250ms")), book.assign(ts=book["ts"].dt.floor("250ms"))
+    troot, broot = str(tmp_path / "trades"), str(tmp_path / "book")
+    with PartWriter(troot, rows_per_part=3_000) as tw, PartWriter(broot, rows_per_part=3_000, id_col=None) as bw:
+        tw.write(trades)
+        bw.write(book)
+    tdf = clean_trades(read_ticks(troot))
+    bdf = compute_spread_from_book(clean_book(read_ticks(broot)))
+    ref = serial_features(tdf, bdf, "1s")
+    got = sharded_features_from_store(troot, broot, "1s", shards=shards, workers=workers)
+    pd.testing.assert_frame_equal(got, ref, check_exact=True, check_freq=True)
+    got = sharded_features_from_store(troot, None, "1s", shards=shards, workers=workers)
+    pd.testing.assert_frame_equal(got, serial_features(tdf, None, "1s"), check_exact=True, check_freq=True)
+
+def test_store_outputs_give_sizes_and_counts_without_a_full_load(tmp_path):
+    trades, book = generate(20_000, seed=7, params=SynthParams(trades_per_sec=0.5))
+    # Book rows before the first and after the last trade count as in the serial load
+    book = pd.concat([book.assign(ts=book["ts"] - pd.Timedelta("1h")).head(50), book,
+                      book.assign(ts=book["ts"] + pd.Timedelta("1D")).tail(50)], ignore_index=True)
+    troot, broot = str(tmp_path / "trades"), str(tmp_path / "book")
+    with PartWriter(troot, rows_per_part=3_000) as tw, PartWriter(broot, rows_per_part=3_000, id_col=None) as bw:
+        tw.write(trades)
+        bw.write(book)
+    tdf = clean_trades(read_ticks(troot))
+    bdf = compute_spread_from_book(clean_book(read_ticks(broot)))
+    out = sharded_store_outputs(troot, broot, "1s", shards=5, workers=2)
+    pd.testing.assert_frame_equal(out["bars"], serial_features(tdf, bdf, "1s"), check_exact=True, check_freq=True)
+    pd.testing.assert_frame_equal(out["sizes"], tdf[["qty"]], check_exact=True)
+    assert out["trades"] == len(tdf) and out["book_rows"] == len(bdf) == len(book)
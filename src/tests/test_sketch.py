@@ -0,0 +1,80 @@
+import json
+import os
+import numpy as np
+from sketch import KLLSketch, BarReturns, rank_error, build_store_sketches, load_store_sketches, SKETCH_FILE
+from synth import SynthParams, generate, write_synthetic
+from features import resample_trades, add_returns
+
+def _max_rank_error(sk, xs_sorted, qs):
+    est = sk.quantile(qs)
+    return np.abs(np.searchsorted(xs_sorted, est, side="right") / len(xs_sorted) - qs).max()
+
+def test_quantiles_within_bound_and_mergeable():
+    x = np.random.default_rng(0).standard_t(3, size=500_000)
+    xs, qs = np.sort(x), np.linspace(0.001, 0.999, 999)
+    one = KLLSketch(200, seed=1)
+    for chunk in np.array_split(x, 13):
+        one.update(chunk)
+    parts = [KLLSketch(200, seed=i).update(c) for i, c in enumerate(np.array_split(x, 40))]
+    merged = KLLSketch(200, seed=0)
+    for p in parts:
+        merged.merge(p)
+    for sk in (one, merged):
+        assert sk.n == len(x) and sk.min == x.min() and sk.max == x.max()
+        assert sum(len(lvl) * 2 ** h for h, lvl in enumerate(sk.levels)) == len(x)
+        assert sum(len(lvl) for lvl in sk.levels) < 3 * 200
+        assert _max_rank_error(sk, xs, qs) < rank_error(200)
+    back = KLLSketch.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert np.array_equal(back.quantile(qs), merged.quantile(qs))
+    xe, fe = merged.ecdf(50)
+    assert np.all(np.diff(xe) >= 0) and fe[-1] == 1.0
+
+def test_bar_returns_match_batch_across_chunks():
+    trades, _ = generate(30_000, seed=4)
+    ref = add_returns(resample_trades(trades, "1s"))["absret"].to_numpy()
+    br = BarReturns("1s")
+    got = [br.update(trades.iloc[idx]) for idx in np.array_split(np.arange(len(trades)), 9)] + [br.finish()]
+    np.testing.assert_array_equal(np.concatenate(got), ref)
+
+def test_day_sketches_stored_and_merged(tmp_path):
+    write_synthetic(str(tmp_path), 20_000, chunk_rows=5_000, seed=5, params=SynthParams(trades_per_sec=0.1))
+    troot, broot = str(tmp_path / "trades"), str(tmp_path / "book")
+    res = build_store_sketches(troot, workers=2)
+    assert len(res["built"]) >= 2 and not res["skipped"]
+    assert all(os.path.exists(os.path.join(troot, f"date={d}", SKETCH_FILE)) for d in res["built"])
+    assert build_store_sketches(troot, workers=2)["built"] == []
+    merged = load_store_sketches(troot)
+    assert merged["qty"].n == 20_000 and merged["absret"].n > 0
+    build_store_sketches(broot, workers=1)
+    spread = load_store_sketches(broot)["spread_bp"]
+    assert spread.n == 20_000 and spread.min > 0
+
+def test_spread_summary_exact_for_bars_and_seeded_when_streamed(tmp_path):
+    import cli  # noqa: F401  (puts the project root on sys.path for scripts.*)
+    import pandas as pd
+    from scripts.quick_metrics import stream_bar_stats, summarize_spread
+    x = np.random.default_rng(2).lognormal(0, 1, size=50_000)
+    bars = pd.DataFrame({"ts": pd.date_range("2025-08-01", periods=len(x), freq="s"), "spread_bp": x})
+    exact = summarize_spread(bars)
+    assert exact["median_bp"] == np.median(x) and exact["p99_bp"] == np.quantile(x, 0.99)
+    assert exact["rank_error"] == 0
+    bars.to_parquet(tmp_path / "bars.parquet", index=False)
+    runs = [stream_bar_stats(str(tmp_path / "bars.parquet"), batch_rows=7_000)[0] for _ in range(2)]
+    assert runs[0] == runs[1] and runs[0]["n"] == len(x)
+    assert abs((x <= runs[0]["median_bp"]).mean() - 0.5) < runs[0]["rank_error"]
+
+def test_bar_stats_exact_below_row_limit(tmp_path):
+    import cli  # noqa: F401
+    import pandas as pd
+    from scripts.quick_metrics import bar_stats, realized_vol_stats, stream_bar_stats, summarize_spread
+    rng = np.random.default_rng(3)
+    bars = pd.DataFrame({"ts": pd.date_range("2025-08-01", periods=900, freq="10s"),
+                         "spread_bp": rng.lognormal(-4.5, 0.3, 900), "logret": rng.normal(0, 1e-4, 900)})
+    path = str(tmp_path / "bars.parquet")
+    bars.to_parquet(path, index=False)
+    spread, rv = bar_stats(path)
+    assert spread == summarize_spread(bars) and spread["rank_error"] == 0
+    assert rv == realized_vol_stats(bars.set_index("ts"))
+    streamed = stream_bar_stats(path)
+    assert bar_stats(path, stream=True) == bar_stats(path, max_exact_rows=899) == streamed
+    assert streamed[0]["rank_error"] > 0
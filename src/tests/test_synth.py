@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from synth import iter_synthetic, generate, write_synthetic
+from tickstore import read_ticks, TRADE_COLUMNS
+from benchmark import run_benchmarks, compare
+
+def test_chunked_generation_matches_one_shot():
+    t1, b1 = generate(5_000, seed=3)
+    chunks = list(iter_synthetic(5_000, chunk_rows=1_234, seed=3))
+    assert len(chunks) == 5
+    pd.testing.assert_frame_equal(t1.reset_index(drop=True), pd.concat([c[0] for c in chunks], ignore_index=True))
+    pd.testing.assert_frame_equal(b1.reset_index(drop=True), pd.concat([c[1] for c in chunks], ignore_index=True))
+
+def test_stylized_facts():
+    trades, book = generate(200_000, seed=1)
+    assert list(trades.columns) == TRADE_COLUMNS
+    assert trades["ts"].is_monotonic_increasing and trades["a"].is_unique
+    assert (book["bid"] < book["ask"]).all()
+    # Trades print at the touch on their side; both sides occur
+    assert np.allclose(trades["price"], np.where(trades["m"], book["bid"], book["ask"]))
+    assert 0.3 < trades["m"].mean() < 0.7
+    # Heavy tails in 1s returns and volatility clustering in |returns|
+    mid = pd.Series(((book["bid"] + book["ask"]) / 2).to_numpy(), index=book["ts"]).resample("1s").last().ffill()
+    r = np.log(mid).diff().dropna()
+    r = r[r != 0]
+    assert r.kurt() > 3
+    assert r.abs().autocorr(1) > 0.05
+
+def test_write_synthetic_store_and_csv(tmp_path):
+    info = write_synthetic(str(tmp_path / "s"), 3_000, chunk_rows=1_000, seed=2)
+    assert info["rows"] == 3_000
+    back = read_ticks(str(tmp_path / "s" / "trades"))
+    trades, _ = generate(3_000, seed=2)
+    assert len(back) == 3_000 and np.allclose(back["price"], trades["price"])
+    write_synthetic(str(tmp_path / "c"), 2_500, chunk_rows=1_000, seed=2, fmt="csv")
+    assert len(pd.read_csv(tmp_path / "c" / "book.csv")) == 2_500
+
+def test_benchmarks_and_regression_check():
+    res = run_benchmarks([2_000], repeat=1, only=["resample_trades", "clean_book"], figures=False)
+    assert set(res) == {"resample_trades@2000", "clean_book@2000"}
+    assert all(r["rows_per_s"] > 0 and r["peak_mb"] >= 0 for r in res.values())
+
+    res = run_benchmarks([2_000], repeat=1, only=["bars_store_serial", "bars_store_w2"], figures=False)
+    assert "speedup" not in res["bars_store_serial@2000"] and res["bars_store_w2@2000"]["speedup"] > 0
+
+    base = {"a@10": {"rows_per_s": 100.0, "peak_mb": 10.0}, "b@10": {"rows_per_s": 100.0, "peak_mb": 10.0}}
+    cur = {"a@10": {"rows_per_s": 70.0, "peak_mb": 10.5}, "b@10": {"rows_per_s": 90.0, "peak_mb": 20.0},
+           "c@10": {"rows_per_s": 1.0, "peak_mb": 99.0},
+           "startup:--help": {"best_s": 0.9, "budget_s": 0.5}}
+    regs = {(r["key"], r["metric"]) for r in compare(cur, base, threshold=0.25)}
+    assert regs == {("a@10", "rows_per_s"), ("b@10", "peak_mb"), ("startup:--help", "startup_s")}
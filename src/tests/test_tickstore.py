@@ -0,0 +1,15 @@
+import pandas as pd
+from tickstore import PartWriter, load_checkpoint, list_parts, read_ticks
+
+def test_part_writer_rotates_and_checkpoints(tmp_path):
+    ts = pd.date_range("2025-08-01 23:00", periods=5000, freq="1s")
+    df = pd.DataFrame({"ts": ts, "price": 100.0, "qty": 1.0, "a": range(5000)})
+    with PartWriter(str(tmp_path), rows_per_part=1000) as w:
+        for i in range(0, 5000, 300):
+            w.write(df.iloc[i:i + 300])
+    ck = load_checkpoint(str(tmp_path))
+    assert ck["last_id"] == 4999
+    assert set(ck["partitions"]) == {"2025-08-01", "2025-08-02"}
+    assert len(list_parts(str(tmp_path), start="2025-08-02")) == ck["partitions"]["2025-08-02"]["parts"]
+    out = read_ticks(str(tmp_path))
+    pd.testing.assert_frame_equal(out, df)
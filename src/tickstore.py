@@ -0,0 +1,173 @@
+"""
+Partitioned columnar tick store.
+
+Layout::
+
+    <root>/date=YYYY-MM-DD/part-00000.parquet
+    <root>/date=YYYY-MM-DD/part-00001.parquet
+    <root>/_checkpoint.json
+
+Rows are buffered per date partition and flushed as rotating Parquet part files,
+so memory use is bounded by ``rows_per_part`` whatever the range length. After
+every flush a small checkpoint (last id / timestamp, overall and per partition)
+is written atomically; a restarted download resumes right after it. Parts are
+numbered from the checkpoint, so replaying rows that were buffered but not yet
+checkpointed rewrites the same part file instead of duplicating data.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+
+TRADE_COLUMNS = ["ts", "price", "qty", "a", "f", "l", "m"]
+CHECKPOINT = "_checkpoint.json"
+
+def partition_dir(root: str, date: str) -> str:
+    return os.path.join(root, f"date={date}")
+
+def load_checkpoint(root: str) -> Dict[str, Any]:
+    """Return the checkpoint of a store, or an empty one."""
+    path = os.path.join(root, CHECKPOINT)
+    if not os.path.exists(path):
+        return {"last_id": None, "last_ts": None, "partitions": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_json_atomic(path: str, obj: Dict[str, Any]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+class PartWriter:
+    """Buffer tick rows and write them as rotating Parquet part files per date.
+
+    Rows must arrive in time order. ``id_col`` (if present) is tracked in the
+    checkpoint so id-cursor downloads can resume with ``last_id + 1``. Several
+    writers can share a root (e.g. one per ingested archive) by using distinct
+    ``prefix`` values and ``checkpoint=False``.
+    """
+
+    def __init__(self, root: str, rows_per_part: int = 500_000, id_col: Optional[str] = "a",
+                 meta: Optional[Dict[str, Any]] = None, prefix: str = "part", checkpoint: bool = True):
+        self.root = root
+        self.rows_per_part = int(rows_per_part)
+        self.id_col = id_col
+        self.prefix = prefix
+        self.save_checkpoint = checkpoint
+        os.makedirs(root, exist_ok=True)
+        self.checkpoint = load_checkpoint(root) if checkpoint else {"last_id": None, "last_ts": None, "partitions": {}}
+        if meta:
+            self.checkpoint.update(meta)
+        self._buf: Dict[str, List[pd.DataFrame]] = {}
+        self._rows: Dict[str, int] = {}
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Append a time-ordered chunk with a datetime ``ts`` column."""
+        if df.empty:
+            return
+        dates = df["ts"].dt.strftime("%Y-%m-%d")
+        for date, part in df.groupby(dates.values, sort=True):
+            # Data arrives in time order: an earlier partition is complete once a later one starts
+            for old in [d for d in self._buf if d < date]:
+                self._flush(old)
+            self._buf.setdefault(date, []).append(part)
+            self._rows[date] = self._rows.get(date, 0) + len(part)
+            if self._rows[date] >= self.rows_per_part:
+                self._flush(date)
+
+    def _flush(self, date: str) -> None:
+        chunks = self._buf.pop(date, [])
+        self._rows.pop(date, None)
+        if not chunks:
+            return
+        df = pd.concat(chunks, ignore_index=True)
+        info = self.checkpoint["partitions"].setdefault(date, {"parts": 0, "rows": 0})
+        pdir = partition_dir(self.root, date)
+        os.makedirs(pdir, exist_ok=True)
+        path = os.path.join(pdir, f"{self.prefix}-{info['parts']:05d}.parquet")
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+
+        last = df.iloc[-1]
+        info["parts"] += 1
+        info["rows"] += int(len(df))
+        info["last_ts"] = str(last["ts"])
+        self.checkpoint["last_ts"] = str(last["ts"])
+        if self.id_col and self.id_col in df.columns:
+            info["last_id"] = int(last[self.id_col])
+            self.checkpoint["last_id"] = int(last[self.id_col])
+        if self.save_checkpoint:
+            save_json_atomic(os.path.join(self.root, CHECKPOINT), self.checkpoint)
+
+    def flush(self) -> None:
+        for date in sorted(self._buf):
+            self._flush(date)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Also runs on Ctrl-C/crash: whatever is buffered is persisted and checkpointed
+        self.close()
+
+def remove_parts(root: str, prefix: str) -> int:
+    """Delete every part file written with ``prefix`` (before re-ingesting a source)."""
+    n = 0
+    for path in list_parts(root):
+        name = os.path.basename(path)
+        if name.startswith(prefix + "-") and name[len(prefix) + 1:-len(".parquet")].isdigit():
+            os.remove(path); n += 1
+    return n
+
+def list_parts(root: str, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+    """Part files in time order, optionally limited to dates in [start, end] (YYYY-MM-DD)."""
+    if not os.path.isdir(root):
+        return []
+    out = []
+    for d in sorted(os.listdir(root)):
+        if not d.startswith("date="):
+            continue
+        date = d[len("date="):]
+        if (start and date < start) or (end and date > end):
+            continue
+        pdir = os.path.join(root, d)
+        out += [os.path.join(pdir, f) for f in sorted(os.listdir(pdir)) if f.endswith(".parquet")]
+    return out
+
+def read_ticks(root: str, start: Optional[str] = None, end: Optional[str] = None,
+               columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read a partitioned tick store (or a date range of it) into one frame."""
+    parts = list_parts(root, start, end)
+    if not parts:
+        return pd.DataFrame(columns=columns or TRADE_COLUMNS)
+    return pd.concat([pd.read_parquet(p, columns=columns) for p in parts], ignore_index=True)
+
+def store_columns(root: str) -> List[str]:
+    """Column names of a store's first part file (empty if it has none)."""
+    import pyarrow.parquet as pq
+    parts = list_parts(root)
+    return list(pq.read_schema(parts[0]).names) if parts else []
+
+def ts_range(root: str) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """First and last ``ts`` of a store, from the Parquet footers (the column is read only without statistics)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    lo = hi = None
+    for path in list_parts(root):
+        md = pq.ParquetFile(path).metadata
+        schema = md.schema.to_arrow_schema()
+        i, typ = schema.get_field_index("ts"), schema.field("ts").type
+        stats = [md.row_group(g).column(i).statistics for g in range(md.num_row_groups)]
+        if pa.types.is_timestamp(typ) and all(st is not None and st.has_min_max for st in stats):
+            vals = [pd.Timestamp(v, unit=typ.unit) for st in stats for v in (st.min_raw, st.max_raw)]
+        else:
+            vals = list(pd.read_parquet(path, columns=["ts"])["ts"].dropna())
+        if vals:
+            lo = min(vals) if lo is None else min(lo, *vals)
+            hi = max(vals) if hi is None else max(hi, *vals)
+    return lo, hi
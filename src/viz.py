@@ -59,6 +59,28 @@ def loglog_tail_plot(x, path=None):
         fig.savefig(path, dpi=120)
     plt.close(fig)
 
+def sketch_ecdf_tail_plot(sketch, title="", path=None, points=200):
+    """ECDF and log-log CCDF from a quantile sketch (``sketch.KLLSketch``), without the raw data."""
+    if sketch.n == 0:
+        return
+    xs, ecdf = sketch.ecdf(points)
+    # Upper tail sampled evenly in log-probability so the CCDF reaches 1/n
+    p = 1.0 - np.logspace(0, -np.log10(max(sketch.n, 10)), points)
+    xt = sketch.quantile(p)
+    keep = xt > 0
+    fig = plt.figure(figsize=(10,4))
+    ax1 = fig.add_subplot(1,2,1)
+    ax2 = fig.add_subplot(1,2,2)
+    ax1.plot(xs, ecdf)
+    ax1.set_ylim(0,1)
+    ax1.set_title(f"ECDF | {title}")
+    ax2.loglog(xt[keep], 1.0 - p[keep], marker=".", linestyle="none")
+    ax2.set_title(f"Log-Log Tail (CCDF) | {title}")
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=120)
+    plt.close(fig)
+
 def ts_plot(df, cols, title="", path=None):
     """Simple time series plot for selected columns."""
     fig, ax = plt.subplots(figsize=(10,4))
@@ -110,3 +132,38 @@ def acf_abs_returns(abs_returns: np.ndarray, nlags: int = 60, path=None):
         fig.savefig(path, dpi=120)
     plt.close(fig)
 
+
+def lead_lag_heatmap(matrix: pd.DataFrame, title="", value_label="", path=None, annot=None):
+    """Symbols × symbols heatmap (e.g. peak lead-lag in seconds), optionally annotated from ``annot``."""
+    vals = matrix.values.astype(float)
+    lim = np.nanmax(np.abs(vals)) or 1.0
+    fig, ax = plt.subplots(figsize=(1.2 * len(matrix) + 3, 1.0 * len(matrix) + 2))
+    im = ax.imshow(vals, cmap="RdBu_r", vmin=-lim, vmax=lim)
+    ax.set_xticks(range(len(matrix.columns))); ax.set_xticklabels(matrix.columns, rotation=45, ha="right")
+    ax.set_yticks(range(len(matrix.index))); ax.set_yticklabels(matrix.index)
+    src = annot if annot is not None else matrix
+    for i in range(len(matrix.index)):
+        for j in range(len(matrix.columns)):
+            ax.text(j, i, f"{src.values[i, j]:.2g}", ha="center", va="center", fontsize=8,
+                    color="white" if abs(vals[i, j]) > lim / 2 else "black")
+    ax.set_title(title)
+    fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04, label=value_label)
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=120)
+    plt.close(fig)
+
+def xcorr_plot(lags, curves, title="", lag_seconds=1.0, path=None):
+    """Cross-correlation curves ``{label: rho}`` against lag (seconds)."""
+    fig, ax = plt.subplots(figsize=(8,4))
+    for label, rho in curves.items():
+        ax.plot(np.asarray(lags) * lag_seconds, rho, lw=1, label=label)
+    ax.axvline(0, color="grey", lw=0.5)
+    ax.set_xlabel("Lag (s, > 0: first symbol leads)")
+    ax.set_ylabel("Correlation")
+    ax.set_title(title)
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=120)
+    plt.close(fig)